@@ -34,7 +34,9 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
-python manage.py rqworker default &
+python manage.py schedule_periodic_jobs
+python manage.py rqworker default --with-scheduler &
+python manage.py rqworker maintenance --with-scheduler &
 
 exec gunicorn core.wsgi:application --bind 0.0.0.0:8000 --reload
 
@@ -34,6 +34,8 @@ else:
     print(f"Superuser '{username}' already exists.")
 EOF
 
+python manage.py schedule_periodic_jobs
+
 echo "Production mode - starting Gunicorn without --reload"
 
 exec gunicorn core.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
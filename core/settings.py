@@ -13,8 +13,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 import sys
+import tempfile
 from dotenv import load_dotenv
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt.token_blacklist',
@@ -65,6 +68,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'utils.db_routers.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +94,24 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 
 CORS_ALLOW_CREDENTIALS = True
+# Request and response headers of the resumable (tus) upload API
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    "tus-resumable",
+    "upload-length",
+    "upload-metadata",
+    "upload-offset",
+    "upload-checksum",
+)
+CORS_EXPOSE_HEADERS = [
+    "location",
+    "tus-resumable",
+    "tus-version",
+    "tus-extension",
+    "tus-max-size",
+    "upload-offset",
+    "upload-length",
+]
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 
@@ -120,6 +142,27 @@ DATABASES = {
     }
 }
 
+# Read replicas: one alias per host in DB_REPLICA_HOSTS (comma-separated).
+# Read-only video_app queries are routed to them by utils.db_routers.
+
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(
+        filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica_{_index}"] = {
+        **DATABASES["default"],
+        "HOST": _host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+
+DATABASE_ROUTERS = ["utils.db_routers.ReplicaRouter"]
+
+DB_REPLICA_MAX_LAG_SECONDS = float(
+    os.getenv("DB_REPLICA_MAX_LAG_SECONDS", default=5))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL", default=2))
+DB_REPLICA_PIN_SECONDS = int(os.getenv("DB_REPLICA_PIN_SECONDS", default=10))
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -138,9 +181,112 @@ RQ_QUEUES = {
         'DB': os.getenv("REDIS_DB", default=0),
         'DEFAULT_TIMEOUT': 900,
         'REDIS_CLIENT_KWARGS': {},
-    }
+    },
+    # Periodic jobs (outbox dispatch, progress flush, reaper, catalog
+    # snapshot) run on their own worker, never behind hour-long encodes
+    'maintenance': {
+        'HOST': os.getenv("REDIS_HOST", default="redis"),
+        'PORT': os.getenv("REDIS_PORT", default=6379),
+        'DB': os.getenv("REDIS_DB", default=0),
+        'DEFAULT_TIMEOUT': 300,
+        'REDIS_CLIENT_KWARGS': {},
+    },
 }
 
+# Video catalog search
+
+VIDEO_SUGGEST_LIMIT = int(os.getenv("VIDEO_SUGGEST_LIMIT", default=10))
+VIDEO_SUGGEST_CACHE_TTL = int(
+    os.getenv("VIDEO_SUGGEST_CACHE_TTL", default=60))
+
+# Catalog snapshot in Redis (rebuilt after processing and every interval)
+
+CATALOG_SNAPSHOT_INTERVAL = int(
+    os.getenv("CATALOG_SNAPSHOT_INTERVAL", default=300))
+CATALOG_SNAPSHOT_TTL = int(os.getenv("CATALOG_SNAPSHOT_TTL", default=86400))
+
+# Watch progress heartbeats are buffered in Redis and flushed in batches
+
+PROGRESS_FLUSH_INTERVAL = int(os.getenv("PROGRESS_FLUSH_INTERVAL", default=30))
+PROGRESS_FLUSH_BATCH_SIZE = int(
+    os.getenv("PROGRESS_FLUSH_BATCH_SIZE", default=500))
+CONTINUE_WATCHING_LIMIT = int(
+    os.getenv("CONTINUE_WATCHING_LIMIT", default=20))
+
+# HLS segmentation: short leading segments for a fast first frame
+# (set HLS_FAST_START_SEGMENTS=0 for uniform segments)
+
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", default=10))
+HLS_FAST_START_SEGMENTS = int(
+    os.getenv("HLS_FAST_START_SEGMENTS", default=4))
+HLS_FAST_START_SEGMENT_SECONDS = int(
+    os.getenv("HLS_FAST_START_SEGMENT_SECONDS", default=2))
+# Fixed keyframe interval shared by all renditions
+HLS_GOP_SECONDS = int(os.getenv("HLS_GOP_SECONDS", default=2))
+# Rate control: 'capped_crf' (per-title caps from a complexity sample)
+# or 'bitrate' (fixed ladder bitrates)
+HLS_RATE_CONTROL = os.getenv("HLS_RATE_CONTROL", default="capped_crf")
+HLS_CRF = int(os.getenv("HLS_CRF", default=23))
+HLS_MIN_COMPLEXITY_FACTOR = 0.4
+HLS_MAX_COMPLEXITY_FACTOR = 1.5
+HLS_COMPLEXITY_SAMPLE_SECONDS = 12
+HLS_COMPLEXITY_SAMPLE_WINDOWS = 3
+# Offer a low-bitrate audio-only stream for very poor connections
+HLS_AUDIO_ONLY_STREAM = os.getenv(
+    "HLS_AUDIO_ONLY_STREAM", "True").lower() in ("true", "1", "yes")
+
+
+# Transactional outbox: how often pending jobs are moved to RQ, and how many per pipeline
+OUTBOX_DISPATCH_INTERVAL = int(
+    os.getenv("OUTBOX_DISPATCH_INTERVAL", default=2))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", default=500))
+
+# Fast node-local directory (tmpfs or local SSD) renditions are encoded in
+# before they are published to MEDIA_ROOT
+HLS_SCRATCH_DIR = os.getenv(
+    "HLS_SCRATCH_DIR", default=os.path.join(tempfile.gettempdir(), "videoflix-scratch"))
+
+# Running pipelines renew their processing lock every PROCESSING_HEARTBEAT_INTERVAL
+# seconds; videos without one are requeued every PROCESSING_REAPER_INTERVAL seconds,
+# at most PROCESSING_MAX_RESTARTS times before they are marked failed
+PROCESSING_HEARTBEAT_INTERVAL = int(
+    os.getenv("PROCESSING_HEARTBEAT_INTERVAL", default=30))
+PROCESSING_REAPER_INTERVAL = int(
+    os.getenv("PROCESSING_REAPER_INTERVAL", default=300))
+PROCESSING_MAX_RESTARTS = int(
+    os.getenv("PROCESSING_MAX_RESTARTS", default=3))
+
+# Admission control: free space (bytes) that must remain on the media and
+# scratch volumes after a job's estimated output; jobs that do not fit are
+# retried after HLS_ADMISSION_RETRY_INTERVAL seconds
+HLS_DISK_HEADROOM_BYTES = int(
+    os.getenv("HLS_DISK_HEADROOM_BYTES", default=2 * 1024 ** 3))
+HLS_ADMISSION_RETRY_INTERVAL = int(
+    os.getenv("HLS_ADMISSION_RETRY_INTERVAL", default=300))
+
+# Store for published media (HLS output, thumbnails): 'local' (MEDIA_ROOT)
+# or 's3' (an S3-compatible bucket; boto3, pinned in requirements.txt, reads the
+# usual AWS_* credentials).
+# Uploaded sources always stay in MEDIA_ROOT, which web and worker nodes share.
+# MEDIA_S3_SERVE: 'redirect' segments and sprites to presigned URLs, or 'proxy' them
+MEDIA_STORAGE_BACKEND = os.getenv("MEDIA_STORAGE_BACKEND", default="local")
+MEDIA_S3_BUCKET = os.getenv("MEDIA_S3_BUCKET", default="")
+MEDIA_S3_PREFIX = os.getenv("MEDIA_S3_PREFIX", default="")
+MEDIA_S3_ENDPOINT_URL = os.getenv("MEDIA_S3_ENDPOINT_URL", default="")
+MEDIA_S3_REGION = os.getenv("MEDIA_S3_REGION", default="")
+MEDIA_S3_SERVE = os.getenv("MEDIA_S3_SERVE", default="redirect")
+MEDIA_S3_URL_EXPIRY = int(os.getenv("MEDIA_S3_URL_EXPIRY", default=3600))
+MEDIA_S3_UPLOAD_WORKERS = int(os.getenv("MEDIA_S3_UPLOAD_WORKERS", default=8))
+MEDIA_S3_MULTIPART_THRESHOLD = int(
+    os.getenv("MEDIA_S3_MULTIPART_THRESHOLD", default=8 * 1024 ** 2))
+
+# Serve HLS output not yet moved by migrate_media_layout from the flat
+# pre-sharding layout (local store only); set to False once it has run
+MEDIA_LEGACY_LAYOUT = os.getenv(
+    "MEDIA_LEGACY_LAYOUT", "True").lower() in ("true", "1", "yes")
+
+# Resumable (tus) uploads: largest accepted video file in bytes
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", default=50 * 1024 ** 3))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -226,6 +372,10 @@ LOGGING = {
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'utils.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'user_auth_app.authentication.CookieJWTAuthentication',
     ],
@@ -6,6 +6,15 @@ RESOLUTION_CHOICES = [
     ('1080p', '1080p'),
 ]
 
+# Audio-only renditions shared by all video resolutions
+AUDIO_RENDITION_CHOICES = [
+    ('audio', 'Audio'),
+    ('audio_low', 'Audio (low bitrate)'),
+]
+
+# All stream variants of a video: video resolutions and audio renditions
+STREAM_VARIANT_CHOICES = RESOLUTION_CHOICES + AUDIO_RENDITION_CHOICES
+
 # Processing states for video transcoding
 PROCESSING_CHOICES = [
     ("pending", "Pending"),
@@ -13,3 +22,14 @@ PROCESSING_CHOICES = [
     ("completed", "Completed"),
     ("failed", "Failed"),
 ]
+
+# Background jobs that can be requested through the transactional outbox
+OUTBOX_JOB_CHOICES = [
+    ("process_video", "Process video"),
+    ("refresh_catalog", "Refresh catalog snapshot"),
+    ("delete_media", "Delete video media"),
+    ("hash_upload", "Hash uploaded file"),
+]
+
+# Postgres text search configuration used for the video search vector
+SEARCH_CONFIG = "english"
@@ -0,0 +1,147 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# Reads go to the primary unless a web request explicitly allowed replicas
+# (see ReplicaPinningMiddleware). RQ jobs and management commands therefore
+# always read their own writes.
+_pinned_to_primary = ContextVar("pinned_to_primary", default=True)
+_wrote_in_context = ContextVar("wrote_in_context", default=False)
+
+REPLICA_APP_LABELS = {"video_app"}
+PIN_COOKIE_NAME = "db_pinned"
+
+# alias -> (checked_at, is_fresh)
+_replica_freshness = {}
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+             OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def pin_to_primary():
+    """Route all further reads of the current context to the primary."""
+    _pinned_to_primary.set(True)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+def replica_lag_seconds(alias):
+    """
+    Return the replication lag of a database alias in seconds.
+    Backends without replication (e.g. a local SQLite alias) report 0.
+    """
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_fresh(alias):
+    """
+    Check whether a replica is within DB_REPLICA_MAX_LAG_SECONDS.
+    The result is cached per process for DB_REPLICA_LAG_CHECK_INTERVAL seconds;
+    unreachable replicas count as stale.
+    """
+    now = time.monotonic()
+    cached = _replica_freshness.get(alias)
+    if cached and now - cached[0] < settings.DB_REPLICA_LAG_CHECK_INTERVAL:
+        return cached[1]
+
+    try:
+        fresh = replica_lag_seconds(alias) <= settings.DB_REPLICA_MAX_LAG_SECONDS
+    except Exception as e:
+        logger.warning("Replica %s unavailable: %s", alias, e)
+        fresh = False
+
+    _replica_freshness[alias] = (now, fresh)
+    return fresh
+
+
+class ReplicaRouter:
+    """
+    Send read-only video_app queries to a fresh read replica.
+
+    Reads stay on the primary when the current context is pinned (outside
+    web requests, after a write in this request, or shortly after the
+    client's own writes) or when no replica is within the staleness window.
+    Writes and migrations always go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APP_LABELS:
+            return None
+        if is_pinned_to_primary():
+            return "default"
+
+        fresh = [alias for alias in settings.DATABASE_REPLICAS
+                 if replica_is_fresh(alias)]
+        return random.choice(fresh) if fresh else "default"
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        _wrote_in_context.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Allow replica reads for the duration of a safe (GET/HEAD/OPTIONS) web request.
+
+    Unsafe requests (POST, PUT, PATCH, DELETE) read from the primary from
+    the start, as they usually read what they are about to change. Requests
+    that write to the database set a short-lived cookie, so the same client
+    keeps reading from the primary for DB_REPLICA_PIN_SECONDS and always
+    sees its own writes. Views can pin other reads with pin_to_primary().
+    """
+    safe_methods = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_token = _pinned_to_primary.set(
+            PIN_COOKIE_NAME in request.COOKIES
+            or request.method not in self.safe_methods)
+        wrote_token = _wrote_in_context.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote_in_context.get():
+                response.set_cookie(
+                    key=PIN_COOKIE_NAME,
+                    value="1",
+                    max_age=settings.DB_REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    # Sent back over plain http in development as well
+                    secure=request.is_secure(),
+                    samesite="Lax",
+                )
+            return response
+        finally:
+            _pinned_to_primary.reset(pinned_token)
+            _wrote_in_context.reset(wrote_token)
@@ -0,0 +1,35 @@
+import logging
+import django_rq
+from datetime import timedelta
+from rq.job import Job
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_periodic_job(func, interval_seconds, queue_name="default", **enqueue_kwargs):
+    """
+    Schedule the next run of a periodic RQ job.
+
+    Periodic jobs call this again at the end of each run, so the chain keeps
+    itself alive. If a run of the same function is already waiting in the
+    scheduled registry, nothing is added and its job ID is returned.
+    Requires the worker to run with '--with-scheduler'.
+    """
+    queue = django_rq.get_queue(queue_name)
+    func_name = f"{func.__module__}.{func.__name__}"
+
+    registry = queue.scheduled_job_registry
+    for job in Job.fetch_many(registry.get_job_ids(), connection=queue.connection):
+        if job is not None and job.func_name == func_name:
+            return job.id
+
+    job = queue.enqueue_in(
+        timedelta(seconds=interval_seconds),
+        func,
+        description=enqueue_kwargs.pop(
+            "description", f"Periodic {func.__name__}"),
+        **enqueue_kwargs,
+    )
+    logger.debug("Scheduled %s in %ss. Job ID: %s",
+                 func_name, interval_seconds, job.id)
+    return job.id
@@ -1,9 +1,118 @@
+import hashlib
+import re
+from pathlib import Path
+from django.conf import settings
+
+# Media is spread over two levels of 256 directories each (e.g. 'hls/3f/a2/<id>/'),
+# keyed by a hash of the video ID (renditions, thumbnails) or filename (sources),
+# so no directory grows past a few entries per 65536 videos.
+SHARD_LEVELS = 2
+
+SHARD_NAME_RE = re.compile(r"[0-9a-f]{2}")
+
+# The flat layout predates master playlists: a legacy directory holds
+# output once a rendition playlist (written by ffmpeg as it finishes) exists
+LEGACY_OUTPUT_PATTERN = "*/index.m3u8"
+
+HLS_DIR_NAME = "hls"
+THUMBNAIL_DIR_NAME = "thumbnails"
+SOURCE_DIR_NAME = "videos"
+
+
+def shard_path(key):
+    """Return the shard directories of a key, e.g. '3f/a2'."""
+    digest = hashlib.sha256(str(key).encode()).hexdigest()
+    return "/".join(digest[2 * i:2 * i + 2] for i in range(SHARD_LEVELS))
+
 
 def video_upload_to(instance, filename):
     """
     Return the upload path for a video file.
 
-    Files are stored inside the 'videos/' directory, preserving the original filename.
+    Files are stored inside the 'videos/' directory, sharded by the
+    original filename, which is preserved.
+    """
+
+    return f"{SOURCE_DIR_NAME}/{shard_path(filename)}/{filename}"
+
+
+def hls_relative_dir(video_id):
+    """Return the HLS output directory of a video relative to MEDIA_ROOT."""
+    return f"{HLS_DIR_NAME}/{shard_path(video_id)}/{video_id}"
+
+
+def legacy_hls_dir(video_id):
+    """Return the unsharded HLS output directory used before sharding ('hls/<id>/')."""
+    return Path(settings.MEDIA_ROOT) / HLS_DIR_NAME / str(video_id)
+
+
+def legacy_hls_paths(video_id):
+    """
+    Return the paths of a video's legacy HLS output. The legacy directory
+    of a two-digit ID may be a shard directory as well; then only its
+    entries that are not shards belong to the video.
+    """
+    legacy = legacy_hls_dir(video_id)
+    if not legacy.is_dir():
+        return []
+    if not SHARD_NAME_RE.fullmatch(legacy.name):
+        return [legacy]
+    return [path for path in legacy.iterdir()
+            if not SHARD_NAME_RE.fullmatch(path.name)]
+
+
+def hls_dir(video_id):
+    """
+    Return the absolute HLS output directory of a video.
+
+    Output not yet moved by the migrate_media_layout command is still
+    found in its unsharded location; new output always goes to the
+    sharded one. The fallback only applies to the local store (legacy
+    output never lived in S3) and is switched off with
+    MEDIA_LEGACY_LAYOUT=False once the command has run.
+    """
+    sharded = Path(settings.MEDIA_ROOT) / hls_relative_dir(video_id)
+    if (settings.MEDIA_LEGACY_LAYOUT and settings.MEDIA_STORAGE_BACKEND == "local"
+            and not sharded.exists()):
+        legacy = legacy_hls_dir(video_id)
+        if next(legacy.glob(LEGACY_OUTPUT_PATTERN), None):
+            return legacy
+    return sharded
+
+
+def hls_path(video_id, *parts):
+    """Return the absolute path of a file in the HLS output of a video."""
+    return hls_dir(video_id).joinpath(*parts)
+
+
+def hls_name(video_id, *parts):
     """
+    Return the name of the HLS output of a video (or of a file in it) in
+    the media store, i.e. relative to MEDIA_ROOT (see hls_dir).
+    """
+    directory = hls_dir(video_id).relative_to(settings.MEDIA_ROOT).as_posix()
+    return "/".join([directory, *parts])
+
 
-    return f"videos/{filename}"
+def thumbnail_name(video_id):
+    """Return the poster thumbnail of a video relative to MEDIA_ROOT."""
+    return f"{THUMBNAIL_DIR_NAME}/{shard_path(video_id)}/{video_id}_thumb.jpg"
+
+
+def iter_hls_dirs():
+    """
+    Yield (video_id, path) for every HLS output directory below MEDIA_ROOT,
+    sharded ones first, then legacy ones. Two-digit IDs of legacy
+    directories look like shards (e.g. 'hls/42/'); those directories are
+    only searched as shards.
+    """
+    hls_root = Path(settings.MEDIA_ROOT) / HLS_DIR_NAME
+    if not hls_root.is_dir():
+        return
+    shards = "/".join(["[0-9a-f][0-9a-f]"] * SHARD_LEVELS)
+    for path in hls_root.glob(f"{shards}/[0-9]*"):
+        if path.name.isdigit():
+            yield int(path.name), path
+    for path in hls_root.iterdir():
+        if path.name.isdigit() and not SHARD_NAME_RE.fullmatch(path.name):
+            yield int(path.name), path
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Video, VideoStreamVariant, UserWatchProgress
+from django.contrib.postgres.search import SearchQuery
+from .models import (DiskReservation, OutboxJob, UserWatchProgress, Video,
+                     VideoStreamVariant, VideoUpload)
+from utils.data import SEARCH_CONFIG
 
 
 class VideoStreamVariantInline(admin.TabularInline):
@@ -7,17 +10,44 @@ class VideoStreamVariantInline(admin.TabularInline):
     model = VideoStreamVariant
     extra = 1
     exclude = ('manifest_path',)
+    readonly_fields = ('peak_bitrate', 'average_bitrate', 'total_bytes',
+                       'segment_count', 'codecs')
 
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
     """Admin configuration for Video objects."""
     list_display = ("id", "title", "processing_status", "processing_progress",
-                    "duration_seconds", "file_size_mb", "created_at")
+                    "processing_restarts", "duration_seconds", "file_size_mb",
+                    "created_at")
     list_filter = ("title", "category", "processing_status", "created_at")
     search_fields = ("title", "description")
     ordering = ("-created_at",)
     inlines = [VideoStreamVariantInline]
+    actions = ["reprocess_videos"]
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search via the indexed full-text vector instead of ILIKE scans."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        query = SearchQuery(search_term, search_type="websearch",
+                            config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query), False
+
+    @admin.action(description="Re-process selected videos")
+    def reprocess_videos(self, request, queryset):
+        """
+        Request HLS processing again, with a fresh budget of automatic
+        restarts. Videos whose job is still queued or running are not
+        processed twice (see tasks.enqueue_deduplicated).
+        """
+        videos = list(queryset.exclude(video_file="").exclude(video_file=None))
+        Video.objects.filter(id__in=[video.id for video in videos]).update(
+            processing_restarts=0)
+        OutboxJob.objects.bulk_create(
+            OutboxJob(job="process_video", args=[video.id]) for video in videos)
+        self.message_user(request, f"Processing requested for {len(videos)} video(s).")
 
     def available_resolutions(self, obj):
         """Return all available resolutions for a video as a comma-separated string."""
@@ -27,6 +57,17 @@ class VideoAdmin(admin.ModelAdmin):
     available_resolutions.short_description = "Resolutions"
 
 
+@admin.register(VideoUpload)
+class VideoUploadAdmin(admin.ModelAdmin):
+    """Admin configuration for resumable uploads (read-only)."""
+    list_display = ("id", "title", "user", "offset", "upload_length",
+                    "video", "updated_at")
+    search_fields = ("title", "file_path")
+    ordering = ("-updated_at",)
+    readonly_fields = ("user", "file_path", "upload_length", "offset",
+                       "sha256", "video")
+
+
 @admin.register(UserWatchProgress)
 class UserWatchProgressAdmin(admin.ModelAdmin):
     """Admin configuration for user watch progress entries."""
@@ -35,3 +76,21 @@ class UserWatchProgressAdmin(admin.ModelAdmin):
     list_filter = ("resolution", "updated_at")
     search_fields = ("user__username", "video__title")
     ordering = ("-updated_at",)
+
+
+@admin.register(OutboxJob)
+class OutboxJobAdmin(admin.ModelAdmin):
+    """Admin configuration for jobs waiting in the outbox (read-only)."""
+    list_display = ("id", "job", "args", "created_at", "available_at")
+    list_filter = ("job",)
+    ordering = ("id",)
+    readonly_fields = ("job", "args", "created_at", "available_at")
+
+
+@admin.register(DiskReservation)
+class DiskReservationAdmin(admin.ModelAdmin):
+    """Admin configuration for disk space reserved by running jobs (read-only)."""
+    list_display = ("video", "volume", "reserved_bytes", "created_at")
+    list_filter = ("volume",)
+    ordering = ("-created_at",)
+    readonly_fields = ("video", "volume", "reserved_bytes", "created_at")
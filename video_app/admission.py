@@ -0,0 +1,144 @@
+import logging
+import os
+import shutil
+import socket
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .encoding import ladder_kbps
+from .models import DiskReservation
+from .storage import media_store
+
+logger = logging.getLogger(__name__)
+
+# Container (MPEG-TS), playlist and segment index overhead on top of the
+# stream bitrates
+OUTPUT_OVERHEAD_FACTOR = 1.1
+
+# Postgres advisory lock serializing admissions across workers
+ADMISSION_LOCK_ID = 0x76666461  # "vfda"
+
+
+class InsufficientDiskSpace(Exception):
+    """The output of a processing job does not fit on its volumes."""
+
+
+class OutputExceedsDiskCapacity(Exception):
+    """
+    The output of a processing job would not fit on its volumes even if
+    they were empty, so deferring the job cannot help.
+    """
+
+
+def estimate_output_bytes(duration_seconds, resolutions, audio_renditions):
+    """
+    Estimate the disk space a processing run needs from the video duration
+    and the ladder bitrates. In capped CRF mode a rendition may use up to
+    HLS_MAX_COMPLEXITY_FACTOR times its ladder bitrate, so that is assumed.
+
+    Returns (media_bytes, scratch_bytes): everything published to
+    MEDIA_ROOT, and the largest pass held in scratch space at once (the
+    first pass also encodes the audio renditions).
+    """
+    factor = 1
+    if settings.HLS_RATE_CONTROL == 'capped_crf':
+        factor = settings.HLS_MAX_COMPLEXITY_FACTOR
+
+    def stream_bytes(kbps):
+        return int(kbps * 1000 / 8 * duration_seconds * OUTPUT_OVERHEAD_FACTOR)
+
+    video = [stream_bytes(ladder_kbps(res) * factor) for res in resolutions]
+    audio = sum(stream_bytes(ladder_kbps(r)) for r in audio_renditions)
+    return sum(video) + audio, max(video[0] + audio, *video[1:])
+
+
+def scratch_volume():
+    """Return the volume name of this worker's scratch space."""
+    return f"scratch:{socket.gethostname()}"
+
+
+def volume_paths():
+    """Return {volume name: path} of the volumes a processing run writes to."""
+    return {
+        'media': Path(settings.MEDIA_ROOT),
+        scratch_volume(): Path(settings.HLS_SCRATCH_DIR),
+    }
+
+
+@transaction.atomic
+def reserve_disk_space(video_id, media_bytes, scratch_bytes):
+    """
+    Admit a processing run of a video if its estimated output fits.
+
+    A volume fits the output if its free space, minus what is reserved for
+    runs already in flight and minus HLS_DISK_HEADROOM_BYTES, covers it.
+    Volumes on the same filesystem (e.g. scratch space under MEDIA_ROOT)
+    are checked together. Reservations are counted in full although
+    running jobs have written part of their output already, which errs on
+    the safe side. With a remote media store, MEDIA_ROOT is not written
+    and the whole output stays in scratch space until the run ends.
+    On success the space is reserved until release_disk_space; otherwise
+    InsufficientDiskSpace is raised, or OutputExceedsDiskCapacity if the
+    output is larger than the volume's capacity minus the headroom.
+    """
+    if media_store().is_local:
+        needed = {'media': media_bytes, scratch_volume(): scratch_bytes}
+    else:
+        needed = {scratch_volume(): media_bytes}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [ADMISSION_LOCK_ID])
+
+    DiskReservation.objects.filter(video_id=video_id).delete()
+    reserved = dict(DiskReservation.objects.filter(volume__in=needed)
+                    .values('volume').annotate(total=Sum('reserved_bytes'))
+                    .values_list('volume', 'total'))
+
+    filesystems = {}
+    for volume, path in volume_paths().items():
+        if volume not in needed:
+            continue
+        path.mkdir(parents=True, exist_ok=True)
+        fs = filesystems.setdefault(os.stat(path).st_dev,
+                                    {'path': path, 'needed': 0, 'reserved': 0})
+        fs['needed'] += needed[volume]
+        fs['reserved'] += reserved.get(volume, 0)
+
+    for fs in filesystems.values():
+        usage = shutil.disk_usage(fs['path'])
+        capacity = usage.total - settings.HLS_DISK_HEADROOM_BYTES
+        if fs['needed'] > capacity:
+            raise OutputExceedsDiskCapacity(
+                f"{fs['needed'] // 1024 ** 2} MB needed on {fs['path']}, "
+                f"which holds at most {max(capacity, 0) // 1024 ** 2} MB")
+        available = usage.free - fs['reserved'] - settings.HLS_DISK_HEADROOM_BYTES
+        if fs['needed'] > available:
+            raise InsufficientDiskSpace(
+                f"{fs['needed'] // 1024 ** 2} MB needed on {fs['path']}, "
+                f"{max(available, 0) // 1024 ** 2} MB available")
+
+    DiskReservation.objects.bulk_create([
+        DiskReservation(video_id=video_id, volume=volume, reserved_bytes=size)
+        for volume, size in needed.items()
+    ])
+    logger.info("Reserved %d MB media and %d MB scratch space for video %s",
+                media_bytes // 1024 ** 2, scratch_bytes // 1024 ** 2, video_id)
+
+
+def release_disk_space(video_id):
+    """Drop the disk space reservations of a video's processing run."""
+    DiskReservation.objects.filter(video_id=video_id).delete()
+
+
+def release_stale_reservations(max_age_seconds):
+    """
+    Drop reservations older than max_age_seconds of videos not in
+    processing, left by runs that died between admission and setup.
+    Returns the number of deleted reservations.
+    """
+    deleted, _ = DiskReservation.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=max_age_seconds)
+    ).exclude(video__processing_status='processing').delete()
+    return deleted
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from video_app.progress import MAX_POSITION_SECONDS
+from utils.data import STREAM_VARIANT_CHOICES
+
+
+class WatchProgressSerializer(serializers.Serializer):
+    """
+    Serializer for player heartbeats.
+
+    Validates the current playback position in seconds
+    and the resolution the player is streaming.
+    """
+
+    position = serializers.IntegerField(min_value=0, max_value=MAX_POSITION_SECONDS)
+    resolution = serializers.ChoiceField(choices=STREAM_VARIANT_CHOICES)
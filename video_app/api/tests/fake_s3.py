@@ -0,0 +1,67 @@
+import threading
+from io import BytesIO
+from pathlib import Path
+
+
+class ClientError(Exception):
+    """Error shaped like botocore's ClientError."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """
+    In-process stand-in for the subset of the boto3 S3 client used by
+    storage.S3MediaStore. Objects are kept in memory, per bucket.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+        self.lock = threading.Lock()
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None, Config=None):
+        data = Path(filename).read_bytes()
+        with self.lock:
+            self.objects[(bucket, key)] = (data, (ExtraArgs or {}).get("ContentType"))
+            self.uploads.append(key)
+
+    def download_file(self, bucket, key, filename):
+        Path(filename).write_bytes(self.object(bucket, key)[0])
+
+    def object(self, bucket, key):
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise ClientError("NoSuchKey")
+
+    def head_object(self, Bucket, Key):
+        data, content_type = self.object(Bucket, Key)
+        return {"ContentLength": len(data), "ContentType": content_type}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data, content_type = self.object(Bucket, Key)
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start):int(end) + 1]
+        return {"Body": BytesIO(data), "ContentType": content_type}
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects
+                      if bucket == Bucket and key.startswith(Prefix))
+        return {"Contents": [{"Key": key, "Size": len(self.objects[(Bucket, key)][0])}
+                             for key in keys],
+                "IsTruncated": False}
+
+    def delete_objects(self, Bucket, Delete):
+        with self.lock:
+            for obj in Delete["Objects"]:
+                self.objects.pop((Bucket, obj["Key"]), None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+    def keys(self, bucket):
+        return sorted(key for b, key in self.objects if b == bucket)
@@ -0,0 +1,128 @@
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from video_app.admission import (InsufficientDiskSpace, OutputExceedsDiskCapacity,
+                                 estimate_output_bytes, reserve_disk_space)
+from video_app.models import DiskReservation, OutboxJob, Video
+from video_app.tasks import (AUDIO_RENDITION, RESOLUTIONS, dispatch_outbox,
+                             run_video_pipeline)
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+MB = 1024 ** 2
+
+
+@override_settings(HLS_RATE_CONTROL="bitrate")
+class OutputEstimateTest(TestCase):
+    """Unit tests for estimating the output size of a processing run."""
+
+    def test_estimate_from_ladder_bitrates(self):
+        """Media gets every rendition; scratch the larger of the first pass and the largest resolution."""
+        media, scratch = estimate_output_bytes(80, RESOLUTIONS, [AUDIO_RENDITION])
+
+        # 9500 kbit/s video + 128 kbit/s audio for 80 s, plus 10% overhead
+        self.assertEqual(media, int(9628 * 1000 / 8 * 80 * 1.1))
+        self.assertEqual(scratch, int(5000 * 1000 / 8 * 80 * 1.1))
+
+    @override_settings(HLS_RATE_CONTROL="capped_crf", HLS_MAX_COMPLEXITY_FACTOR=1.5)
+    def test_capped_crf_assumes_highest_cap(self):
+        """In capped CRF mode the highest per-title cap is assumed."""
+        with override_settings(HLS_RATE_CONTROL="bitrate"):
+            fixed, _ = estimate_output_bytes(80, RESOLUTIONS, [])
+        capped, _ = estimate_output_bytes(80, RESOLUTIONS, [])
+        self.assertAlmostEqual(capped / fixed, 1.5, places=3)
+
+
+@override_settings(HLS_DISK_HEADROOM_BYTES=100 * MB)
+@patch("video_app.admission.shutil.disk_usage")
+class DiskReservationTest(TestCase):
+    """Unit tests for admitting processing runs by free disk space."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        settings_override = override_settings(MEDIA_ROOT=str(root / "media"),
+                                              HLS_SCRATCH_DIR=str(root / "scratch"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.videos = [Video.objects.create(title=f"V{i}", description="d",
+                                            category="Doku") for i in range(2)]
+
+    def test_reservations_of_running_jobs_count(self, disk_usage):
+        """A job is refused if the space reserved by running jobs leaves too little."""
+        disk_usage.return_value = DiskUsage(2000 * MB, 1000 * MB, 1000 * MB)
+        first, second = self.videos
+
+        reserve_disk_space(first.id, 300 * MB, 200 * MB)
+        self.assertEqual(DiskReservation.objects.filter(video=first).count(), 2)
+
+        # Same filesystem: 1000 free - 500 reserved - 100 headroom
+        with self.assertRaises(InsufficientDiskSpace):
+            reserve_disk_space(second.id, 300 * MB, 200 * MB)
+        self.assertFalse(DiskReservation.objects.filter(video=second).exists())
+
+        reserve_disk_space(second.id, 250 * MB, 100 * MB)
+
+    def test_output_larger_than_volume(self, disk_usage):
+        """A job whose output exceeds the volume's capacity minus headroom can never be admitted."""
+        disk_usage.return_value = DiskUsage(2000 * MB, 0, 2000 * MB)
+
+        with self.assertRaises(OutputExceedsDiskCapacity):
+            reserve_disk_space(self.videos[0].id, 1500 * MB, 500 * MB)
+        self.assertFalse(DiskReservation.objects.exists())
+
+    def test_rerun_replaces_own_reservation(self, disk_usage):
+        """A new run of the same video replaces its previous reservation."""
+        disk_usage.return_value = DiskUsage(2000 * MB, 1000 * MB, 1000 * MB)
+        reserve_disk_space(self.videos[0].id, 300 * MB, 200 * MB)
+        reserve_disk_space(self.videos[0].id, 300 * MB, 200 * MB)
+        self.assertEqual(DiskReservation.objects.count(), 2)
+
+
+@override_settings(HLS_ADMISSION_RETRY_INTERVAL=300)
+@patch("video_app.tasks.extract_video_metadata")
+@patch("video_app.tasks.setup_video_processing")
+@patch("video_app.tasks.reserve_disk_space",
+       side_effect=InsufficientDiskSpace("5000 MB needed on /media, 10 MB available"))
+class DeferredProcessingTest(TestCase):
+    """Unit tests for deferring jobs that do not fit on disk."""
+
+    def test_job_is_deferred(self, _reserve, setup, _metadata):
+        """The video goes back to 'pending' and is requested again after the retry interval."""
+        video = Video.objects.create(title="V", description="d", category="Doku",
+                                     processing_status="failed", duration_seconds=60,
+                                     video_file="videos/v.mp4")
+        OutboxJob.objects.all().delete()
+
+        run_video_pipeline(video.id, resume=True)
+
+        setup.assert_not_called()
+        video.refresh_from_db()
+        self.assertEqual(video.processing_status, "pending")
+        self.assertIn("Waiting for disk space", video.processing_error)
+        entry = OutboxJob.objects.get()
+        self.assertEqual(entry.args, [video.id, True])
+        self.assertGreater(entry.available_at, timezone.now())
+
+        with patch("video_app.tasks.django_rq.get_queue") as get_queue:
+            self.assertEqual(dispatch_outbox(), 0)
+        get_queue.return_value.enqueue_many.assert_not_called()
+
+    def test_job_too_large_fails(self, reserve, setup, _metadata):
+        """A video whose output can never fit fails instead of being deferred forever."""
+        reserve.side_effect = OutputExceedsDiskCapacity("5000 MB needed on /media, "
+                                                        "which holds at most 1000 MB")
+        video = Video.objects.create(title="V", description="d", category="Doku",
+                                     duration_seconds=60, video_file="videos/v.mp4")
+        OutboxJob.objects.all().delete()
+
+        run_video_pipeline(video.id)
+
+        setup.assert_not_called()
+        video.refresh_from_db()
+        self.assertEqual(video.processing_status, "failed")
+        self.assertIn("does not fit on disk", video.processing_error)
+        self.assertFalse(OutboxJob.objects.exists())
@@ -0,0 +1,113 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from video_app.cleanup import orphaned_media
+from video_app.models import OutboxJob, Video, VideoStreamVariant
+from video_app.tasks import delete_video_media_job
+from utils.videos import hls_relative_dir, thumbnail_name
+
+
+class MediaCleanupTest(TestCase):
+    """Unit tests for removing the media of deleted videos and orphaned output."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.media = Path(self.tmp.name)
+        settings_override = override_settings(MEDIA_ROOT=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, relative, size=100):
+        path = self.media / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+        return path
+
+    def create_video(self, **fields):
+        video = Video.objects.create(title="V", description="d", category="Doku", **fields)
+        VideoStreamVariant.objects.create(video=video, resolution="360p")
+        return video
+
+    def test_delete_requests_background_removal(self):
+        """Deleting a video leaves its files to a background job requested through the outbox."""
+        video = self.create_video(video_file="videos/clip.mp4",
+                                  thumbnail_url="thumbnails/1_thumb.jpg")
+        source = self.write("videos/clip.mp4")
+        video_id = video.id
+
+        video.delete()
+
+        self.assertTrue(source.exists())
+        self.assertEqual(
+            OutboxJob.objects.get(job="delete_media").args,
+            [video_id, ["videos/clip.mp4", "thumbnails/1_thumb.jpg"]])
+
+    @patch("video_app.tasks.django_rq.get_connection")
+    def test_deletion_job_removes_media(self, get_connection):
+        """The deletion job removes the HLS tree, source and thumbnail, and reports the bytes freed."""
+        get_connection.return_value.lock.return_value.acquire.return_value = True
+        self.write("hls/7/360p/segment_00000.ts", 1000)
+        self.write("hls/7/master.m3u8", 10)
+        self.write("videos/clip.mp4", 500)
+
+        freed = delete_video_media_job(7, ["videos/clip.mp4", "../outside.txt"])
+
+        self.assertEqual(freed, 1510)
+        self.assertFalse((self.media / "hls" / "7").exists())
+        self.assertFalse((self.media / "videos" / "clip.mp4").exists())
+
+    @patch("video_app.tasks.django_rq.get_connection")
+    def test_deletion_waits_for_processing_run(self, get_connection):
+        """While the video's processing lock is held, the deletion job fails to be retried."""
+        get_connection.return_value.lock.return_value.acquire.return_value = False
+        self.write("hls/7/master.m3u8")
+
+        with self.assertRaises(RuntimeError):
+            delete_video_media_job(7, [])
+        self.assertTrue((self.media / "hls" / "7").exists())
+
+    def test_orphans(self):
+        """Output of deleted videos, unregistered renditions and publishing leftovers are orphans."""
+        video = self.create_video()
+        processing = self.create_video(processing_status="processing")
+        video_dir = hls_relative_dir(video.id)
+        for relative in (f"{video_dir}/360p/index.m3u8",
+                         f"{video_dir}/trickplay/sprite_000.jpg",
+                         f"{video_dir}/master.m3u8",
+                         f"{video_dir}/720p/index.m3u8",
+                         f"{video_dir}/.360p.retired/index.m3u8",
+                         f"{hls_relative_dir(processing.id)}/.480p.publishing/index.m3u8",
+                         f"{hls_relative_dir(999998)}/360p/index.m3u8",
+                         "hls/999999/360p/index.m3u8",
+                         thumbnail_name(video.id),
+                         thumbnail_name(999999)):
+            self.write(relative)
+
+        # A published (symlinked) rendition and a version left by a killed swap
+        self.write(f"{video_dir}/.480p.v1/index.m3u8")
+        self.write(f"{video_dir}/.480p.v2/index.m3u8")
+        (self.media / video_dir / "480p").symlink_to(".480p.v2")
+        VideoStreamVariant.objects.create(video=video, resolution="480p",
+                                          manifest_path=f"{video_dir}/480p/index.m3u8")
+
+        self.assertEqual(
+            sorted(orphaned_media()),
+            sorted([f"{video_dir}/.360p.retired", f"{video_dir}/.480p.v1", f"{video_dir}/720p",
+                    hls_relative_dir(999998), "hls/999999", thumbnail_name(999999)]))
+
+    def test_command_dry_run(self):
+        """--dry-run reports the reclaimable bytes without removing anything."""
+        self.write("hls/999999/360p/segment_00000.ts", 2048)
+        out = StringIO()
+
+        call_command("cleanup_orphaned_media", "--dry-run", stdout=out)
+
+        self.assertIn("Would remove 1 orphaned path(s), reclaiming 2048 bytes", out.getvalue())
+        self.assertTrue((self.media / "hls" / "999999").exists())
+
+        call_command("cleanup_orphaned_media", stdout=StringIO())
+        self.assertFalse((self.media / "hls" / "999999").exists())
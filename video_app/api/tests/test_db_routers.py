@@ -0,0 +1,116 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import HttpResponse
+from utils import db_routers
+from utils.db_routers import (PIN_COOKIE_NAME, ReplicaPinningMiddleware,
+                              ReplicaRouter, replica_lag_seconds)
+from video_app.models import Video, VideoStreamVariant
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1", "replica_2"])
+@patch("utils.db_routers.replica_is_fresh", return_value=True)
+class ReplicaRouterTest(SimpleTestCase):
+    """Unit tests for ReplicaRouter read/write routing and pinning."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route_in_request(self, method, cookies=None, before_read=None):
+        """Run the middleware around a view that reads Video and return (alias, response)."""
+        routed = {}
+
+        def view(request):
+            if before_read:
+                before_read()
+            routed["alias"] = self.router.db_for_read(Video)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)("/api/video/")
+        request.COOKIES.update(cookies or {})
+        response = ReplicaPinningMiddleware(view)(request)
+        return routed["alias"], response
+
+    def test_reads_outside_requests_use_primary(self, _fresh):
+        """Jobs and commands (no middleware) always read from the primary."""
+        self.assertEqual(self.router.db_for_read(Video), "default")
+
+    def test_request_reads_use_replica(self, _fresh):
+        """Read-only requests route video_app reads to a replica and set no pin cookie."""
+        alias, response = self.route_in_request("get")
+        self.assertIn(alias, ["replica_1", "replica_2"])
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_other_apps_are_not_routed(self, _fresh):
+        """Models outside video_app are left to the default routing."""
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_write_pins_rest_of_request(self, _fresh):
+        """After a write in the request, reads go to the primary and a pin cookie is set."""
+        alias, response = self.route_in_request(
+            "get", before_read=lambda: self.router.db_for_write(VideoStreamVariant))
+        self.assertEqual(alias, "default")
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_pin_cookie_lifetime(self, _fresh):
+        """The pin cookie lives for DB_REPLICA_PIN_SECONDS."""
+        with self.settings(DB_REPLICA_PIN_SECONDS=7):
+            _alias, response = self.route_in_request(
+                "post", before_read=lambda: self.router.db_for_write(Video))
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]["max-age"], 7)
+
+    def test_unsafe_request_reads_from_primary(self, _fresh):
+        """Unsafe requests read from the primary from the start."""
+        for method in ("post", "patch", "delete"):
+            alias, _response = self.route_in_request(method)
+            self.assertEqual(alias, "default")
+
+    def test_post_without_writes_does_not_pin(self, _fresh):
+        """Requests that only touch Redis (e.g. heartbeats) set no pin cookie."""
+        _alias, response = self.route_in_request("post")
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_pin_cookie_secure_only_over_https(self, _fresh):
+        """The pin cookie is marked secure only on https, so it works over http in development."""
+        _alias, response = self.route_in_request(
+            "get", before_read=lambda: self.router.db_for_write(Video))
+        self.assertFalse(response.cookies[PIN_COOKIE_NAME]["secure"])
+
+    def test_pin_cookie_reads_from_primary(self, _fresh):
+        """A client with a pin cookie reads its own writes from the primary."""
+        alias, _response = self.route_in_request(
+            "get", cookies={PIN_COOKIE_NAME: "1"})
+        self.assertEqual(alias, "default")
+
+    def test_stale_replicas_fall_back_to_primary(self, fresh):
+        """Without any replica inside the staleness window, reads use the primary."""
+        fresh.return_value = False
+        alias, _response = self.route_in_request("get")
+        self.assertEqual(alias, "default")
+
+    def test_no_migrations_on_replicas(self, _fresh):
+        """Replicas are never migrated."""
+        self.assertFalse(self.router.allow_migrate("replica_1", "video_app"))
+        self.assertIsNone(self.router.allow_migrate("default", "video_app"))
+
+
+class ReplicaFreshnessTest(TestCase):
+    """Tests for the replica lag check against a real database alias."""
+
+    def setUp(self):
+        db_routers._replica_freshness.clear()
+
+    def test_primary_reports_no_lag(self):
+        """A database that is not in recovery reports zero lag."""
+        self.assertEqual(replica_lag_seconds("default"), 0)
+
+    @override_settings(DB_REPLICA_MAX_LAG_SECONDS=5, DB_REPLICA_LAG_CHECK_INTERVAL=60)
+    def test_freshness_is_cached(self):
+        """The lag is checked once per interval and unreachable replicas count as stale."""
+        with patch("utils.db_routers.replica_lag_seconds", side_effect=Exception("down")) as lag:
+            self.assertFalse(db_routers.replica_is_fresh("replica_1"))
+            self.assertFalse(db_routers.replica_is_fresh("replica_1"))
+        self.assertEqual(lag.call_count, 1)
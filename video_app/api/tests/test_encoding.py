@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+from django.test import SimpleTestCase, override_settings
+from video_app.encoding import (audio_ffmpeg_outputs, hls_ffmpeg_command,
+                                 keyframe_times, measure_complexity,
+                                 rate_control_args,
+                                 sample_windows, segment_boundaries)
+
+
+@override_settings(HLS_SEGMENT_SECONDS=10, HLS_FAST_START_SEGMENTS=4,
+                   HLS_FAST_START_SEGMENT_SECONDS=2, HLS_GOP_SECONDS=2)
+class SegmentationProfileTest(SimpleTestCase):
+    """Unit tests for segment boundaries and the HLS ffmpeg command."""
+
+    def test_fast_start_boundaries(self):
+        """Short leading segments are followed by regular ones."""
+        self.assertEqual(segment_boundaries(35.5), [2, 4, 6, 8, 18, 28])
+
+    def test_uniform_boundaries(self):
+        """Without fast-start segments every segment has the regular length."""
+        self.assertEqual(segment_boundaries(35.5, fast_start_segments=0),
+                         [10, 20, 30])
+
+    def test_short_video(self):
+        """Boundaries never reach past the end of the video."""
+        self.assertEqual(segment_boundaries(5), [2, 4])
+        self.assertEqual(segment_boundaries(1), [])
+
+    def test_keyframe_times(self):
+        """The fixed GOP is merged with the segment boundaries."""
+        self.assertEqual(keyframe_times(9.5, [3, 5]), [0, 2, 3, 4, 5, 6, 8])
+
+    def test_keyframes_forced_at_boundaries(self):
+        """Keyframes are forced at shared times without scene cuts; segments are cut at the boundaries."""
+        command = hls_ffmpeg_command(
+            "in.mp4", Path("/out"), {"height": 720, "bitrate": "2500k"},
+            [2, 4, 14], [0, 2, 4, 14])
+
+        self.assertEqual(command[command.index("-force_key_frames") + 1], "0,2,4,14")
+        self.assertEqual(command[command.index("-sc_threshold") + 1], "0")
+        self.assertEqual(command[command.index("-segment_times") + 1], "2,4,14")
+        self.assertEqual(command[-1], "/out/segment_%05d.ts")
+        self.assertIn("-an", command)
+
+    def test_audio_renditions_share_boundaries(self):
+        """Audio renditions are audio-only outputs cut at the video segment boundaries."""
+        with tempfile.TemporaryDirectory() as tmp:
+            outputs = audio_ffmpeg_outputs(Path(tmp), [
+                {"name": "audio", "bitrate": "128k", "channels": 2},
+                {"name": "audio_low", "bitrate": "48k", "channels": 1},
+            ], [2, 4])
+
+        self.assertEqual(outputs.count("-vn"), 2)
+        self.assertEqual(outputs.count("2,4"), 2)
+        # Low sample rate sources are resampled, so segments stay aligned
+        self.assertEqual(outputs.count("48000"), 2)
+        self.assertEqual(outputs[-1], f"{tmp}/audio_low/segment_%05d.ts")
+
+
+@override_settings(HLS_RATE_CONTROL="capped_crf", HLS_CRF=23,
+                   HLS_MIN_COMPLEXITY_FACTOR=0.4, HLS_MAX_COMPLEXITY_FACTOR=1.5,
+                   HLS_COMPLEXITY_SAMPLE_SECONDS=12, HLS_COMPLEXITY_SAMPLE_WINDOWS=3)
+class RateControlTest(SimpleTestCase):
+    """Unit tests for per-title capped CRF rate control."""
+
+    resolution = {"name": "720p", "height": 720, "bitrate": "2500k"}
+
+    def test_simple_content_gets_lower_cap(self):
+        """Static content is capped below the ladder bitrate."""
+        self.assertEqual(rate_control_args(self.resolution, 0.5),
+                         ["-crf", "23", "-maxrate", "1250k", "-bufsize", "2500k"])
+
+    def test_cap_is_clamped(self):
+        """Caps stay between the minimum and maximum complexity factor."""
+        self.assertEqual(rate_control_args(self.resolution, 0.1)[3], "1000k")
+        self.assertEqual(rate_control_args(self.resolution, 1.5)[3], "3750k")
+
+    def test_very_complex_content_raises_crf(self):
+        """Content beyond the maximum factor is encoded at a higher CRF."""
+        self.assertEqual(rate_control_args(self.resolution, 6.0)[:2], ["-crf", "25"])
+
+    @override_settings(HLS_RATE_CONTROL="bitrate")
+    def test_fixed_bitrate_mode(self):
+        """In bitrate mode the ladder bitrate is used unchanged."""
+        self.assertEqual(rate_control_args(self.resolution, 0.5), ["-b:v", "2500k"])
+
+    def test_sample_windows(self):
+        """Samples are spread over the video; short videos are sampled whole."""
+        self.assertEqual(sample_windows(100), [(24.0, 4.0), (48.0, 4.0), (72.0, 4.0)])
+        self.assertEqual(sample_windows(10), [(0, 10)])
+
+    def test_sub_second_source_has_no_complexity(self):
+        """Sources shorter than a second are not sampled and fall back to the ladder bitrate."""
+        self.assertIsNone(measure_complexity("clip.mp4", 0, {'height': 720, 'bitrate': '2500k'}))
@@ -0,0 +1,113 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.models import Video, VideoStreamVariant, VideoUpload
+from utils.videos import (hls_dir, hls_relative_dir, iter_hls_dirs,
+                          legacy_hls_paths, shard_path, thumbnail_name,
+                          video_upload_to)
+
+User = get_user_model()
+
+
+class MediaLayoutTest(APITestCase):
+    """Unit and integration tests for the sharded media layout and its migration."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.media = Path(self.tmp.name)
+        settings_override = override_settings(MEDIA_ROOT=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, relative, data=b"x"):
+        path = self.media / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def test_sharded_paths(self):
+        """Output, thumbnails and sources are spread over two levels of hashed directories."""
+        shards = shard_path(1234)
+        self.assertRegex(shards, r"^[0-9a-f]{2}/[0-9a-f]{2}$")
+        self.assertEqual(hls_relative_dir(1234), f"hls/{shards}/1234")
+        self.assertEqual(thumbnail_name(1234), f"thumbnails/{shards}/1234_thumb.jpg")
+        self.assertEqual(video_upload_to(None, "clip.mp4"),
+                         f"videos/{shard_path('clip.mp4')}/clip.mp4")
+        self.assertEqual(hls_dir(1234), self.media / hls_relative_dir(1234))
+
+    def test_legacy_output_is_found(self):
+        """Output in the flat layout, which has no master playlist, is used until it is moved."""
+        self.write("hls/1234/360p/segment_00000.ts")
+        self.assertEqual(hls_dir(1234), self.media / hls_relative_dir(1234))
+
+        self.write("hls/1234/360p/index.m3u8")
+        self.assertEqual(hls_dir(1234), self.media / "hls" / "1234")
+
+    def test_legacy_fallback_switched_off(self):
+        """Legacy output is not looked up once migrated, nor with a remote store."""
+        self.write("hls/1234/360p/index.m3u8")
+
+        with override_settings(MEDIA_LEGACY_LAYOUT=False):
+            self.assertEqual(hls_dir(1234), self.media / hls_relative_dir(1234))
+        with override_settings(MEDIA_STORAGE_BACKEND="s3"):
+            self.assertEqual(hls_dir(1234), self.media / hls_relative_dir(1234))
+
+    def test_two_digit_legacy_directory_shared_with_shard(self):
+        """A legacy 'hls/42/' that is also a shard only contributes its non-shard entries."""
+        self.write("hls/42/360p/index.m3u8")
+        self.write("hls/42/720p/index.m3u8")
+        self.write("hls/42/ab/1234/master.m3u8")
+
+        self.assertEqual(sorted(p.name for p in legacy_hls_paths(42)), ["360p", "720p"])
+        self.assertEqual(list(iter_hls_dirs()), [(1234, self.media / "hls/42/ab/1234")])
+
+    def test_migration_moves_media_online(self):
+        """The command moves a video to the sharded layout and its segments stay served."""
+        video = Video.objects.create(title="V", description="d", category="Doku",
+                                     video_file="videos/clip.mp4")
+        Video.objects.filter(pk=video.pk).update(thumbnail_url=f"thumbnails/{video.id}_thumb.jpg")
+        legacy = f"hls/{video.id}"
+        self.write(f"{legacy}/720p/index.m3u8", b"#EXTM3U\n")
+        self.write(f"{legacy}/720p/segment_00000.ts", bytes(range(100)))
+        VideoStreamVariant.objects.create(
+            video=video, resolution="720p",
+            manifest_path=str(self.media / legacy / "720p" / "index.m3u8"))
+        self.write("videos/clip.mp4", b"source")
+        self.write(f"thumbnails/{video.id}_thumb.jpg", b"jpg")
+        upload = VideoUpload.objects.create(
+            user=User.objects.create_user(username="editor", password="test123"),
+            title="V", file_path="videos/clip.mp4", upload_length=6, offset=6, video=video)
+
+        self.client.force_authenticate(user=upload.user)
+        segment_url = reverse("video-segment", kwargs={
+            "movie_id": video.id, "resolution": "720p", "segment": "segment_00000.ts"})
+        self.assertEqual(self.client.get(segment_url).status_code, status.HTTP_200_OK)
+
+        call_command("migrate_media_layout", "--dry-run", stdout=StringIO())
+        self.assertTrue((self.media / legacy).exists())
+
+        out = StringIO()
+        call_command("migrate_media_layout", stdout=out)
+
+        self.assertIn("Moved 1 HLS tree(s), 1 thumbnail(s) and 1 source file(s)", out.getvalue())
+        target = self.media / hls_relative_dir(video.id)
+        # A two-digit 'hls/<id>/' may stay as a shard directory
+        self.assertEqual(legacy_hls_paths(video.id), [])
+        self.assertTrue((target / "720p" / "segment_00000.ts").exists())
+        video.refresh_from_db()
+        upload.refresh_from_db()
+        self.assertEqual(video.thumbnail_url, thumbnail_name(video.id))
+        self.assertEqual(video.video_file.name, video_upload_to(None, "clip.mp4"))
+        self.assertEqual(upload.file_path, video.video_file.name)
+        self.assertEqual(Path(video.video_file.path).read_bytes(), b"source")
+        self.assertEqual(VideoStreamVariant.objects.get().manifest_path,
+                         f"{hls_relative_dir(video.id)}/720p/index.m3u8")
+
+        self.assertEqual(self.client.get(segment_url).status_code, status.HTTP_200_OK)
@@ -0,0 +1,351 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from redis.exceptions import ConnectionError, WatchError
+from rq.job import JobStatus
+from video_app.models import OutboxJob, Video, VideoStreamVariant
+from video_app.playlists import RenditionAlignmentError
+from video_app.tasks import (AUDIO_RENDITION, MAINTENANCE_QUEUE,
+                             dispatch_outbox, finalize_video_processing,
+                             process_all_resolutions, process_video_to_hls,
+                             queue_video_processing, reap_stuck_videos,
+                             schedule_outbox_dispatch,
+                             schedule_stuck_video_reaper,
+                             schedule_watch_progress_flush)
+from utils.videos import hls_relative_dir
+
+
+class OutboxTest(TestCase):
+    """Unit tests for requesting jobs through the outbox and dispatching them to RQ."""
+
+    def create_video(self, title="Upload"):
+        return Video.objects.create(title=title, description="d", category="Doku",
+                                    video_file="videos/upload.mp4")
+
+    @patch("video_app.tasks.django_rq.get_queue")
+    def test_signals_write_outbox_without_redis(self, get_queue):
+        """Creating and deleting videos only writes outbox rows; Redis is not contacted."""
+        video = self.create_video()
+        video_id = video.id
+        video.delete()
+
+        self.assertEqual(
+            list(OutboxJob.objects.order_by("id").values_list("job", "args")),
+            [("process_video", [video_id]), ("refresh_catalog", []),
+             ("delete_media", [video_id, ["videos/upload.mp4"]])])
+        get_queue.assert_not_called()
+
+    def test_video_not_saved_without_outbox_job(self):
+        """A video whose outbox row cannot be written is rolled back with it."""
+        with patch("video_app.signals.OutboxJob.objects.create",
+                   side_effect=DatabaseError("outbox down")):
+            with self.assertRaises(DatabaseError):
+                self.create_video()
+
+        self.assertFalse(Video.objects.exists())
+
+    @patch("video_app.tasks.schedule_periodic_job")
+    def test_periodic_jobs_use_maintenance_queue(self, schedule_periodic_job):
+        """Periodic jobs are scheduled on the maintenance queue, not behind encodes."""
+        schedule_outbox_dispatch()
+        schedule_watch_progress_flush()
+        schedule_stuck_video_reaper()
+
+        self.assertEqual(
+            [call.kwargs["queue_name"] for call in schedule_periodic_job.call_args_list],
+            [MAINTENANCE_QUEUE] * 3)
+
+    @patch("video_app.tasks.Job.fetch_many", return_value=[])
+    @patch("video_app.tasks.django_rq.get_queue")
+    def test_dispatch_in_batches(self, get_queue, _fetch_many):
+        """Pending jobs are enqueued in pipelined batches, duplicates once, and removed."""
+        first, second = self.create_video("A"), self.create_video("B")
+        OutboxJob.objects.create(job="refresh_catalog")
+        OutboxJob.objects.create(job="refresh_catalog")
+        enqueue_many = get_queue.return_value.enqueue_many
+
+        self.assertEqual(dispatch_outbox(batch_size=2), 4)
+
+        self.assertEqual(enqueue_many.call_count, 2)
+        first_batch, second_batch = (call.args[0] for call in enqueue_many.call_args_list)
+        self.assertEqual([job.args for job in first_batch], [[first.id], [second.id]])
+        self.assertEqual(len(second_batch), 1)
+        self.assertEqual(second_batch[0].description, "Catalog snapshot refresh")
+        self.assertFalse(OutboxJob.objects.exists())
+
+    @patch("video_app.tasks.Job.fetch_many", return_value=[])
+    @patch("video_app.tasks.django_rq.get_queue")
+    def test_dispatch_deleted_video(self, get_queue, _fetch_many):
+        """Media deletion jobs (with nested args) are dispatched with the rest of the batch."""
+        video = self.create_video()
+        video_id = video.id
+        video.delete()
+        enqueue_many = get_queue.return_value.enqueue_many
+
+        self.assertEqual(dispatch_outbox(), 3)
+
+        (jobs,), _ = enqueue_many.call_args
+        self.assertEqual([job.args for job in jobs],
+                         [[video_id], None, [video_id, ["videos/upload.mp4"]]])
+        self.assertFalse(OutboxJob.objects.exists())
+
+    @patch("video_app.tasks.Job.fetch_many", return_value=[])
+    @patch("video_app.tasks.django_rq.get_queue")
+    def test_redis_failure_keeps_jobs(self, get_queue, _fetch_many):
+        """If Redis fails, the batch stays in the outbox for the next run."""
+        self.create_video()
+        get_queue.return_value.enqueue_many.side_effect = ConnectionError("down")
+
+        with self.assertRaises(ConnectionError):
+            dispatch_outbox()
+
+        self.assertEqual(OutboxJob.objects.count(), 1)
+
+
+def rq_job(job_id, job_status):
+    job = MagicMock(id=job_id)
+    job.get_status.return_value = job_status
+    return job
+
+
+@override_settings(PROCESSING_HEARTBEAT_INTERVAL=30)
+@patch("video_app.tasks.django_rq.get_queue")
+class VideoProcessingJobTest(TestCase):
+    """Unit tests for deduplicated, per-video processing jobs."""
+
+    @patch("video_app.tasks.Job.fetch_many")
+    def test_job_in_flight_is_returned(self, fetch_many, get_queue):
+        """A video whose job is still queued or running is not enqueued again."""
+        fetch_many.return_value = [rq_job("process-video-7", JobStatus.STARTED)]
+
+        self.assertEqual(queue_video_processing(7), "process-video-7")
+        fetch_many.assert_called_once_with(
+            ["process-video-7"], connection=get_queue.return_value.connection)
+        get_queue.return_value.enqueue_many.assert_not_called()
+
+    @patch("video_app.tasks.Job.fetch_many")
+    def test_finished_job_is_replaced(self, fetch_many, get_queue):
+        """A finished job with the same ID is deleted and the video enqueued again."""
+        finished = rq_job("process-video-7", JobStatus.FINISHED)
+        fetch_many.return_value = [finished]
+        enqueue_many = get_queue.return_value.enqueue_many
+        enqueue_many.return_value = [rq_job("process-video-7", JobStatus.QUEUED)]
+
+        self.assertEqual(queue_video_processing(7), "process-video-7")
+        finished.delete.assert_called_once()
+        (job_data,), _ = enqueue_many.call_args
+        self.assertEqual([data.job_id for data in job_data], ["process-video-7"])
+
+    @patch("video_app.tasks.Job.fetch_many")
+    def test_concurrent_enqueue_is_detected(self, fetch_many, get_queue):
+        """If another dispatcher enqueues the job after the check, the check is repeated."""
+        fetch_many.side_effect = [[], [rq_job("process-video-7", JobStatus.QUEUED)]]
+        pipe = get_queue.return_value.connection.pipeline.return_value.__enter__.return_value
+        pipe.execute.side_effect = [WatchError(), None]
+
+        self.assertEqual(queue_video_processing(7), "process-video-7")
+        pipe.watch.assert_called_with(b"rq:job:process-video-7")
+        self.assertEqual(pipe.watch.call_count, 2)
+        self.assertEqual(pipe.execute.call_count, 2)
+
+    @patch("video_app.tasks.run_video_pipeline")
+    @patch("video_app.tasks.django_rq.get_connection")
+    def test_locked_video_is_skipped(self, get_connection, run_pipeline, _get_queue):
+        """A run that finds the video's processing lock taken does nothing."""
+        lock = get_connection.return_value.lock.return_value
+        lock.acquire.return_value = False
+
+        process_video_to_hls(7)
+
+        get_connection.return_value.lock.assert_called_once_with(
+            "videoflix:video:7:processing", timeout=120)
+        run_pipeline.assert_not_called()
+        lock.release.assert_not_called()
+
+    @patch("video_app.tasks.run_video_pipeline", side_effect=RuntimeError("ffmpeg"))
+    @patch("video_app.tasks.django_rq.get_connection")
+    def test_lock_released_after_failure(self, get_connection, _run_pipeline, _get_queue):
+        """The processing lock is released even if the pipeline fails."""
+        lock = get_connection.return_value.lock.return_value
+        lock.acquire.return_value = True
+
+        with self.assertRaises(RuntimeError):
+            process_video_to_hls(7)
+
+        lock.release.assert_called_once()
+
+
+@patch("video_app.tasks.Job.fetch_many")
+@patch("video_app.tasks.django_rq.get_connection")
+class StuckVideoReaperTest(TestCase):
+    """Unit tests for requeueing videos orphaned in processing."""
+
+    def setUp(self):
+        self.videos = [Video.objects.create(title=f"V{i}", description="d", category="Doku",
+                                            processing_status="processing")
+                       for i in range(4)]
+        OutboxJob.objects.all().delete()
+
+    def test_requeues_videos_without_heartbeat(self, get_connection, fetch_many):
+        """Only videos without lock and without a waiting job are reset and requeued for resume."""
+        running, retrying, dead, lost = self.videos
+        pipe = get_connection.return_value.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [True, False, False, False]
+        dead_job = rq_job(f"process-video-{dead.id}", JobStatus.STARTED)
+        fetch_many.return_value = [
+            rq_job(f"process-video-{running.id}", JobStatus.STARTED),
+            rq_job(f"process-video-{retrying.id}", JobStatus.SCHEDULED),
+            dead_job,
+            None,
+        ]
+
+        self.assertEqual(reap_stuck_videos(), [dead.id, lost.id])
+
+        dead_job.delete.assert_called_once()
+        for video in self.videos:
+            video.refresh_from_db()
+        self.assertEqual([v.processing_status for v in self.videos],
+                         ["processing", "processing", "pending", "pending"])
+        self.assertEqual([v.processing_restarts for v in self.videos], [0, 0, 1, 1])
+        self.assertEqual(
+            list(OutboxJob.objects.order_by("id").values_list("job", "args")),
+            [("process_video", [dead.id, True]), ("process_video", [lost.id, True])])
+
+    @override_settings(PROCESSING_MAX_RESTARTS=2)
+    def test_gives_up_after_max_restarts(self, get_connection, fetch_many):
+        """A video interrupted again after its last allowed restart is marked failed, not requeued."""
+        Video.objects.filter(pk=self.videos[0].pk).update(processing_restarts=2)
+        Video.objects.filter(pk=self.videos[1].pk).update(processing_restarts=1)
+        pipe = get_connection.return_value.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [False, False, True, True]
+        fetch_many.return_value = [None] * 4
+
+        self.assertEqual(reap_stuck_videos(), [self.videos[1].id])
+
+        exhausted, retried = (Video.objects.get(pk=v.pk) for v in self.videos[:2])
+        self.assertEqual((exhausted.processing_status, exhausted.processing_restarts),
+                         ("failed", 2))
+        self.assertIn("giving up", exhausted.processing_error)
+        self.assertEqual((retried.processing_status, retried.processing_restarts),
+                         ("pending", 2))
+        self.assertEqual(list(OutboxJob.objects.values_list("args", flat=True)),
+                         [[self.videos[1].id, True]])
+
+
+@override_settings(HLS_RATE_CONTROL="bitrate")
+@patch("video_app.tasks.get_audio_renditions", return_value=[])
+@patch("video_app.tasks.process_resolution")
+class ResumeProcessingTest(TestCase):
+    """Unit tests for resuming an interrupted pipeline."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_dir = Path(self.tmp.name)
+        self.video = Video.objects.create(title="V", description="d", category="Doku",
+                                          duration_seconds=30)
+        for name in ("360p", "480p"):
+            (self.output_dir / name).mkdir()
+            (self.output_dir / name / "index.m3u8").write_text("#EXTM3U\n")
+            VideoStreamVariant.objects.create(
+                video=self.video, resolution=name,
+                manifest_path=str(self.output_dir / name / "index.m3u8"))
+        # Registered, but its playlist is gone: encoded again
+        VideoStreamVariant.objects.create(video=self.video, resolution="720p",
+                                          manifest_path="missing.m3u8")
+
+    def encoded(self, process_resolution):
+        return [call.args[4]["name"] for call in process_resolution.call_args_list]
+
+    def with_extras(self, process_resolution):
+        return [call.args[4]["name"] for call in process_resolution.call_args_list
+                if call.args[8]]
+
+    def test_resume_keeps_completed_resolutions(self, process_resolution, _audio):
+        """Resolutions a previous run completed are not encoded again; the first one encoded writes the extras."""
+        process_all_resolutions(self.video, "in.mp4", self.output_dir,
+                                self.output_dir / "scratch", resume=True)
+        self.assertEqual(self.encoded(process_resolution), ["720p", "1080p"])
+        self.assertEqual(self.with_extras(process_resolution), ["720p"])
+        self.assertTrue((self.output_dir / "trickplay" / "thumbnails.vtt").exists())
+
+    def test_resume_keeps_published_extras(self, process_resolution, _audio):
+        """Extras a previous run published are not written again."""
+        (self.output_dir / "trickplay").mkdir()
+        (self.output_dir / "trickplay" / "thumbnails.vtt").write_text("WEBVTT\n")
+
+        process_all_resolutions(self.video, "in.mp4", self.output_dir,
+                                self.output_dir / "scratch", resume=True)
+        self.assertEqual(self.with_extras(process_resolution), [])
+
+    def test_resume_rewrites_missing_extras(self, process_resolution, _audio):
+        """With every resolution complete but the extras missing, the lowest is encoded again."""
+        for name in ("720p", "1080p"):
+            (self.output_dir / name).mkdir()
+            (self.output_dir / name / "index.m3u8").write_text("#EXTM3U\n")
+        VideoStreamVariant.objects.filter(resolution="720p").update(
+            manifest_path=str(self.output_dir / "720p" / "index.m3u8"))
+        VideoStreamVariant.objects.create(
+            video=self.video, resolution="1080p",
+            manifest_path=str(self.output_dir / "1080p" / "index.m3u8"))
+
+        process_all_resolutions(self.video, "in.mp4", self.output_dir,
+                                self.output_dir / "scratch", resume=True)
+        self.assertEqual(self.encoded(process_resolution), ["360p"])
+        self.assertEqual(self.with_extras(process_resolution), ["360p"])
+
+    def test_fresh_run_encodes_everything(self, process_resolution, _audio):
+        """Without resume, every resolution is encoded."""
+        process_all_resolutions(self.video, "in.mp4", self.output_dir,
+                                self.output_dir / "scratch")
+        self.assertEqual(self.encoded(process_resolution),
+                         ["360p", "480p", "720p", "1080p"])
+
+
+@patch("video_app.tasks.queue_catalog_refresh")
+@patch("video_app.tasks.register_thumbnail")
+class FinalizeProcessingTest(TestCase):
+    """Unit tests for the final step of the pipeline."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.video = Video.objects.create(title="V", description="d", category="Doku",
+                                          duration_seconds=4)
+        self.output_name = hls_relative_dir(self.video.id)
+        for name in ("360p", "480p", "720p", "1080p", "audio"):
+            self.write_rendition(name, 2.0, 2.0)
+
+    def write_rendition(self, name, *durations):
+        rendition_dir = Path(self.tmp.name) / self.output_name / name
+        rendition_dir.mkdir(parents=True, exist_ok=True)
+        entries = "".join(f"#EXTINF:{d},\nsegment_{i:05d}.ts\n"
+                          for i, d in enumerate(durations))
+        (rendition_dir / "index.m3u8").write_text(f"#EXTM3U\n{entries}#EXT-X-ENDLIST\n")
+        VideoStreamVariant.objects.update_or_create(
+            video=self.video, resolution=name,
+            defaults={"manifest_path": f"{self.output_name}/{name}/index.m3u8"})
+
+    def test_variants_not_produced_are_dropped(self, _thumbnail, _refresh):
+        """Audio variants of a previous run are not advertised when the source has no audio any more."""
+        finalize_video_processing(self.video, self.output_name,
+                                  Path(self.tmp.name) / "scratch", audio_renditions=[])
+
+        self.assertFalse(self.video.variants.filter(resolution="audio").exists())
+        master = (Path(self.tmp.name) / self.output_name / "master.m3u8").read_text()
+        self.assertNotIn("AUDIO", master)
+        self.assertEqual(Video.objects.get().processing_status, "completed")
+
+    def test_misaligned_audio_rejected(self, _thumbnail, _refresh):
+        """Audio renditions whose segments do not line up with the video fail the check."""
+        self.write_rendition("audio", 2.5, 1.5)
+
+        with self.assertRaises(RenditionAlignmentError):
+            finalize_video_processing(self.video, self.output_name,
+                                      Path(self.tmp.name) / "scratch",
+                                      audio_renditions=[AUDIO_RENDITION])
@@ -0,0 +1,289 @@
+import tempfile
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.models import Video, VideoStreamVariant
+from video_app.mpegts import probe_codecs, scan_keyframes
+from video_app.playlists import (RenditionAlignmentError,
+                                 build_master_playlist, peak_bandwidth,
+                                 read_playlist_entries, rendition_stats,
+                                 verify_rendition_alignment,
+                                 write_iframe_playlist)
+from utils.videos import hls_relative_dir
+
+User = get_user_model()
+
+PAT = bytes.fromhex("474000100000b00d0001c100000001e10000000000")
+PMT = bytes.fromhex("474100100002b0120001c10000e101f0001be101f00000000000")
+# H.264 video on PID 0x101 and ADTS AAC audio on PID 0x102
+PMT_AV = bytes.fromhex(
+    "474100100002b0170001c10000e101f0001be101f0000fe102f00000000000")
+
+
+def ts_packet(packet, size=188):
+    return packet + b"\xff" * (size - len(packet))
+
+
+def pes_pts(seconds):
+    p = round(seconds * 90000)
+    return bytes([0x21 | ((p >> 29) & 0x0E), (p >> 22) & 0xFF,
+                  ((p >> 14) & 0xFE) | 1, (p >> 7) & 0xFF, ((p << 1) & 0xFE) | 1])
+
+
+def video_start(seconds, keyframe):
+    pes = b"\x00\x00\x01\xe0\x00\x00\x80\x80\x05" + pes_pts(seconds)
+    if keyframe:
+        return ts_packet(bytes.fromhex("4741013001") + b"\x40" + pes)
+    return ts_packet(bytes.fromhex("47410110") + pes)
+
+
+CONTINUATION = ts_packet(bytes.fromhex("47010111"))
+
+
+def write_segment(path, *packets, pmt=PMT):
+    path.write_bytes(ts_packet(PAT) + ts_packet(pmt) + b"".join(packets))
+
+
+def media_segment(path):
+    """A segment with an H.264 High@3.1 keyframe (AUD + SPS) and an AAC-LC ADTS frame."""
+    video = (bytes.fromhex("4741013001") + b"\x40" + b"\x00\x00\x01\xe0\x00\x00\x80\x80\x05"
+             + pes_pts(1.4) + bytes.fromhex("0000000109f0000000016764001facd9"))
+    audio = (bytes.fromhex("47410210") + b"\x00\x00\x01\xc0\x00\x00\x80\x80\x05"
+             + pes_pts(1.4) + bytes.fromhex("fff150802e7ffc"))
+    write_segment(path, ts_packet(video), ts_packet(audio), pmt=PMT_AV)
+
+
+class KeyframeScanTest(SimpleTestCase):
+    """Unit tests for keyframe detection in transport stream segments."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def test_scan_keyframes(self):
+        """Random access PES packets are found with their PTS and byte range."""
+        segment = self.dir / "segment_00000.ts"
+        write_segment(segment,
+                      video_start(1.5, True), CONTINUATION,
+                      video_start(1.54, False),
+                      video_start(3.5, True), CONTINUATION, CONTINUATION)
+
+        self.assertEqual(scan_keyframes(segment),
+                         [(1.5, 376, 376), (3.5, 940, 564)])
+
+    def test_write_iframe_playlist(self):
+        """I-frames reference byte ranges of the existing segments and last until the next I-frame."""
+        write_segment(self.dir / "segment_00000.ts",
+                      video_start(1.4, True), CONTINUATION)
+        write_segment(self.dir / "segment_00001.ts",
+                      video_start(11.4, True), CONTINUATION, CONTINUATION)
+        (self.dir / "index.m3u8").write_text(
+            "#EXTM3U\n#EXTINF:10.0,\nsegment_00000.ts\n"
+            "#EXTINF:4.0,\nsegment_00001.ts\n#EXT-X-ENDLIST\n")
+
+        iframe_path = write_iframe_playlist(self.dir)
+        playlist = iframe_path.read_text()
+
+        self.assertIn("#EXT-X-I-FRAMES-ONLY", playlist)
+        self.assertIn("#EXT-X-VERSION:5", playlist)
+        self.assertIn('#EXT-X-MAP:URI="segment_00000.ts",BYTERANGE="376@0"\n'
+                      '#EXTINF:10.000000,', playlist)
+        self.assertIn('#EXT-X-MAP:URI="segment_00001.ts",BYTERANGE="376@0"', playlist)
+        self.assertEqual(read_playlist_entries(iframe_path), [
+            ("segment_00000.ts", 10.0, (376, 376)),
+            ("segment_00001.ts", 4.0, (564, 376)),
+        ])
+        self.assertEqual(peak_bandwidth(iframe_path), 1128)
+
+    def test_probe_codecs(self):
+        """Codec strings are read from the SPS and the ADTS header."""
+        segment = self.dir / "segment_00000.ts"
+        media_segment(segment)
+        self.assertEqual(probe_codecs(segment), ["avc1.64001f", "mp4a.40.2"])
+
+
+class RenditionStatsTest(SimpleTestCase):
+    """Unit tests for rendition statistics and the master playlist built from them."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+
+    def write_rendition(self, name, *sizes, iframes=False):
+        rendition_dir = self.dir / name
+        rendition_dir.mkdir()
+        entries = ""
+        for i, size in enumerate(sizes):
+            (rendition_dir / f"segment_{i:05d}.ts").write_bytes(b"\0" * size)
+            entries += f"#EXTINF:2.0,\nsegment_{i:05d}.ts\n"
+        (rendition_dir / "index.m3u8").write_text(f"#EXTM3U\n{entries}#EXT-X-ENDLIST\n")
+        if iframes:
+            (rendition_dir / "iframes.m3u8").write_text(
+                "#EXTM3U\n#EXT-X-I-FRAMES-ONLY\n#EXTINF:2.0,\n"
+                "#EXT-X-BYTERANGE:100@376\nsegment_00000.ts\n#EXT-X-ENDLIST\n")
+        return VideoStreamVariant(resolution=name, **rendition_stats(rendition_dir))
+
+    def test_rendition_stats(self):
+        """Peak and average bitrate, size, segment count and codecs are measured."""
+        rendition_dir = self.dir / "720p"
+        rendition_dir.mkdir()
+        media_segment(rendition_dir / "segment_00000.ts")
+        (rendition_dir / "segment_00001.ts").write_bytes(b"\0" * 376)
+        (rendition_dir / "index.m3u8").write_text(
+            "#EXTM3U\n#EXTINF:2.0,\nsegment_00000.ts\n"
+            "#EXTINF:2.0,\nsegment_00001.ts\n#EXT-X-ENDLIST\n")
+
+        self.assertEqual(rendition_stats(rendition_dir), {
+            "peak_bitrate": 3008,
+            "average_bitrate": 2256,
+            "total_bytes": 1128,
+            "segment_count": 2,
+            "codecs": "avc1.64001f,mp4a.40.2",
+        })
+
+    def test_master_playlist_advertises_iframe_playlists(self):
+        """Each rendition is listed with its measured bandwidth and I-frame playlist."""
+        variant = self.write_rendition("360p", 1000, 500, iframes=True)
+        variant.codecs = "avc1.64001e"
+
+        lines = build_master_playlist(self.dir, [variant]).splitlines()
+
+        self.assertEqual(lines[2:], [
+            '#EXT-X-STREAM-INF:BANDWIDTH=4000,AVERAGE-BANDWIDTH=3000,CODECS="avc1.64001e"',
+            "360p/index.m3u8",
+            '#EXT-X-I-FRAME-STREAM-INF:BANDWIDTH=400,CODECS="avc1.64001e",'
+            'URI="360p/iframes.m3u8"',
+        ])
+
+    def test_master_playlist_with_audio_group(self):
+        """Video renditions reference the shared audio group; the audio-only stream is a separate variant."""
+        video = self.write_rendition("360p", 1000)
+        audio = self.write_rendition("audio", 500)
+        audio_only = self.write_rendition("audio_low", 100)
+        video.codecs, audio.codecs, audio_only.codecs = "avc1.64001e", "mp4a.40.2", "mp4a.40.2"
+
+        lines = build_master_playlist(self.dir, [video], audio, audio_only).splitlines()
+
+        self.assertEqual(lines[2:], [
+            '#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="Default",'
+            'DEFAULT=YES,AUTOSELECT=YES,URI="audio/index.m3u8"',
+            '#EXT-X-STREAM-INF:BANDWIDTH=6000,AVERAGE-BANDWIDTH=6000,'
+            'CODECS="avc1.64001e,mp4a.40.2",AUDIO="audio"',
+            "360p/index.m3u8",
+            '#EXT-X-STREAM-INF:BANDWIDTH=400,AVERAGE-BANDWIDTH=400,CODECS="mp4a.40.2"',
+            "audio_low/index.m3u8",
+        ])
+
+
+class RenditionAlignmentTest(SimpleTestCase):
+    """Unit tests for the cross-rendition segment alignment check."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.dir = Path(self.tmp.name)
+        self.write_rendition("360p", [2.08, 2.0, 7.0])
+
+    def write_rendition(self, name, durations):
+        rendition_dir = self.dir / name
+        rendition_dir.mkdir()
+        entries = "".join(f"#EXTINF:{d:f},\nsegment_{i:05d}.ts\n"
+                          for i, d in enumerate(durations))
+        (rendition_dir / "index.m3u8").write_text(
+            f"#EXTM3U\n{entries}#EXT-X-ENDLIST\n")
+
+    def test_aligned_renditions(self):
+        """Renditions with matching segments pass."""
+        self.write_rendition("1080p", [2.083, 2.0, 7.0])
+        verify_rendition_alignment(self.dir, ["360p", "1080p"])
+
+    def test_segment_count_mismatch(self):
+        """A different number of segments is rejected."""
+        self.write_rendition("1080p", [2.08, 9.0])
+        with self.assertRaisesMessage(RenditionAlignmentError, "1080p has 2 segments"):
+            verify_rendition_alignment(self.dir, ["360p", "1080p"])
+
+    def test_segment_duration_mismatch(self):
+        """Drifting segment boundaries are rejected."""
+        self.write_rendition("1080p", [2.08, 2.5, 6.5])
+        with self.assertRaisesMessage(RenditionAlignmentError, "Segment 1 of 1080p"):
+            verify_rendition_alignment(self.dir, ["360p", "1080p"])
+
+    def test_audio_cut_at_frame_boundaries(self):
+        """Audio resampled to 48 kHz may be off by up to one AAC frame at each boundary."""
+        frame = 0.9 * 1024 / 48000
+        self.write_rendition("audio", [2.08 + frame, 2.0 - 2 * frame, 7.0 + frame])
+        verify_rendition_alignment(self.dir, ["360p"], ["audio"])
+
+    def test_low_sample_rate_audio_needs_resampling(self):
+        """Frames of a 16 kHz source (64 ms) would exceed the tolerance without resampling."""
+        frame = 0.9 * 1024 / 16000
+        self.write_rendition("audio", [2.08 + frame, 2.0 - 2 * frame, 7.0 + frame])
+        with self.assertRaisesMessage(RenditionAlignmentError, "Segment 0 of audio"):
+            verify_rendition_alignment(self.dir, ["360p"], ["audio"])
+
+
+class PlaylistViewTest(APITestCase):
+    """Integration tests for master and I-frame playlists and ranged segment requests."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = User.objects.create_user(
+            username="scrubber", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.video = Video.objects.create(
+            title="Testvideo", description="Beschreibung", category="Doku")
+
+        video_dir = Path(self.tmp.name) / hls_relative_dir(self.video.id)
+        rendition_dir = video_dir / "720p"
+        rendition_dir.mkdir(parents=True)
+        (video_dir / "master.m3u8").write_text("#EXTM3U\n")
+        (rendition_dir / "index.m3u8").write_text("#EXTM3U\n")
+        (rendition_dir / "iframes.m3u8").write_text(
+            "#EXTM3U\n#EXT-X-I-FRAMES-ONLY\n")
+        (rendition_dir / "segment_00000.ts").write_bytes(bytes(range(100)))
+        VideoStreamVariant.objects.create(
+            video=self.video, resolution="720p",
+            manifest_path=str(rendition_dir / "index.m3u8"))
+
+        settings_override = override_settings(MEDIA_ROOT=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def segment_url(self):
+        return reverse("video-segment", kwargs={
+            "movie_id": self.video.id, "resolution": "720p",
+            "segment": "segment_00000.ts"})
+
+    def test_master_and_iframe_playlists(self):
+        """200 OK: Master and I-frame playlists are served as HLS playlists."""
+        master = self.client.get(reverse(
+            "video-master-playlist", kwargs={"movie_id": self.video.id}))
+        iframes = self.client.get(reverse("video-iframe-manifest", kwargs={
+            "movie_id": self.video.id, "resolution": "720p"}))
+
+        self.assertEqual(master.status_code, status.HTTP_200_OK)
+        self.assertEqual(iframes["Content-Type"], "application/vnd.apple.mpegurl")
+        self.assertIn(b"#EXT-X-I-FRAMES-ONLY", b"".join(iframes.streaming_content))
+
+    def test_segment_byte_range(self):
+        """206 Partial Content: A single byte range of a segment is returned."""
+        response = self.client.get(self.segment_url(), HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.content, bytes(range(10, 20)))
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+
+    def test_segment_unsatisfiable_range(self):
+        """416 Range Not Satisfiable: Ranges beyond the end of the segment are rejected."""
+        response = self.client.get(self.segment_url(), HTTP_RANGE="bytes=100-")
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response["Content-Range"], "bytes */100")
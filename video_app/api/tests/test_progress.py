@@ -0,0 +1,251 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.catalog import build_catalog_blobs
+from video_app.models import UserWatchProgress, Video
+from video_app.progress import (MAX_POSITION_SECONDS, PROGRESS_FLUSHING_KEY,
+                                flush_progress, parse_progress_entry,
+                                progress_by_video, upsert_progress_entries)
+
+User = get_user_model()
+
+
+class WatchProgressViewTest(APITestCase):
+    """Integration tests for the WatchProgressView heartbeat endpoint."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="watcher", password="test123")
+        self.video = Video.objects.create(
+            title="Testvideo", description="Beschreibung", category="Doku")
+        self.url = reverse("video-progress", kwargs={"movie_id": self.video.id})
+
+    def test_requires_authentication(self):
+        """401 Unauthorized: Anonymous users cannot send heartbeats."""
+        response = self.client.post(
+            self.url, {"position": 10, "resolution": "720p"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @patch("video_app.api.views.record_heartbeat")
+    def test_heartbeat_is_buffered(self, record_heartbeat):
+        """204 No Content: The heartbeat goes to Redis only, without database writes."""
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                self.url, {"position": 42, "resolution": "720p"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        record_heartbeat.assert_called_once_with(
+            self.user.id, self.video.id, 42, "720p")
+        self.assertFalse(UserWatchProgress.objects.exists())
+
+    @patch("video_app.api.views.record_heartbeat")
+    def test_invalid_heartbeat(self, record_heartbeat):
+        """400 Bad Request: Negative positions and unknown resolutions are rejected."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.url, {"position": -1, "resolution": "4k"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("position", response.data)
+        self.assertIn("resolution", response.data)
+        record_heartbeat.assert_not_called()
+
+    @patch("video_app.api.views.record_heartbeat")
+    def test_position_beyond_column_range(self, record_heartbeat):
+        """400 Bad Request: Positions the database cannot store are rejected."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            self.url, {"position": MAX_POSITION_SECONDS + 1, "resolution": "720p"},
+            format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        record_heartbeat.assert_not_called()
+
+
+class ProgressFlushTest(TestCase):
+    """Unit tests for writing buffered heartbeats to UserWatchProgress."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="watcher", password="test123")
+        self.video = Video.objects.create(
+            title="Testvideo", description="Beschreibung", category="Doku")
+        self.timestamp = int(timezone.now().timestamp())
+
+    def entry(self, position, video_id=None, user_id=None):
+        return parse_progress_entry(
+            f"{user_id or self.user.id}:{video_id or self.video.id}".encode(),
+            f"{position}|720p|{self.timestamp}".encode(),
+        )
+
+    def test_parse_entry(self):
+        """Buffered hash entries are parsed into typed values."""
+        user_id, video_id, position, resolution, updated_at = self.entry(90)
+        self.assertEqual((user_id, video_id, position, resolution),
+                         (self.user.id, self.video.id, 90, "720p"))
+        self.assertAlmostEqual(updated_at, timezone.now(),
+                               delta=timedelta(seconds=5))
+
+    def test_parse_rejects_out_of_range_position(self):
+        """Buffered positions the database cannot store are malformed."""
+        with self.assertRaises(ValueError):
+            self.entry(MAX_POSITION_SECONDS + 1)
+
+    @patch("video_app.progress.get_redis_connection")
+    def test_flush_skips_unwritable_entries(self, get_redis_connection):
+        """An entry the database rejects is skipped; the others are written and the hash is drained."""
+        other = Video.objects.create(title="Other", description="d", category="Doku")
+        conn = get_redis_connection.return_value
+        conn.exists.return_value = True
+        conn.hscan_iter.return_value = [
+            (f"{self.user.id}:{self.video.id}".encode(), f"10|720p|{self.timestamp}".encode()),
+            (f"{self.user.id}:{other.id}".encode(), f"20|{'x' * 20}|{self.timestamp}".encode()),
+        ]
+
+        with self.assertLogs("video_app.progress", "WARNING"):
+            self.assertEqual(flush_progress(), 1)
+
+        self.assertEqual(UserWatchProgress.objects.get().video, self.video)
+        conn.delete.assert_called_once_with(PROGRESS_FLUSHING_KEY)
+
+    def test_upsert_inserts_and_updates(self):
+        """Existing rows are updated in place instead of duplicated."""
+        self.assertEqual(upsert_progress_entries([self.entry(10)]), 1)
+        with self.assertNumQueries(3):
+            upsert_progress_entries([self.entry(25)])
+
+        progress = UserWatchProgress.objects.get()
+        self.assertEqual(progress.last_position_seconds, 25)
+
+    def test_upsert_keeps_heartbeat_time(self):
+        """updated_at is the time of the heartbeat, not of the flush."""
+        self.timestamp -= 3600
+        upsert_progress_entries([self.entry(10)])
+
+        self.assertEqual(UserWatchProgress.objects.get().updated_at.timestamp(),
+                         self.timestamp)
+
+    def test_upsert_drops_unknown_videos_and_duplicates(self):
+        """Entries for deleted videos are skipped and duplicate keys collapse to one row."""
+        written = upsert_progress_entries([
+            self.entry(10), self.entry(20), self.entry(5, video_id=999999),
+        ])
+        self.assertEqual(written, 1)
+        self.assertEqual(UserWatchProgress.objects.get().last_position_seconds, 20)
+
+
+class ContinueWatchingViewTest(APITestCase):
+    """Integration tests for the ContinueWatchingView endpoint."""
+
+    def setUp(self):
+        self.url = reverse("video-continue")
+        self.user = User.objects.create_user(
+            username="watcher", password="test123")
+        self.other = User.objects.create_user(
+            username="other", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.first = Video.objects.create(
+            title="First", description="a", category="Doku", duration_seconds=600)
+        self.second = Video.objects.create(
+            title="Second", description="b", category="Doku")
+        self.finished = Video.objects.create(
+            title="Finished", description="c", category="Doku", duration_seconds=100)
+
+    def watch(self, video, position, resolution="720p", user=None):
+        return UserWatchProgress.objects.create(
+            user=user or self.user, video=video,
+            resolution=resolution, last_position_seconds=position)
+
+    def test_in_progress_videos_latest_first(self):
+        """200 OK: In-progress videos are listed by last activity in a single query."""
+        self.watch(self.first, 60)
+        self.watch(self.second, 30)
+        self.watch(self.finished, 99)
+        self.watch(self.first, 10, user=self.other)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([v["id"] for v in response.data],
+                         [self.second.id, self.first.id])
+        self.assertEqual(response.data[1]["last_position_seconds"], 60)
+        self.assertIn("watched_at", response.data[0])
+
+    def test_resolution_switch_updates_single_row(self):
+        """Heartbeats at another resolution update the same row and keep the last resolution."""
+        timestamp = int(timezone.now().timestamp())
+        upsert_progress_entries([parse_progress_entry(
+            f"{self.user.id}:{self.first.id}", f"60|360p|{timestamp}")])
+        upsert_progress_entries([parse_progress_entry(
+            f"{self.user.id}:{self.first.id}", f"120|1080p|{timestamp}")])
+
+        progress = UserWatchProgress.objects.get(user=self.user)
+        self.assertEqual(progress.resolution, "1080p")
+        self.assertEqual(progress.last_position_seconds, 120)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data[0]["last_position_seconds"], 120)
+
+
+class ProgressOverlayTest(APITestCase):
+    """Integration tests for the ?with_progress=true catalog overlay."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="watcher", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.watched = Video.objects.create(
+            title="Ocean Watched", description="a", category="Doku")
+        self.unwatched = Video.objects.create(
+            title="Ocean Unwatched", description="b", category="Doku")
+        UserWatchProgress.objects.create(
+            user=self.user, video=self.watched, resolution="720p",
+            last_position_seconds=75)
+
+    def test_list_overlay_from_snapshot(self):
+        """200 OK: The snapshot list gets per-user positions from one query."""
+        blob = build_catalog_blobs()["list"]
+        with patch("video_app.api.views.get_catalog_blob", return_value=blob), \
+                self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("video-list"), {"with_progress": "true"})
+
+        positions = {v["id"]: v["last_position_seconds"] for v in response.data}
+        self.assertEqual(positions, {self.watched.id: 75, self.unwatched.id: None})
+
+    def test_search_overlay(self):
+        """200 OK: Search results carry the user's positions when requested."""
+        response = self.client.get(
+            reverse("video-search"), {"q": "ocean", "with_progress": "1"})
+
+        positions = {v["id"]: v["last_position_seconds"]
+                     for v in response.data["results"]}
+        self.assertEqual(positions, {self.watched.id: 75, self.unwatched.id: None})
+
+    def test_overlay_reads_only_listed_videos(self):
+        """Only the progress rows of the items on the page are loaded."""
+        other = Video.objects.create(title="Other", description="c", category="Doku")
+        UserWatchProgress.objects.create(
+            user=self.user, video=other, resolution="720p", last_position_seconds=5)
+
+        self.assertEqual(progress_by_video(self.user, [self.watched.id, self.unwatched.id]),
+                         {self.watched.id: 75})
+
+    def test_list_overlay_reads_rows_by_user(self):
+        """The unpaginated list reads the user's rows without an IN list of the whole catalog."""
+        blob = build_catalog_blobs()["list"]
+        with patch("video_app.api.views.get_catalog_blob", return_value=blob), \
+                CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("video-list"), {"with_progress": "true"})
+
+        self.assertNotIn(" IN (", queries[0]["sql"])
+        self.assertEqual(progress_by_video(self.user), {self.watched.id: 75})
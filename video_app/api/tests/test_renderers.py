@@ -0,0 +1,47 @@
+import datetime
+import uuid
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from utils.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """Unit tests for FastJSONRenderer output compatibility with JSONRenderer."""
+
+    def assertSameOutput(self, data):
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_datetimes(self):
+        """UTC, offset, naive and microsecond datetimes render like JSONRenderer."""
+        utc = datetime.datetime(2025, 8, 14, 10, 21, 5, tzinfo=datetime.timezone.utc)
+        self.assertSameOutput({
+            "utc": utc,
+            "zoneinfo_utc": utc.astimezone(ZoneInfo("UTC")),
+            "micro": utc.replace(microsecond=123456),
+            "berlin": utc.astimezone(ZoneInfo("Europe/Berlin")),
+            "naive": datetime.datetime(2025, 8, 14, 10, 21, 5),
+            "date": datetime.date(2025, 8, 14),
+        })
+
+    def test_catalog_like_payload(self):
+        """Nested lists, None, unicode and line separators render like JSONRenderer."""
+        self.assertSameOutput([
+            {"id": 1, "title": "Café Ünïcode\u2028line\u2029break", "thumbnail_url": None},
+            {"id": 2, "title": "Plain", "tags": ["a", "b"]},
+        ])
+
+    def test_types_handled_by_drf_encoder(self):
+        """Decimal, UUID and lazy strings render like JSONRenderer."""
+        self.assertSameOutput({
+            "price": Decimal("1.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "label": gettext_lazy("Videos"),
+        })
+
+    def test_none_renders_empty(self):
+        """None renders as an empty body, like JSONRenderer."""
+        self.assertEqual(FastJSONRenderer().render(None), b"")
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from pathlib import Path
+from django.test import SimpleTestCase, override_settings
+from video_app.scratch import publish_directory, scratch_directory
+
+
+class ScratchSpaceTest(SimpleTestCase):
+    """Unit tests for encoding in scratch space and publishing finished output."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        settings_override = override_settings(HLS_SCRATCH_DIR=str(self.root / "scratch"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_scratch_removed_on_failure(self):
+        """The scratch directory of a failed run is removed."""
+        with self.assertRaises(RuntimeError):
+            with scratch_directory(7) as scratch_dir:
+                (scratch_dir / "360p").mkdir()
+                raise RuntimeError("ffmpeg")
+
+        self.assertFalse(scratch_dir.exists())
+
+    def test_stale_scratch_of_video_removed(self):
+        """Leftovers of a killed run of the same video are removed; other videos are untouched."""
+        stale = self.root / "scratch" / "video-7-killed"
+        other = self.root / "scratch" / "video-70-running"
+        stale.mkdir(parents=True)
+        other.mkdir()
+
+        with scratch_directory(7) as scratch_dir:
+            self.assertTrue(scratch_dir.name.startswith("video-7-"))
+            self.assertFalse(stale.exists())
+        self.assertTrue(other.exists())
+
+    def publish(self, target, *names):
+        source = self.root / "scratch" / target.name
+        source.mkdir(parents=True)
+        for name in names:
+            (source / name).write_text("#EXTM3U\n")
+        return publish_directory(source, target)
+
+    def test_publish_replaces_previous_version(self):
+        """A published directory replaces the previous version as a whole."""
+        target = self.root / "hls" / "7" / "360p"
+        target.mkdir(parents=True)
+        (target / "segment_00009.ts").write_bytes(b"old")
+
+        self.publish(target, "index.m3u8")
+
+        self.assertEqual(sorted(p.name for p in target.iterdir()), ["index.m3u8"])
+        self.assertFalse((self.root / "scratch" / "360p").exists())
+        self.assertTrue(target.is_symlink())
+        self.assertEqual([p.name for p in target.parent.iterdir() if p != target],
+                         [os.readlink(target)])
+
+    def test_republish_swaps_symlink(self):
+        """Publishing again points the symlink at a new version and removes the old one."""
+        target = self.root / "hls" / "7" / "360p"
+        self.publish(target, "index.m3u8")
+        first = os.readlink(target)
+
+        self.publish(target, "index.m3u8", "iframes.m3u8")
+
+        self.assertNotEqual(os.readlink(target), first)
+        self.assertEqual(sorted(p.name for p in target.iterdir()),
+                         ["iframes.m3u8", "index.m3u8"])
+        self.assertEqual(sorted(p.name for p in target.parent.iterdir()),
+                         sorted(["360p", os.readlink(target)]))
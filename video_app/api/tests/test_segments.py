@@ -0,0 +1,119 @@
+import tempfile
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.models import Video, VideoStreamVariant
+from video_app.segments import (locate_segment, pack_durations,
+                                parse_segment_durations, store_segment_index,
+                                unpack_durations)
+
+User = get_user_model()
+
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:10
+#EXT-X-MEDIA-SEQUENCE:0
+#EXTINF:10.010000,
+segment_00000.ts
+#EXTINF:9.990000,
+segment_00001.ts
+#EXTINF:4.500000,
+segment_00002.ts
+#EXT-X-ENDLIST
+"""
+
+
+def write_playlist(directory):
+    path = Path(directory) / "index.m3u8"
+    path.write_text(PLAYLIST)
+    return path
+
+
+class SegmentIndexTest(SimpleTestCase):
+    """Unit tests for parsing, packing and querying the segment index."""
+
+    def test_parse_and_pack(self):
+        """Durations are parsed from #EXTINF and packed as 4-byte milliseconds."""
+        with tempfile.TemporaryDirectory() as tmp:
+            durations = parse_segment_durations(write_playlist(tmp))
+
+        self.assertEqual(durations, [10.01, 9.99, 4.5])
+        packed = pack_durations(durations)
+        self.assertEqual(len(packed), 12)
+        self.assertEqual(unpack_durations(packed), (10010, 9990, 4500))
+
+    def test_locate_segment(self):
+        """Timestamps map to segment index, segment start and offset."""
+        durations = (10010, 9990, 4500)
+        self.assertEqual(locate_segment(durations, 0), (0, 0.0, 0.0))
+        self.assertEqual(locate_segment(durations, 10.01), (1, 10.01, 0.0))
+        index, start, offset = locate_segment(durations, 21.5)
+        self.assertEqual((index, start), (2, 20.0))
+        self.assertAlmostEqual(offset, 1.5)
+        self.assertEqual(locate_segment(durations, 999)[0], 2)
+        self.assertIsNone(locate_segment((), 5))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SegmentSeekViewTest(APITestCase):
+    """Integration tests for the seek endpoint and resume-aware manifests."""
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = User.objects.create_user(
+            username="seeker", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.video = Video.objects.create(
+            title="Testvideo", description="Beschreibung", category="Doku")
+        self.playlist = write_playlist(self.tmp.name)
+        self.variant = VideoStreamVariant.objects.create(
+            video=self.video, resolution="720p", manifest_path=str(self.playlist))
+        store_segment_index(self.variant, self.playlist)
+
+    def seek_url(self, resolution="720p"):
+        return reverse("video-segment-seek", kwargs={
+            "movie_id": self.video.id, "resolution": resolution})
+
+    def test_seek_from_cache(self):
+        """200 OK: The timestamp is mapped to segment and offset without queries."""
+        with self.assertNumQueries(0):
+            response = self.client.get(self.seek_url(), {"t": "12.5"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["segment"], "segment_00001.ts")
+        self.assertEqual(response.data["segment_start"], 10.01)
+        self.assertEqual(response.data["offset"], 2.49)
+
+    def test_seek_falls_back_to_database(self):
+        """200 OK: On a cache miss, the index is read from the variant."""
+        cache.clear()
+        response = self.client.get(self.seek_url(), {"t": "21"})
+        self.assertEqual(response.data["index"], 2)
+
+    def test_seek_invalid_time(self):
+        """400 Bad Request: t must be a non-negative number."""
+        response = self.client.get(self.seek_url(), {"t": "-3"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seek_unknown_variant(self):
+        """404 Not Found: Variants without an index cannot be seeked."""
+        response = self.client.get(self.seek_url("1080p"), {"t": "1"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_manifest_with_resume_point(self):
+        """200 OK: ?start adds an EXT-X-START tag at the start of the containing segment."""
+        url = reverse("video-variant-manifest", kwargs={
+            "movie_id": self.video.id, "resolution": "720p"})
+        response = self.client.get(url, {"start": "15"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = response.content.decode().splitlines()
+        self.assertEqual(lines[0], "#EXTM3U")
+        self.assertEqual(lines[1], "#EXT-X-START:TIME-OFFSET=10.010,PRECISE=YES")
+        self.assertIn("segment_00002.ts", lines)
@@ -0,0 +1,179 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.cleanup import orphaned_media
+from video_app.models import Video, VideoStreamVariant
+from video_app.storage import S3MediaStore, media_store
+from video_app.tasks import delete_video_media_job, register_variant
+from utils.videos import hls_relative_dir, thumbnail_name
+from .fake_s3 import FakeS3Client
+
+User = get_user_model()
+
+PLAYLIST = "#EXTM3U\n#EXTINF:2.0,\nsegment_00000.ts\n#EXT-X-ENDLIST\n"
+
+
+def write_rendition(directory, segment=bytes(range(100))):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "segment_00000.ts").write_bytes(segment)
+    (directory / "index.m3u8").write_text(PLAYLIST)
+    return directory
+
+
+class S3MediaStoreTest(SimpleTestCase):
+    """Unit tests for publishing to and reading from an S3-compatible store."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.client = FakeS3Client()
+        self.store = S3MediaStore("media", self.client, prefix="vf/", workers=4)
+
+    def test_publish_uploads_media_before_playlists(self):
+        """Segments are uploaded before the playlist that references them; the local copy is kept."""
+        rendition = write_rendition(Path(self.tmp.name) / "720p")
+
+        self.assertEqual(self.store.publish_directory(rendition, "hls/7/720p"), rendition)
+
+        self.assertEqual(self.client.uploads,
+                         ["vf/hls/7/720p/segment_00000.ts", "vf/hls/7/720p/index.m3u8"])
+        self.assertEqual(self.client.head_object(Bucket="media", Key="vf/hls/7/720p/index.m3u8")
+                         ["ContentType"], "application/vnd.apple.mpegurl")
+        self.assertTrue((rendition / "index.m3u8").exists())
+
+    def test_publish_replaces_previous_version(self):
+        """Objects of a previous version that the new one lacks are removed."""
+        self.store.publish_directory(
+            write_rendition(Path(self.tmp.name) / "old"), "hls/7/720p")
+        self.store.upload(Path(self.tmp.name) / "old" / "segment_00000.ts",
+                          "hls/7/720p/segment_00009.ts")
+        self.store.publish_directory(
+            write_rendition(Path(self.tmp.name) / "new"), "hls/7/720p")
+
+        self.assertEqual(self.client.keys("media"),
+                         ["vf/hls/7/720p/index.m3u8", "vf/hls/7/720p/segment_00000.ts"])
+
+    def test_read_and_delete(self):
+        """Ranges, sizes and missing objects are read like local files; trees are deleted."""
+        self.store.publish_directory(
+            write_rendition(Path(self.tmp.name) / "720p"), "hls/7/720p")
+        name = "hls/7/720p/segment_00000.ts"
+
+        self.assertEqual(self.store.size(name), 100)
+        self.assertEqual(self.store.read_range(name, 10, 12), bytes([10, 11, 12]))
+        self.assertFalse(self.store.exists("hls/7/1080p/index.m3u8"))
+        with self.assertRaises(FileNotFoundError):
+            self.store.open("hls/7/1080p/index.m3u8")
+
+        self.assertEqual(self.store.delete("hls/7"), 100 + len(PLAYLIST))
+        self.assertEqual(self.client.keys("media"), [])
+
+
+@override_settings(MEDIA_STORAGE_BACKEND="s3", MEDIA_S3_BUCKET="media", MEDIA_S3_PREFIX="")
+class S3StorageIntegrationTest(APITestCase):
+    """Integration tests for the pipeline and the streaming views on an S3 store."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.client_s3 = FakeS3Client()
+        patcher = patch("video_app.storage.s3_client", return_value=(self.client_s3, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        settings_override = override_settings(MEDIA_ROOT=str(Path(self.tmp.name) / "media"))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username="viewer", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.video = Video.objects.create(title="V", description="d", category="Doku")
+        name = f"{hls_relative_dir(self.video.id)}/720p"
+        rendition = write_rendition(Path(self.tmp.name) / "scratch" / "720p")
+        register_variant(self.video, media_store().publish_directory(rendition, name), name)
+
+    def segment_url(self):
+        return reverse("video-segment", kwargs={
+            "movie_id": self.video.id, "resolution": "720p",
+            "segment": "segment_00000.ts"})
+
+    def test_variant_registered_by_store_name(self):
+        """Variants point at their playlist in the store, not at a local path."""
+        self.assertEqual(VideoStreamVariant.objects.get().manifest_path,
+                         f"{hls_relative_dir(self.video.id)}/720p/index.m3u8")
+        self.assertFalse(Path(self.tmp.name, "media").exists())
+
+    def test_segment_redirects_to_store(self):
+        """302 Found: Segments are redirected to a presigned URL of the store."""
+        response = self.client.get(self.segment_url())
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(response["Location"].startswith(
+            f"https://s3.test/media/{hls_relative_dir(self.video.id)}/720p/segment_00000.ts"))
+
+    @override_settings(MEDIA_S3_SERVE="proxy")
+    def test_segment_and_manifest_proxied(self):
+        """200/206: Playlists and (ranges of) segments are proxied from the store."""
+        manifest = self.client.get(reverse("video-variant-manifest", kwargs={
+            "movie_id": self.video.id, "resolution": "720p"}))
+        ranged = self.client.get(self.segment_url(), HTTP_RANGE="bytes=0-9")
+        missing = self.client.get(reverse("video-master-playlist",
+                                          kwargs={"movie_id": self.video.id}))
+
+        self.assertEqual(b"".join(manifest.streaming_content).decode(), PLAYLIST)
+        self.assertEqual(ranged.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(ranged.content, bytes(range(10)))
+        self.assertEqual(ranged["Content-Range"], "bytes 0-9/100")
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch("video_app.tasks.django_rq.get_connection")
+    def test_deletion_removes_objects(self, get_connection):
+        """Deleting a video's media removes its objects from the store."""
+        get_connection.return_value.lock.return_value.acquire.return_value = True
+
+        delete_video_media_job(self.video.id, [])
+
+        self.assertEqual(self.client_s3.keys("media"), [])
+
+    def test_orphans_collected_from_store(self):
+        """Output of deleted videos, unregistered renditions and stale thumbnails are removed from the bucket."""
+        store = media_store()
+        scratch = Path(self.tmp.name) / "scratch"
+        video_dir = hls_relative_dir(self.video.id)
+        store.publish_directory(write_rendition(scratch / "480p"), f"{video_dir}/480p")
+        store.publish_directory(write_rendition(scratch / "trickplay"), f"{video_dir}/trickplay")
+        store.publish_directory(write_rendition(scratch / "gone"),
+                                f"{hls_relative_dir(999999)}/360p")
+        (scratch / "thumb.jpg").write_bytes(b"jpg")
+        store.publish_file(scratch / "thumb.jpg", thumbnail_name(999999))
+        store.publish_file(scratch / "thumb.jpg", thumbnail_name(self.video.id))
+
+        self.assertEqual(sorted(orphaned_media()), sorted([
+            f"{video_dir}/480p", hls_relative_dir(999999), thumbnail_name(999999)]))
+
+        call_command("cleanup_orphaned_media", stdout=StringIO())
+
+        self.assertEqual(self.client_s3.keys("media"), sorted([
+            f"{video_dir}/720p/index.m3u8", f"{video_dir}/720p/segment_00000.ts",
+            f"{video_dir}/trickplay/index.m3u8", f"{video_dir}/trickplay/segment_00000.ts",
+            thumbnail_name(self.video.id)]))
+
+    def test_backfill_commands_read_from_store(self):
+        """The segment index and variant statistics are built from the bucket."""
+        VideoStreamVariant.objects.update(segment_durations=None, segment_count=None,
+                                          total_bytes=None)
+        out = StringIO()
+        call_command("build_segment_index", stdout=out)
+        call_command("build_variant_stats", stdout=out)
+
+        variant = VideoStreamVariant.objects.get()
+        self.assertIsNotNone(variant.segment_durations)
+        self.assertEqual((variant.segment_count, variant.total_bytes), (1, 100))
+        self.assertIn("Built segment index for 1 variant(s)", out.getvalue())
+        self.assertIn("Measured 1 variant(s)", out.getvalue())
@@ -0,0 +1,98 @@
+import tempfile
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.trickplay import build_trickplay_vtt, format_vtt_time, version_sprites
+from utils.videos import hls_relative_dir
+
+User = get_user_model()
+
+
+class TrickplayVttTest(SimpleTestCase):
+    """Unit tests for the trickplay WebVTT index."""
+
+    def test_format_vtt_time(self):
+        """Seconds are formatted as HH:MM:SS.mmm."""
+        self.assertEqual(format_vtt_time(3725.5), "01:02:05.500")
+
+    def test_cues_map_to_sprite_tiles(self):
+        """Each interval maps to a tile; tiles wrap into the next sprite sheet after 5x5."""
+        lines = build_trickplay_vtt(255, "0123456789ab").splitlines()
+
+        self.assertEqual(lines[0], "WEBVTT")
+        self.assertEqual(lines[2], "00:00:00.000 --> 00:00:10.000")
+        self.assertEqual(lines[3], "0123456789ab/sprite_000.jpg#xywh=0,0,160,90")
+        self.assertEqual(lines[6], "0123456789ab/sprite_000.jpg#xywh=160,0,160,90")
+        self.assertIn("0123456789ab/sprite_000.jpg#xywh=640,360,160,90", lines)
+        self.assertIn("0123456789ab/sprite_001.jpg#xywh=0,0,160,90", lines)
+        self.assertEqual(lines[-2], "00:04:10.000 --> 00:04:15.000")
+
+    def test_sprites_versioned_by_content(self):
+        """Sprites move into a directory named after their content; new content gets a new one."""
+        with tempfile.TemporaryDirectory() as tmp:
+            versions = []
+            for content in (b"first", b"first", b"second"):
+                output_dir = Path(tmp) / str(len(versions))
+                (output_dir / "trickplay").mkdir(parents=True)
+                (output_dir / "trickplay" / "sprite_000.jpg").write_bytes(content)
+                versions.append(version_sprites(output_dir))
+                self.assertTrue((output_dir / "trickplay" / versions[-1] / "sprite_000.jpg").exists())
+
+        self.assertEqual(versions[0], versions[1])
+        self.assertNotEqual(versions[0], versions[2])
+
+
+class TrickplayViewTest(APITestCase):
+    """Integration tests for the video_trickplay endpoint."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        trickplay_dir = Path(self.tmp.name) / hls_relative_dir(7) / "trickplay"
+        (trickplay_dir / "0123456789ab").mkdir(parents=True)
+        (trickplay_dir / "thumbnails.vtt").write_text(build_trickplay_vtt(20, "0123456789ab"))
+        (trickplay_dir / "0123456789ab" / "sprite_000.jpg").write_bytes(b"\xff\xd8\xff")
+        self.user = User.objects.create_user(
+            username="scrubber", password="test123")
+        self.client.force_authenticate(user=self.user)
+
+    def url(self, filename, version=None):
+        if version:
+            return reverse("video-trickplay-sprite", kwargs={
+                "movie_id": 7, "version": version, "filename": filename})
+        return reverse("video-trickplay", kwargs={"movie_id": 7, "filename": filename})
+
+    def test_versioned_sprites_are_immutable(self):
+        """200 OK: Versioned sprites are cached forever; the index is revalidated."""
+        with override_settings(MEDIA_ROOT=self.tmp.name):
+            vtt = self.client.get(self.url("thumbnails.vtt"))
+            sprite = self.client.get(self.url("sprite_000.jpg", "0123456789ab"))
+
+        self.assertEqual(vtt.status_code, status.HTTP_200_OK)
+        self.assertEqual(vtt["Content-Type"], "text/vtt")
+        self.assertIn("no-cache", vtt["Cache-Control"])
+        self.assertEqual(sprite["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", sprite["Cache-Control"])
+        self.assertIn("max-age=31536000", sprite["Cache-Control"])
+
+    def test_unversioned_sprite_is_revalidated(self):
+        """200 OK: Sprites of output from before versioning keep their names and are revalidated."""
+        trickplay_dir = Path(self.tmp.name) / hls_relative_dir(7) / "trickplay"
+        (trickplay_dir / "sprite_000.jpg").write_bytes(b"\xff\xd8\xff")
+        with override_settings(MEDIA_ROOT=self.tmp.name):
+            sprite = self.client.get(self.url("sprite_000.jpg"))
+
+        self.assertEqual(sprite.status_code, status.HTTP_200_OK)
+        self.assertNotIn("immutable", sprite["Cache-Control"])
+
+    def test_invalid_or_missing_file(self):
+        """404 Not Found: Unknown names, versions and missing sprites are rejected."""
+        with override_settings(MEDIA_ROOT=self.tmp.name):
+            for url in (self.url("index.m3u8"),
+                        self.url("sprite_001.jpg", "0123456789ab"),
+                        self.url("thumbnails.vtt", "0123456789ab"),
+                        self.url("sprite_000.jpg", "..")):
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
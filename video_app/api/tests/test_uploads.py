@@ -0,0 +1,169 @@
+import base64
+import fcntl
+import hashlib
+import tempfile
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from video_app.models import OutboxJob, Video, VideoUpload
+from video_app.tasks import hash_upload_job
+from utils.videos import video_upload_to
+
+User = get_user_model()
+
+TUS_HEADERS = {"HTTP_TUS_RESUMABLE": "1.0.0"}
+
+
+def encode_metadata(**values):
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}"
+                    for key, value in values.items())
+
+
+class VideoUploadViewTest(APITestCase):
+    """Integration tests for the resumable (tus) upload API."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.tmp.name,
+                                              UPLOAD_MAX_BYTES=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user(
+            username="editor", password="test123", is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.data = bytes(range(256)) * 3
+
+    def start_upload(self, length=None):
+        response = self.client.post(
+            reverse("video-upload"),
+            HTTP_UPLOAD_LENGTH=str(length or len(self.data)),
+            HTTP_UPLOAD_METADATA=encode_metadata(
+                filename="master.mov", title="Trailer", category="Doku"),
+            **TUS_HEADERS)
+        return response
+
+    def send_chunk(self, url, offset, chunk, **headers):
+        return self.client.generic(
+            "PATCH", url, chunk,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset), **TUS_HEADERS, **headers)
+
+    def test_requires_staff(self):
+        """403 Forbidden: Regular users cannot upload videos."""
+        user = User.objects.create_user(username="viewer", password="test123")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.start_upload().status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_options_advertises_protocol(self):
+        """204 No Content: OPTIONS lists the tus version, extensions and limits."""
+        response = self.client.options(reverse("video-upload"))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response["Tus-Version"], "1.0.0")
+        self.assertIn("checksum", response["Tus-Extension"])
+        self.assertEqual(response["Tus-Max-Size"], "1024")
+
+    def test_chunked_upload_creates_video(self):
+        """204 No Content: Chunks are appended on disk; the last one creates and queues the video."""
+        response = self.start_upload()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        url = response["Location"]
+        upload = VideoUpload.objects.get()
+        self.assertEqual(upload.file_path, video_upload_to(None, "master.mov"))
+
+        response = self.send_chunk(url, 0, self.data[:500])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response["Upload-Offset"], "500")
+        self.assertEqual(self.client.head(url, **TUS_HEADERS)["Upload-Offset"], "500")
+        self.assertFalse(Video.objects.exists())
+
+        response = self.send_chunk(url, 500, self.data[500:])
+        self.assertEqual(response["Upload-Offset"], str(len(self.data)))
+
+        upload.refresh_from_db()
+        video = Video.objects.get()
+        self.assertEqual(upload.video, video)
+        self.assertEqual(video.video_file.name, upload.file_path)
+        self.assertEqual(Path(video.video_file.path).read_bytes(), self.data)
+        self.assertTrue(OutboxJob.objects.filter(
+            job="process_video", args=[video.id]).exists())
+
+        self.assertTrue(OutboxJob.objects.filter(
+            job="hash_upload", args=[str(upload.pk)]).exists())
+        hash_upload_job(str(upload.pk))
+        upload.refresh_from_db()
+        self.assertEqual(upload.sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_repeated_final_request_creates_one_video(self):
+        """204 No Content: A retried final (empty) request does not create a second video."""
+        url = self.start_upload()["Location"]
+        self.send_chunk(url, 0, self.data)
+
+        response = self.send_chunk(url, len(self.data), b"")
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Video.objects.count(), 1)
+        self.assertEqual(OutboxJob.objects.filter(job="process_video").count(), 1)
+
+    def test_offset_mismatch_conflicts(self):
+        """409 Conflict: A chunk must start at the current offset."""
+        url = self.start_upload()["Location"]
+        self.send_chunk(url, 0, self.data[:100])
+
+        response = self.send_chunk(url, 50, self.data[50:150])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response["Upload-Offset"], "100")
+
+    def test_concurrent_chunk_is_locked(self):
+        """423 Locked: A chunk is refused while another request writes the upload."""
+        url = self.start_upload()["Location"]
+        path = Path(self.tmp.name, VideoUpload.objects.get().file_path)
+
+        with path.open("rb") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            response = self.send_chunk(url, 0, self.data[:100])
+
+        self.assertEqual(response.status_code, status.HTTP_423_LOCKED)
+        self.assertEqual(VideoUpload.objects.get().offset, 0)
+        self.assertEqual(self.send_chunk(url, 0, self.data[:100]).status_code,
+                         status.HTTP_204_NO_CONTENT)
+
+    def test_checksum_mismatch_discards_chunk(self):
+        """460: A chunk that does not match its checksum is discarded; the upload resumes cleanly."""
+        url = self.start_upload()["Location"]
+        wrong = base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+        response = self.send_chunk(url, 0, self.data[:100],
+                                   HTTP_UPLOAD_CHECKSUM=f"sha256 {wrong}")
+        self.assertEqual(response.status_code, 460)
+        self.assertEqual(VideoUpload.objects.get().offset, 0)
+
+        right = base64.b64encode(hashlib.sha256(self.data).digest()).decode()
+        response = self.send_chunk(url, 0, self.data,
+                                   HTTP_UPLOAD_CHECKSUM=f"sha256 {right}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(VideoUpload.objects.get().offset, len(self.data))
+        self.assertEqual(Path(self.tmp.name, VideoUpload.objects.get().file_path)
+                         .read_bytes(), self.data)
+
+    def test_too_large(self):
+        """413 Request Entity Too Large: Uploads above UPLOAD_MAX_BYTES are refused."""
+        self.assertEqual(self.start_upload(length=2048).status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_delete_removes_partial_file(self):
+        """204 No Content: Terminating an upload removes its row and partial file."""
+        url = self.start_upload()["Location"]
+        self.send_chunk(url, 0, self.data[:100])
+        path = Path(self.tmp.name) / VideoUpload.objects.get().file_path
+
+        response = self.client.delete(url, **TUS_HEADERS)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(VideoUpload.objects.exists())
+        self.assertFalse(path.exists())
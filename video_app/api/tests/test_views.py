@@ -0,0 +1,180 @@
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.urls import reverse
+from django.core.cache import cache
+from django.test import override_settings
+from django.contrib.auth import get_user_model
+from unittest.mock import patch
+from video_app.catalog import build_catalog_blobs
+from video_app.models import Video
+
+User = get_user_model()
+
+
+@patch("video_app.api.views.get_catalog_blob", return_value=None)
+class VideoListViewTest(APITestCase):
+    """Integration tests for the VideoListView endpoint."""
+
+    def setUp(self):
+        self.url = reverse("video-list")
+        self.user = User.objects.create_user(
+            username="viewer", password="test123")
+        Video.objects.create(
+            title="Older", description="First upload", category="Doku")
+        Video.objects.create(
+            title="Newer", description="Second upload", category="Sport",
+            thumbnail_url="thumbnails/2_thumb.jpg")
+
+    def test_requires_authentication(self, _get_blob):
+        """401 Unauthorized: Anonymous users cannot list videos."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_newest_first(self, _get_blob):
+        """200 OK: Videos are returned newest first with absolute thumbnail URLs."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([v["title"] for v in response.data], ["Newer", "Older"])
+        self.assertTrue(response.data[0]["thumbnail_url"].endswith(
+            "/media/thumbnails/2_thumb.jpg"))
+        self.assertIsNone(response.data[1]["thumbnail_url"])
+
+    def test_snapshot_matches_database_response(self, get_blob):
+        """200 OK: The snapshot blob is served as-is and equals the database response byte for byte."""
+        self.client.force_authenticate(user=self.user)
+        from_db = self.client.get(self.url).content
+
+        get_blob.return_value = build_catalog_blobs()["list"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, from_db)
+
+
+@patch("video_app.api.views.get_catalog_blob", return_value=None)
+class VideoCategoryListViewTest(APITestCase):
+    """Integration tests for the VideoCategoryListView endpoint."""
+
+    def setUp(self):
+        self.url = reverse("video-categories")
+        self.user = User.objects.create_user(
+            username="browser", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.doku_old = Video.objects.create(
+            title="A", description="a", category="Doku")
+        self.sport = Video.objects.create(
+            title="B", description="b", category="Sport")
+        self.doku_new = Video.objects.create(
+            title="C", description="c", category="Doku")
+
+    def test_categories_from_database(self, _get_blob):
+        """200 OK: Without a snapshot, categories are grouped from the database."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [
+            {"category": "Doku", "video_ids": [self.doku_new.id, self.doku_old.id]},
+            {"category": "Sport", "video_ids": [self.sport.id]},
+        ])
+
+    def test_categories_from_snapshot(self, get_blob):
+        """200 OK: With a snapshot, the blob is served without touching the database."""
+        get_blob.return_value = build_catalog_blobs()["categories"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json()[1]["video_ids"], [self.sport.id])
+
+
+class VideoSearchViewTest(APITestCase):
+    """Integration tests for the VideoSearchView endpoint."""
+
+    def setUp(self):
+        self.url = reverse("video-search")
+        self.user = User.objects.create_user(
+            username="searcher", password="test123")
+        self.client.force_authenticate(user=self.user)
+        self.title_match = Video.objects.create(
+            title="Ocean Adventures", description="Sailing the seas", category="Doku")
+        self.description_match = Video.objects.create(
+            title="Coastal Life", description="Creatures of the ocean floor", category="Doku")
+        Video.objects.create(
+            title="Mountain Peaks", description="Climbing in the Alps", category="Sport")
+
+    def test_missing_query(self):
+        """400 Bad Request: The q parameter is required."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ranked_results(self):
+        """200 OK: Title matches rank above description matches; non-matches are excluded."""
+        response = self.client.get(self.url, {"q": "oceans"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(
+            [v["id"] for v in response.data["results"]],
+            [self.title_match.id, self.description_match.id],
+        )
+
+    def test_pagination(self):
+        """200 OK: page_size limits the page and exposes a next link."""
+        response = self.client.get(self.url, {"q": "ocean", "page_size": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class VideoSuggestViewTest(APITestCase):
+    """Integration tests for the VideoSuggestView endpoint."""
+
+    def setUp(self):
+        self.url = reverse("video-suggest")
+        self.user = User.objects.create_user(
+            username="typist", password="test123")
+        self.client.force_authenticate(user=self.user)
+        cache.clear()
+        self.ocean = Video.objects.create(
+            title="Ocean Adventures", description="Sailing", category="Doku")
+        Video.objects.create(
+            title="Mountain Peaks", description="Climbing", category="Sport")
+
+    def test_short_query_returns_empty(self):
+        """200 OK: Queries below the minimum length return no suggestions."""
+        response = self.client.get(self.url, {"q": "o"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_prefix_match(self):
+        """200 OK: A partial title returns the matching video."""
+        response = self.client.get(self.url, {"q": "oce"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+                         {"id": self.ocean.id, "title": "Ocean Adventures"}])
+
+    def test_misspelled_match(self):
+        """200 OK: A misspelled word still suggests the closest title."""
+        response = self.client.get(self.url, {"q": "advantures"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(self.ocean.id, [v["id"] for v in response.data])
+
+    @override_settings(VIDEO_SUGGEST_LIMIT=1)
+    def test_result_count_is_capped(self):
+        """200 OK: No more than VIDEO_SUGGEST_LIMIT suggestions are returned."""
+        Video.objects.create(
+            title="Ocean Depths", description="Diving", category="Doku")
+        response = self.client.get(self.url, {"q": "ocean"})
+        self.assertEqual(len(response.data), 1)
+
+    def test_cached_prefix_skips_database(self):
+        """200 OK: A repeated prefix is served from cache without queries."""
+        self.client.get(self.url, {"q": "ocean"})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"q": "Ocean "})
+        self.assertEqual(response.data[0]["id"], self.ocean.id)
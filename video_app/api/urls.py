@@ -1,15 +1,63 @@
 from django.urls import path
 from .views import (VideoListView,
-                    video_variant_manifest, 
+                    ContinueWatchingView,
+                    VideoCategoryListView,
+                    VideoSearchView,
+                    VideoSuggestView,
+                    VideoUploadCreateView,
+                    VideoUploadDetailView,
+                    WatchProgressView,
+                    video_master_playlist,
+                    video_segment_seek,
+                    video_trickplay,
+                    video_variant_manifest,
                     video_segment)
 
 urlpatterns = [
     path("video/", VideoListView.as_view(), name="video-list"),
+    path("video/categories/", VideoCategoryListView.as_view(),
+         name="video-categories"),
+    path("video/continue/", ContinueWatchingView.as_view(),
+         name="video-continue"),
+    path("video/search/", VideoSearchView.as_view(), name="video-search"),
+    path("video/suggest/", VideoSuggestView.as_view(), name="video-suggest"),
+    path("video/uploads/", VideoUploadCreateView.as_view(),
+         name="video-upload"),
+    path("video/uploads/<uuid:upload_id>/", VideoUploadDetailView.as_view(),
+         name="video-upload-detail"),
+    path("video/<int:movie_id>/progress/", WatchProgressView.as_view(),
+         name="video-progress"),
+    path(
+        "video/<int:movie_id>/master.m3u8",
+        video_master_playlist,
+        name="video-master-playlist",
+    ),
+    path(
+        "video/<int:movie_id>/trickplay/<str:filename>",
+        video_trickplay,
+        name="video-trickplay",
+    ),
+    path(
+        "video/<int:movie_id>/trickplay/<str:version>/<str:filename>",
+        video_trickplay,
+        name="video-trickplay-sprite",
+    ),
     path(
         "video/<int:movie_id>/<str:resolution>/index.m3u8",
         video_variant_manifest,
         name="video-variant-manifest",
     ),
+    path(
+        "video/<int:movie_id>/<str:resolution>/iframes.m3u8",
+        video_variant_manifest,
+        {"playlist": "iframes.m3u8"},
+        name="video-iframe-manifest",
+    ),
+    path(
+        "video/<int:movie_id>/<str:resolution>/seek/",
+        video_segment_seek,
+        name="video-segment-seek",
+    ),
     path(
         "video/<int:movie_id>/<str:resolution>/<str:segment>",
         video_segment,
@@ -1,24 +1,97 @@
+import hashlib
+import json
 import logging
 import re
 from pathlib import Path
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseRedirect)
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework.decorators import api_view
 from core.settings import MEDIA_ROOT
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
-from ..models import Video, VideoStreamVariant
-from utils.data import RESOLUTION_CHOICES
+from ..catalog import (VIDEO_LIST_FIELDS, build_categories_blob,
+                       catalog_items, get_catalog_blob)
+from ..models import UserWatchProgress, Video, VideoStreamVariant, VideoUpload
+from ..playlists import (IFRAME_PLAYLIST_NAME, MASTER_PLAYLIST_NAME,
+                         VARIANT_PLAYLIST_NAME)
+from ..progress import overlay_progress, record_heartbeat
+from ..segments import SEGMENT_NAME_TEMPLATE, get_segment_durations, locate_segment
+from ..storage import media_store
+from ..trickplay import SPRITE_VERSION_LENGTH, TRICKPLAY_DIR_NAME
+from ..uploads import (TUS_CHECKSUM_ALGORITHM, TUS_EXTENSIONS, TUS_VERSION,
+                       UploadChecksumMismatch, UploadLocked,
+                       UploadOffsetMismatch, advance_offset, append_chunk,
+                       create_upload, delete_upload, finalize_upload,
+                       parse_upload_checksum, parse_upload_metadata,
+                       upload_write_lock)
+from .serializers import WatchProgressSerializer
+from utils.data import SEARCH_CONFIG, STREAM_VARIANT_CHOICES
+from utils.db_routers import pin_to_primary
+from utils.videos import hls_name
 logger = logging.getLogger(__name__)
 
 
 ALLOWED_RESOLUTIONS = {
-    (c[0] if isinstance(c, (list, tuple)) else c) for c in RESOLUTION_CHOICES
+    (c[0] if isinstance(c, (list, tuple)) else c) for c in STREAM_VARIANT_CHOICES
 }
 
 SEGMENT_NAME_RE = re.compile(r"^segment_\d{5}\.ts$")
+BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+PLAYLIST_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+
+TRICKPLAY_CONTENT_TYPES = {
+    ".vtt": "text/vtt",
+    ".jpg": "image/jpeg",
+}
+TRICKPLAY_NAME_RE = re.compile(r"^(sprite_\d{3}\.jpg|thumbnails\.vtt)$")
+SPRITE_NAME_RE = re.compile(r"^sprite_\d{3}\.jpg$")
+SPRITE_VERSION_RE = re.compile(rf"^[0-9a-f]{{{SPRITE_VERSION_LENGTH}}}$")
+
+# The WebVTT index (and sprites of output from before versioning) keep
+# their names when a video is reprocessed and are revalidated; versioned
+# sprites never change under the same name
+TRICKPLAY_CACHE_CONTROL = "private, no-cache"
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+TUS_CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+# tus status for a chunk that does not match its Upload-Checksum
+HTTP_460_CHECKSUM_MISMATCH = 460
+
+# Videos watched beyond this share of their duration count as finished
+CONTINUE_WATCHING_FINISHED_RATIO = 0.95
+
+
+def parse_seconds(value):
+    """Parse a non-negative timestamp in seconds; returns None if invalid."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if 0 <= seconds < float("inf") else None
+
+
+def wants_progress(request):
+    """Whether the client asked for the per-user progress overlay (?with_progress=true)."""
+    return request.query_params.get("with_progress", "").lower() in ("true", "1", "yes")
+
+
+class VideoSearchPagination(PageNumberPagination):
+    """Page-number pagination for search results (?page=, ?page_size=)."""
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
 
 
 class VideoListView(APIView):
@@ -27,22 +100,26 @@ class VideoListView(APIView):
 
     Each item includes id, created_at, title, description, category,
     and an absolute thumbnail URL if available.
+
+    Served from the precomputed catalog snapshot in Redis; the database
+    is only queried when no snapshot blob is available.
+    With ?with_progress=true, each item also carries the user's
+    last_position_seconds, fetched in one query.
     """
 
     def get(self, request):
+        blob = get_catalog_blob("list")
+        if blob is not None and not wants_progress(request):
+            return HttpResponse(blob, content_type="application/json")
+
         try:
-            videos = Video.objects.all().order_by("-created_at")
-            data = [
-                {
-                    "id": v.id,
-                    "created_at": v.created_at,
-                    "title": v.title,
-                    "description": v.description,
-                    "category": v.category,
-                    "thumbnail_url": f"{settings.BASE_BACKEND_URL}{settings.MEDIA_URL}{v.thumbnail_url}" if v.thumbnail_url else None
-                }
-                for v in videos
-            ]
+            if blob is not None:
+                data = json.loads(blob)
+            else:
+                data = catalog_items(
+                    Video.objects.order_by("-created_at").values(*VIDEO_LIST_FIELDS))
+            if wants_progress(request):
+                overlay_progress(request.user, data, whole_catalog=True)
             return Response(data, status=status.HTTP_200_OK)
         except Exception:
             logger.exception("Failed to list videos")
@@ -52,14 +129,211 @@ class VideoListView(APIView):
             )
 
 
+class VideoCategoryListView(APIView):
+    """
+    Returns all categories with the IDs of their videos, newest first.
+
+    Served from the precomputed catalog snapshot in Redis; the database
+    is only queried when no snapshot blob is available.
+    """
+
+    def get(self, request):
+        blob = get_catalog_blob("categories")
+        if blob is None:
+            blob = build_categories_blob()
+        return HttpResponse(blob, content_type="application/json")
+
+
+class VideoSearchView(APIView):
+    """
+    Full-text search over video titles and descriptions.
+
+    Matches the `q` query parameter (web search syntax) against the stored,
+    GIN-indexed search vector and returns paginated results ordered by rank,
+    newest first on ties. Supports the ?with_progress=true overlay.
+    """
+
+    def get(self, request):
+        term = (request.query_params.get("q") or "").strip()
+        if not term:
+            return Response(
+                {"detail": "Query parameter 'q' is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        query = SearchQuery(term, search_type="websearch",
+                            config=SEARCH_CONFIG)
+        videos = (
+            Video.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-created_at")
+            .values(*VIDEO_LIST_FIELDS)
+        )
+
+        paginator = VideoSearchPagination()
+        page = paginator.paginate_queryset(videos, request, view=self)
+        data = catalog_items(page)
+        if wants_progress(request):
+            overlay_progress(request.user, data)
+        return paginator.get_paginated_response(data)
+
+
+class ContinueWatchingView(APIView):
+    """
+    Returns the user's in-progress videos, most recently watched first.
+
+    One query over the (user, updated_at) index: the user's progress rows
+    joined with the video's catalog fields. Videos watched to at least
+    95% of their duration are left out. At most CONTINUE_WATCHING_LIMIT items.
+    """
+
+    def get(self, request):
+        rows = (
+            UserWatchProgress.objects.filter(user=request.user)
+            .filter(Q(video__duration_seconds__isnull=True)
+                    | Q(last_position_seconds__lt=F("video__duration_seconds")
+                        * CONTINUE_WATCHING_FINISHED_RATIO))
+            .order_by("-updated_at")
+            .values("last_position_seconds", "updated_at",
+                    *(f"video__{field}" for field in VIDEO_LIST_FIELDS))
+            [:settings.CONTINUE_WATCHING_LIMIT]
+        )
+
+        data = catalog_items(
+            {field: row[f"video__{field}"] for field in VIDEO_LIST_FIELDS}
+            | {"last_position_seconds": row["last_position_seconds"],
+               "watched_at": row["updated_at"]}
+            for row in rows
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class VideoSuggestView(APIView):
+    """
+    Typo-tolerant title autocomplete.
+
+    Matches the `q` query parameter against titles by substring or trigram
+    word similarity (served by the pg_trgm GIN indexes on UPPER(title) and
+    title; icontains would compile to a lookup neither serves), returns at most
+    VIDEO_SUGGEST_LIMIT suggestions and caches each normalized prefix for
+    VIDEO_SUGGEST_CACHE_TTL seconds.
+    """
+
+    min_length = 2
+
+    def get(self, request):
+        term = " ".join((request.query_params.get("q") or "").split()).lower()
+        if len(term) < self.min_length:
+            return Response([], status=status.HTTP_200_OK)
+
+        cache_key = "video_suggest:" + hashlib.md5(term.encode()).hexdigest()
+        data = cache.get(cache_key)
+        if data is None:
+            data = list(
+                Video.objects.alias(title_upper=Upper("title"))
+                .filter(Q(title_upper__contains=term.upper())
+                        | Q(title__trigram_word_similar=term))
+                .annotate(similarity=TrigramWordSimilarity(term, "title"))
+                .order_by("-similarity", "title")
+                .values("id", "title")[:settings.VIDEO_SUGGEST_LIMIT]
+            )
+            cache.set(cache_key, data, settings.VIDEO_SUGGEST_CACHE_TTL)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class WatchProgressView(APIView):
+    """
+    Player heartbeat: store the current playback position of the user.
+
+    Only buffers the position in Redis (a single HSET); a periodic RQ job
+    writes buffered positions to UserWatchProgress in batches.
+    """
+
+    def post(self, request, movie_id):
+        serializer = WatchProgressSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        record_heartbeat(
+            request.user.id,
+            movie_id,
+            serializer.validated_data["position"],
+            serializer.validated_data["resolution"],
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(["GET"])
+def video_segment_seek(request, movie_id: int, resolution: str):
+    """
+    Map a timestamp (?t=<seconds>) to the HLS segment containing it.
+
+    Uses the packed segment duration index of the variant (cached in Redis),
+    so no playlist has to be downloaded or parsed.
+
+    Raises:
+        Http404: If the resolution is invalid or the variant has no segment index.
+
+    Returns:
+        Response: segment name, index, segment start and offset into the segment.
+    """
+    if resolution not in ALLOWED_RESOLUTIONS:
+        raise Http404("Invalid resolution")
+
+    seconds = parse_seconds(request.query_params.get("t"))
+    if seconds is None:
+        return Response({"detail": "Query parameter 't' must be a non-negative number of seconds."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    located = locate_segment(
+        get_segment_durations(movie_id, resolution), seconds)
+    if located is None:
+        raise Http404("Segment index not found")
+
+    index, segment_start, offset = located
+    return Response({
+        "segment": SEGMENT_NAME_TEMPLATE.format(index),
+        "index": index,
+        "segment_start": segment_start,
+        "offset": round(offset, 3),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def video_master_playlist(request, movie_id: int):
+    """
+    Return the HLS master playlist of a video, advertising every rendition
+    with its media playlist and its I-frame-only playlist.
+
+    Raises:
+        Http404: If the master playlist cannot be found.
+
+    Returns:
+        FileResponse: The master playlist with
+        content type 'application/vnd.apple.mpegurl'.
+    """
+    try:
+        return FileResponse(media_store().open(hls_name(movie_id, MASTER_PLAYLIST_NAME)),
+                            content_type=PLAYLIST_CONTENT_TYPE)
+    except FileNotFoundError:
+        raise Http404("Master playlist not found")
+
+
 @api_view(["GET"])
-def video_variant_manifest(request, movie_id: int, resolution: str):
+def video_variant_manifest(request, movie_id: int, resolution: str,
+                           playlist: str = VARIANT_PLAYLIST_NAME):
     """
     Return the HLS manifest (.m3u8) file for a given video and resolution.
 
+    With ?start=<seconds>, an EXT-X-START tag pointing at the beginning of
+    the segment containing that position is added, so the player starts
+    loading at the resume point without fetching earlier segments.
+
     Args:
         movie_id (int): ID of the video.
         resolution (str): Target resolution (must be in ALLOWED_RESOLUTIONS).
+        playlist (str): 'index.m3u8' for the media playlist (default) or
+                        'iframes.m3u8' for the I-frame-only playlist.
 
     Raises:
         Http404: If the resolution is invalid, the variant does not exist,
@@ -80,14 +354,32 @@ def video_variant_manifest(request, movie_id: int, resolution: str):
     except VideoStreamVariant.DoesNotExist:
         raise Http404("Variant not found")
 
-    manifest_path = Path(variant.manifest_path)
-    if not manifest_path.is_absolute():
-        manifest_path = Path(settings.MEDIA_ROOT) / manifest_path
+    manifest_name = variant.manifest_path
+    if playlist == IFRAME_PLAYLIST_NAME:
+        manifest_name = str(Path(manifest_name).with_name(IFRAME_PLAYLIST_NAME))
 
-    if not manifest_path.exists():
+    try:
+        manifest = media_store().open(manifest_name)
+    except FileNotFoundError:
         raise Http404("Manifest file not found")
 
-    return FileResponse(open(manifest_path, "rb"), content_type="application/vnd.apple.mpegurl")
+    start = parse_seconds(request.query_params.get("start"))
+    if start and playlist == VARIANT_PLAYLIST_NAME:
+        located = locate_segment(
+            get_segment_durations(movie_id, resolution), start)
+        if located is not None:
+            with manifest:
+                text = manifest.read().decode()
+            return HttpResponse(with_start_offset(text, located[1]),
+                                content_type=PLAYLIST_CONTENT_TYPE)
+
+    return FileResponse(manifest, content_type=PLAYLIST_CONTENT_TYPE)
+
+
+def with_start_offset(playlist, seconds):
+    """Insert an EXT-X-START tag right after the #EXTM3U header of a playlist."""
+    header, _, rest = playlist.partition("\n")
+    return f"{header}\n#EXT-X-START:TIME-OFFSET={seconds:.3f},PRECISE=YES\n{rest}"
 
 
 @api_view(["GET"])
@@ -95,6 +387,11 @@ def video_segment(request, movie_id: int, resolution: str, segment: str):
     """
     Return a single HLS video segment (.ts file) for the given video and resolution.
 
+    Single byte ranges (Range: bytes=start-end) are answered with
+    206 Partial Content, as requested by I-frame playlists. With a remote
+    media store and MEDIA_S3_SERVE='redirect', the client is redirected to
+    a presigned URL of the segment instead.
+
     Args:
         movie_id (int): ID of the video.
         resolution (str): Target resolution (must be in ALLOWED_RESOLUTIONS).
@@ -105,8 +402,8 @@ def video_segment(request, movie_id: int, resolution: str, segment: str):
                  the variant does not exist, or the segment file cannot be found.
 
     Returns:
-        FileResponse: The requested video segment with 
-        content type 'video/MP2T'.
+        FileResponse: The requested video segment (or byte range) with
+        content type 'video/MP2T', or a redirect to the media store.
     """
     if resolution not in ALLOWED_RESOLUTIONS:
         raise Http404("Invalid resolution")
@@ -117,9 +414,234 @@ def video_segment(request, movie_id: int, resolution: str, segment: str):
     get_object_or_404(VideoStreamVariant, video_id=movie_id,
                       resolution=resolution)
 
-    seg_path = Path(settings.MEDIA_ROOT) / "hls" / \
-        str(movie_id) / resolution / segment
-    if not seg_path.exists():
+    name = hls_name(movie_id, resolution, segment)
+    try:
+        return media_response(request, name, "video/MP2T")
+    except FileNotFoundError:
         raise Http404("Segment not found")
 
-    return FileResponse(seg_path.open("rb"), content_type="video/MP2T")
+
+def media_response(request, name, content_type):
+    """
+    Serve a media file from the media store: a redirect to a presigned
+    URL if the store is remote and MEDIA_S3_SERVE is 'redirect', otherwise
+    the file itself (proxied from a remote store), honouring byte ranges.
+    Raises FileNotFoundError if a served file does not exist.
+    """
+    store = media_store()
+    if not store.is_local and settings.MEDIA_S3_SERVE == "redirect":
+        return HttpResponseRedirect(store.url(name))
+    return byte_range_response(request, store, name, content_type)
+
+
+def byte_range_response(request, store, name, content_type):
+    """
+    Serve a file of the media store, honouring a single 'Range: bytes='
+    request header. Unsatisfiable ranges are answered with 416; anything
+    else that cannot be parsed is ignored and the whole file is returned.
+    """
+    size = store.size(name)
+    match = BYTE_RANGE_RE.match(request.headers.get("Range", "").strip())
+    if not match or match.groups() == ("", ""):
+        response = FileResponse(store.open(name), content_type=content_type)
+        response["Content-Length"] = size
+        response["Accept-Ranges"] = "bytes"
+        return response
+
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    body = store.read_range(name, start, end)
+    response = HttpResponse(body, content_type=content_type,
+                            status=status.HTTP_206_PARTIAL_CONTENT)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@api_view(["GET"])
+def video_trickplay(request, movie_id: int, filename: str, version=None):
+    """
+    Return a trickplay file (WebVTT index or sprite sheet) for seek previews.
+
+    Args:
+        movie_id (int): ID of the video.
+        filename (str): 'thumbnails.vtt' or 'sprite_NNN.jpg' (validated against TRICKPLAY_NAME_RE).
+        version (str): Content version of a sprite sheet, as referenced by the index.
+
+    Raises:
+        Http404: If the filename is invalid or the file cannot be found.
+
+    Returns:
+        FileResponse: The requested file; versioned sprites with a long,
+        immutable cache lifetime, the index revalidated on every use.
+    """
+    if version is None:
+        if not TRICKPLAY_NAME_RE.match(filename):
+            raise Http404("Invalid trickplay file name")
+        name = hls_name(movie_id, TRICKPLAY_DIR_NAME, filename)
+        cache_control = TRICKPLAY_CACHE_CONTROL
+    else:
+        if not (SPRITE_VERSION_RE.match(version) and SPRITE_NAME_RE.match(filename)):
+            raise Http404("Invalid trickplay file name")
+        name = hls_name(movie_id, TRICKPLAY_DIR_NAME, version, filename)
+        cache_control = IMMUTABLE_CACHE_CONTROL
+
+    content_type = TRICKPLAY_CONTENT_TYPES[Path(filename).suffix]
+    try:
+        if filename.endswith(".vtt"):
+            # Sprites are referenced relative to the index: never redirected
+            response = FileResponse(media_store().open(name), content_type=content_type)
+        else:
+            response = media_response(request, name, content_type)
+    except FileNotFoundError:
+        raise Http404("Trickplay file not found")
+    if not isinstance(response, HttpResponseRedirect):
+        # A presigned URL expires on its own schedule
+        response["Cache-Control"] = cache_control
+    return response
+
+
+def tus_response(status_code, headers=None, data=None):
+    """Response carrying the Tus-Resumable header required on every tus reply."""
+    response = Response(data, status=status_code)
+    response["Tus-Resumable"] = TUS_VERSION
+    for name, value in (headers or {}).items():
+        response[name] = value
+    return response
+
+
+def tus_version_mismatch(request):
+    """412 response if the client does not speak the supported tus version."""
+    if request.headers.get("Tus-Resumable") == TUS_VERSION:
+        return None
+    return tus_response(status.HTTP_412_PRECONDITION_FAILED,
+                        {"Tus-Version": TUS_VERSION})
+
+
+class VideoUploadCreateView(APIView):
+    """
+    Start a resumable video upload.
+
+    OPTIONS advertises the supported tus version, extensions and maximum size.
+    POST expects 'Upload-Length' and 'Upload-Metadata' with base64 encoded
+    'filename' and 'title' (optional: 'description', 'category') and returns
+    201 with the upload URL in 'Location'.
+    Uploads are restricted to staff users, like the admin upload form.
+    """
+    permission_classes = [IsAdminUser]
+
+    def options(self, request, *args, **kwargs):
+        return tus_response(status.HTTP_204_NO_CONTENT, {
+            "Tus-Version": TUS_VERSION,
+            "Tus-Extension": TUS_EXTENSIONS,
+            "Tus-Max-Size": str(settings.UPLOAD_MAX_BYTES),
+            "Tus-Checksum-Algorithm": TUS_CHECKSUM_ALGORITHM,
+        })
+
+    def post(self, request):
+        if response := tus_version_mismatch(request):
+            return response
+        try:
+            length = int(request.headers.get("Upload-Length", ""))
+            metadata = parse_upload_metadata(
+                request.headers.get("Upload-Metadata", ""))
+        except ValueError:
+            return tus_response(status.HTTP_400_BAD_REQUEST, data={
+                "detail": "Upload-Length and a valid Upload-Metadata header are required."})
+        if length <= 0 or not metadata.get("filename") or not metadata.get("title"):
+            return tus_response(status.HTTP_400_BAD_REQUEST, data={
+                "detail": "Upload-Length must be positive; metadata needs filename and title."})
+        if length > settings.UPLOAD_MAX_BYTES:
+            return tus_response(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                {"Tus-Max-Size": str(settings.UPLOAD_MAX_BYTES)})
+
+        upload = create_upload(request.user, length, metadata)
+        logger.info("Started upload %s of %d bytes: %s",
+                    upload.pk, length, upload.file_path)
+        return tus_response(status.HTTP_201_CREATED, {
+            "Location": request.build_absolute_uri(
+                reverse("video-upload-detail", args=[upload.pk])),
+        })
+
+
+class VideoUploadDetailView(APIView):
+    """
+    A single resumable upload.
+
+    HEAD returns the current 'Upload-Offset' to resume from.
+    PATCH appends the request body ('application/offset+octet-stream')
+    at 'Upload-Offset'; the body is streamed to disk, never held in memory.
+    An optional 'Upload-Checksum: sha256 <base64>' is verified per chunk.
+    When the last byte arrives, the video is created and queued for processing.
+    DELETE aborts the upload and removes its file.
+    """
+    permission_classes = [IsAdminUser]
+
+    def head(self, request, upload_id):
+        if response := tus_version_mismatch(request):
+            return response
+        # The client resumes from this offset; a lagging replica would
+        # report one below the bytes already written
+        pin_to_primary()
+        upload = get_object_or_404(VideoUpload, pk=upload_id, user=request.user)
+        return tus_response(status.HTTP_200_OK, {
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.upload_length),
+            "Cache-Control": "no-store",
+        })
+
+    def patch(self, request, upload_id):
+        if response := tus_version_mismatch(request):
+            return response
+        if request.content_type != TUS_CHUNK_CONTENT_TYPE:
+            return tus_response(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            checksum = parse_upload_checksum(request.headers.get("Upload-Checksum"))
+        except ValueError:
+            return tus_response(status.HTTP_400_BAD_REQUEST, data={
+                "detail": "Upload-Offset and Upload-Checksum must be valid."})
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+
+        upload = get_object_or_404(VideoUpload, pk=upload_id, user=request.user)
+        try:
+            # No database lock or transaction is held while the chunk
+            # streams in; the offset is advanced with a compare-and-set
+            with upload_write_lock(upload):
+                upload.refresh_from_db(fields=["offset"])
+                previous = upload.offset
+                if content_length:
+                    append_chunk(upload, request.stream, offset,
+                                 content_length, checksum)
+                elif offset != upload.offset:
+                    raise UploadOffsetMismatch()
+                if not advance_offset(upload, previous):
+                    upload.refresh_from_db(fields=["offset"])
+                    raise UploadOffsetMismatch()
+        except UploadLocked:
+            return tus_response(status.HTTP_423_LOCKED)
+        except UploadOffsetMismatch:
+            return tus_response(status.HTTP_409_CONFLICT,
+                                {"Upload-Offset": str(upload.offset)})
+        except UploadChecksumMismatch:
+            return tus_response(HTTP_460_CHECKSUM_MISMATCH,
+                                {"Upload-Offset": str(upload.offset)})
+        if upload.is_complete and upload.video_id is None:
+            finalize_upload(upload)
+        return tus_response(status.HTTP_204_NO_CONTENT,
+                            {"Upload-Offset": str(upload.offset)})
+
+    def delete(self, request, upload_id):
+        if response := tus_version_mismatch(request):
+            return response
+        upload = get_object_or_404(VideoUpload, pk=upload_id, user=request.user)
+        delete_upload(upload)
+        return tus_response(status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,126 @@
+import logging
+from django.conf import settings
+from django_redis import get_redis_connection
+from .models import Video
+from utils.renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+
+VIDEO_LIST_FIELDS = ("id", "created_at", "title",
+                     "description", "category", "thumbnail_url")
+
+CATALOG_KEY_PREFIX = "videoflix:catalog"
+CATALOG_CURRENT_KEY = f"{CATALOG_KEY_PREFIX}:current"
+CATALOG_VERSION_COUNTER_KEY = f"{CATALOG_KEY_PREFIX}:version_counter"
+CATALOG_BLOB_NAMES = ("list", "categories")
+
+# How long blobs of a superseded version stay readable after a new publish
+CATALOG_PREVIOUS_VERSION_GRACE = 60
+
+
+def catalog_items(rows):
+    """
+    Build the public catalog representation from rows of
+    .values(*VIDEO_LIST_FIELDS), avoiding model instantiation.
+
+    The thumbnail URL is made absolute using BASE_BACKEND_URL and MEDIA_URL.
+    """
+    thumbnail_base = f"{settings.BASE_BACKEND_URL}{settings.MEDIA_URL}"
+    items = list(rows)
+    for item in items:
+        if item["thumbnail_url"]:
+            item["thumbnail_url"] = thumbnail_base + item["thumbnail_url"]
+    return items
+
+
+def encode_blob(data):
+    """
+    Encode data with the API's JSON renderer,
+    so a stored blob can be returned to clients byte for byte.
+    """
+    return FastJSONRenderer().render(data)
+
+
+def build_catalog_blobs():
+    """
+    Build all public catalog blobs from the database.
+
+    Returns a dict mapping blob name to encoded JSON bytes:
+        list: all videos, newest first (the VideoListView payload).
+        categories: category names with their video IDs, newest first.
+    """
+    videos = catalog_items(
+        Video.objects.order_by("-created_at").values(*VIDEO_LIST_FIELDS))
+
+    return {
+        "list": encode_blob(videos),
+        "categories": encode_blob(
+            _group_by_category((v["id"], v["category"]) for v in videos)),
+    }
+
+
+def build_categories_blob():
+    """Build only the categories blob, reading just IDs and categories."""
+    rows = Video.objects.order_by(
+        "-created_at").values_list("id", "category")
+    return encode_blob(_group_by_category(rows))
+
+
+def _group_by_category(rows):
+    categories = {}
+    for video_id, category in rows:
+        categories.setdefault(category, []).append(video_id)
+    return [{"category": name, "video_ids": ids}
+            for name, ids in sorted(categories.items())]
+
+
+def _blob_key(version, name):
+    return f"{CATALOG_KEY_PREFIX}:v{version}:{name}"
+
+
+def publish_catalog_snapshot():
+    """
+    Build the catalog and publish it as a new version in Redis.
+
+    All blobs of the new version are written and the current-version pointer
+    is switched in one MULTI/EXEC, so readers never see a mixed snapshot.
+    The previous version stays readable for a short grace period.
+    Returns the new version number.
+    """
+    blobs = build_catalog_blobs()
+    conn = get_redis_connection("default")
+
+    previous = conn.get(CATALOG_CURRENT_KEY)
+    version = conn.incr(CATALOG_VERSION_COUNTER_KEY)
+
+    pipe = conn.pipeline(transaction=True)
+    for name, blob in blobs.items():
+        pipe.set(_blob_key(version, name), blob,
+                 ex=settings.CATALOG_SNAPSHOT_TTL)
+    pipe.set(CATALOG_CURRENT_KEY, version)
+    if previous is not None:
+        for name in CATALOG_BLOB_NAMES:
+            pipe.expire(_blob_key(previous.decode(), name),
+                        CATALOG_PREVIOUS_VERSION_GRACE)
+    pipe.execute()
+
+    logger.info("Published catalog snapshot v%s (%s)", version,
+                ", ".join(f"{n}={len(b)}B" for n, b in blobs.items()))
+    return version
+
+
+def get_catalog_blob(name):
+    """
+    Return the encoded blob of the current catalog version,
+    or None if no snapshot is available or Redis cannot be reached.
+    """
+    try:
+        conn = get_redis_connection("default")
+        version = conn.get(CATALOG_CURRENT_KEY)
+        if version is None:
+            return None
+        return conn.get(_blob_key(version.decode(), name))
+    except Exception as e:
+        logger.warning("Catalog snapshot unavailable: %s", e)
+        return None
@@ -0,0 +1,154 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from .models import Video, VideoStreamVariant
+from .storage import media_store, remove_path
+from .trickplay import TRICKPLAY_DIR_NAME
+from utils.videos import (HLS_DIR_NAME, SHARD_LEVELS, SHARD_NAME_RE,
+                          THUMBNAIL_DIR_NAME, hls_relative_dir, iter_hls_dirs,
+                          legacy_hls_paths, thumbnail_name)
+
+logger = logging.getLogger(__name__)
+
+
+def video_media_paths(video_id, file_names=()):
+    """
+    Return the paths of the media of a video: its HLS output tree
+    (renditions, audio, trickplay, playlists) and the given files relative
+    to MEDIA_ROOT (source video, thumbnail). Names pointing outside
+    MEDIA_ROOT are ignored.
+    """
+    media_root = Path(settings.MEDIA_ROOT).resolve()
+    paths = [media_root / hls_relative_dir(video_id), *legacy_hls_paths(video_id)]
+    for name in file_names:
+        path = (media_root / name).resolve()
+        if name and path.is_relative_to(media_root):
+            paths.append(path)
+        elif name:
+            logger.warning("Not deleting %s: outside MEDIA_ROOT", name)
+    return paths
+
+
+def delete_video_media(video_id, file_names=()):
+    """
+    Remove the media of a deleted video (see video_media_paths), and its
+    HLS output and thumbnail from a remote media store.
+    Returns the number of bytes freed.
+    """
+    freed = sum(remove_path(path) for path in video_media_paths(video_id, file_names))
+    store = media_store()
+    if not store.is_local:
+        freed += store.delete(hls_relative_dir(video_id))
+        freed += store.delete(thumbnail_name(video_id))
+    logger.info("Deleted media of video %s, freed %d MB", video_id, freed // 1024 ** 2)
+    return freed
+
+
+def local_hls_entries():
+    """
+    Return (video_id, name, children) for every HLS output directory in
+    MEDIA_ROOT; children maps the names of its subdirectories to the
+    target of those that are symlinks (published renditions), else None.
+    """
+    media_root = Path(settings.MEDIA_ROOT)
+    entries = []
+    for video_id, path in iter_hls_dirs():
+        children = {}
+        if path.is_dir():
+            for child in path.iterdir():
+                if child.is_symlink():
+                    children[child.name] = os.readlink(child)
+                elif child.is_dir():
+                    children[child.name] = None
+        entries.append((video_id, path.relative_to(media_root).as_posix(), children))
+    return entries
+
+
+def store_hls_entries(store):
+    """
+    Return (video_id, name, children) for every HLS output directory in a
+    remote media store, from one listing of its objects (see
+    local_hls_entries; there are no symlinks).
+    """
+    depth = SHARD_LEVELS + 1
+    entries = {}
+    for relative in store.file_sizes(HLS_DIR_NAME):
+        parts = relative.split("/")
+        if len(parts) <= depth or not parts[SHARD_LEVELS].isdigit() or \
+                not all(SHARD_NAME_RE.fullmatch(part) for part in parts[:SHARD_LEVELS]):
+            continue
+        name = "/".join([HLS_DIR_NAME, *parts[:depth]])
+        children = entries.setdefault((int(parts[SHARD_LEVELS]), name), {})
+        if len(parts) > depth + 1:
+            children[parts[depth]] = None
+    return [(video_id, name, children) for (video_id, name), children in entries.items()]
+
+
+def orphaned_media():
+    """
+    Return the names (relative to MEDIA_ROOT, as used by the media store)
+    of media that belong to no video.
+
+    - HLS output directories (sharded or legacy 'hls/<id>/') of videos
+      that no longer exist
+    - rendition directories of existing videos without a matching
+      VideoStreamVariant (e.g. left by a run that no longer produces
+      them), versions no symlink points to, and '.retired' leftovers of
+      interrupted publishing (videos in processing are skipped)
+    - thumbnails of videos that no longer exist
+
+    Media is listed in the configured store: MEDIA_ROOT, or the bucket of
+    a remote store. Directories are listed before the videos are loaded,
+    so output of a video created in between is never taken for an orphan.
+    """
+    store = media_store()
+    if store.is_local:
+        hls_dirs = local_hls_entries()
+        thumbnails = [
+            path.relative_to(settings.MEDIA_ROOT).as_posix()
+            for path in (Path(settings.MEDIA_ROOT) / THUMBNAIL_DIR_NAME).rglob("*_thumb.jpg")]
+    else:
+        hls_dirs = store_hls_entries(store)
+        thumbnails = [f"{THUMBNAIL_DIR_NAME}/{relative}"
+                      for relative in store.file_sizes(THUMBNAIL_DIR_NAME)
+                      if relative.endswith("_thumb.jpg")]
+
+    video_ids = set(Video.objects.values_list('id', flat=True))
+    processing = set(Video.objects.filter(processing_status='processing')
+                     .values_list('id', flat=True))
+    renditions = {}
+    for video_id, resolution in VideoStreamVariant.objects.values_list(
+            'video_id', 'resolution'):
+        renditions.setdefault(video_id, set()).add(resolution)
+
+    orphans = []
+    for video_id, name, children in hls_dirs:
+        if video_id not in video_ids:
+            orphans.append(name)
+        elif video_id not in processing:
+            keep = renditions.get(video_id, set()) | {TRICKPLAY_DIR_NAME}
+            # Published directories are symlinks to their current version
+            keep |= {target for child, target in children.items()
+                     if target and child in keep}
+            orphans.extend(f"{name}/{child}" for child in children if child not in keep)
+
+    for name in thumbnails:
+        video_id = name.rpartition("/")[2].removesuffix("_thumb.jpg")
+        if video_id.isdigit() and int(video_id) not in video_ids:
+            orphans.append(name)
+    return orphans
+
+
+def remove_orphaned_media(names, dry_run=False, workers=8):
+    """
+    Size (and unless dry_run, remove) the given media in the media store
+    with a pool of threads; removing large trees is dominated by
+    filesystem (or object store) latency.
+    Returns [(name, bytes)].
+    """
+    store = media_store()
+    action = store.total_size if dry_run else store.delete
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(zip(names, pool.map(action, names)))
@@ -0,0 +1,213 @@
+import math
+import subprocess
+from django.conf import settings
+
+
+SEGMENT_FILENAME_PATTERN = "segment_%05d.ts"
+
+# Audio renditions are resampled to 48 kHz: their segments are cut at AAC
+# frame boundaries (AAC_FRAME_SAMPLES each), which then lie at most 21 ms
+# apart whatever the sample rate of the source (64 ms at 16 kHz)
+AUDIO_SAMPLE_RATE = 48000
+AAC_FRAME_SAMPLES = 1024
+
+
+def segment_boundaries(duration_seconds, fast_start_segments=None,
+                       fast_start_seconds=None, segment_seconds=None):
+    """
+    Return the segment boundaries (in seconds, excluding 0) for a video.
+
+    The fast-start profile begins with HLS_FAST_START_SEGMENTS short segments
+    of HLS_FAST_START_SEGMENT_SECONDS, so the player can show the first frame
+    after a small download, and continues with HLS_SEGMENT_SECONDS segments.
+    With HLS_FAST_START_SEGMENTS = 0 every segment has the regular length.
+    """
+    if fast_start_segments is None:
+        fast_start_segments = settings.HLS_FAST_START_SEGMENTS
+    if fast_start_seconds is None:
+        fast_start_seconds = settings.HLS_FAST_START_SEGMENT_SECONDS
+    if segment_seconds is None:
+        segment_seconds = settings.HLS_SEGMENT_SECONDS
+
+    boundaries = [fast_start_seconds * (i + 1)
+                  for i in range(fast_start_segments)]
+    position = boundaries[-1] if boundaries else 0
+    while position + segment_seconds < duration_seconds:
+        position += segment_seconds
+        boundaries.append(position)
+    return [b for b in boundaries if b < duration_seconds]
+
+
+def keyframe_times(duration_seconds, boundaries, gop_seconds=None):
+    """
+    Return the keyframe times (in seconds) shared by every rendition:
+    a fixed GOP of HLS_GOP_SECONDS plus every segment boundary.
+    """
+    if gop_seconds is None:
+        gop_seconds = settings.HLS_GOP_SECONDS
+
+    times = {0, *boundaries}
+    count = 1
+    while count * gop_seconds < duration_seconds:
+        times.add(count * gop_seconds)
+        count += 1
+    return sorted(times)
+
+
+def ladder_kbps(resolution):
+    """Return the ladder bitrate of a rendition in kbit/s ('2500k' -> 2500)."""
+    return int(resolution['bitrate'].rstrip('k'))
+
+
+def sample_windows(duration_seconds):
+    """
+    Return (start, length) windows spread over the video for the complexity
+    sample; short videos are sampled as a whole.
+    """
+    count = settings.HLS_COMPLEXITY_SAMPLE_WINDOWS
+    length = settings.HLS_COMPLEXITY_SAMPLE_SECONDS / count
+    if duration_seconds <= length * count:
+        return [(0, duration_seconds)]
+    return [((duration_seconds - length) * (i + 1) / (count + 1), length)
+            for i in range(count)]
+
+
+def measure_complexity(input_path, duration_seconds, reference):
+    """
+    Estimate how hard a video is to encode.
+
+    Sample windows are encoded at HLS_CRF at the reference rendition's
+    height. The returned complexity is the sample bitrate relative to the
+    reference's ladder bitrate: below 1 for static content (talking heads),
+    above 1 for high motion. Returns None for sources without a whole
+    second to sample (their duration is stored rounded down).
+    """
+    if not duration_seconds:
+        return None
+    sample_bytes = sample_seconds = 0
+    for start, length in sample_windows(duration_seconds):
+        sample_cmd = [
+            'ffmpeg',
+            '-ss', f"{start:.3f}",
+            '-t', f"{length:.3f}",
+            '-i', str(input_path),
+            '-vf', f"scale=-2:{reference['height']}",
+            '-c:v', 'libx264',
+            '-crf', str(settings.HLS_CRF),
+            '-an',
+            '-f', 'h264',
+            '-',
+        ]
+        result = subprocess.run(sample_cmd, capture_output=True, check=True)
+        sample_bytes += len(result.stdout)
+        sample_seconds += length
+
+    sample_kbps = sample_bytes * 8 / sample_seconds / 1000
+    return sample_kbps / ladder_kbps(reference)
+
+
+def rate_control_args(resolution, complexity=None):
+    """
+    Return the ffmpeg rate control arguments of a rendition.
+
+    In 'capped_crf' mode (HLS_RATE_CONTROL) quality is set by CRF and the
+    bitrate is capped with maxrate/bufsize scaled to the content complexity:
+    simple content gets a lower cap, complex content up to
+    HLS_MAX_COMPLEXITY_FACTOR times the ladder bitrate. Content beyond that
+    factor is encoded at a slightly higher CRF, so the cap does not starve
+    it mid-scene. In 'bitrate' mode, or without a complexity measurement,
+    the fixed ladder bitrate is used.
+    """
+    if settings.HLS_RATE_CONTROL != 'capped_crf' or complexity is None:
+        return ['-b:v', resolution['bitrate']]
+
+    factor = min(max(complexity, settings.HLS_MIN_COMPLEXITY_FACTOR),
+                 settings.HLS_MAX_COMPLEXITY_FACTOR)
+    maxrate = round(ladder_kbps(resolution) * factor)
+    crf = settings.HLS_CRF
+    if complexity > settings.HLS_MAX_COMPLEXITY_FACTOR:
+        crf += min(math.ceil(math.log2(
+            complexity / settings.HLS_MAX_COMPLEXITY_FACTOR)), 4)
+    return [
+        '-crf', str(crf),
+        '-maxrate', f"{maxrate}k",
+        '-bufsize', f"{2 * maxrate}k",
+    ]
+
+
+def probe_has_audio(input_path):
+    """Return whether the source video has at least one audio stream."""
+    probe_cmd = [
+        'ffprobe',
+        '-v', 'quiet',
+        '-select_streams', 'a',
+        '-show_entries', 'stream=index',
+        '-of', 'csv=p=0',
+        str(input_path),
+    ]
+    result = subprocess.run(probe_cmd, capture_output=True, text=True, check=True)
+    return bool(result.stdout.strip())
+
+
+def segment_output_args(res_output_dir, boundaries):
+    """
+    Return the ffmpeg output arguments that cut a rendition into MPEG-TS
+    segments exactly at the given boundaries and write its HLS playlist.
+    """
+    times = ",".join(f"{b:g}" for b in boundaries)
+    return [
+        '-f', 'segment',
+        '-segment_format', 'mpegts',
+        '-segment_list', str(res_output_dir / "index.m3u8"),
+        '-segment_list_type', 'm3u8',
+        *(['-segment_times', times] if times else
+          ['-segment_time', str(settings.HLS_SEGMENT_SECONDS)]),
+        str(res_output_dir / SEGMENT_FILENAME_PATTERN),
+    ]
+
+
+def hls_ffmpeg_command(input_path, res_output_dir, resolution, boundaries,
+                       keyframes, rate_control=None):
+    """
+    Build the ffmpeg command that encodes one video-only rendition into
+    HLS segments. Audio is encoded once into the shared audio renditions
+    (see audio_ffmpeg_outputs).
+
+    Keyframes are forced at the given times (see keyframe_times) and
+    scene-cut keyframes are disabled, so all renditions built from the same
+    times have identical GOPs. The segment muxer cuts exactly at the
+    boundaries, so each segment starts with a keyframe.
+    rate_control defaults to the fixed ladder bitrate (see rate_control_args).
+    """
+    return [
+        'ffmpeg',
+        '-i', str(input_path),
+        '-vf', f"scale=-2:{resolution['height']}",
+        '-c:v', 'libx264',
+        *(rate_control or rate_control_args(resolution)),
+        '-force_key_frames', ",".join(f"{k:g}" for k in keyframes),
+        '-sc_threshold', '0',
+        '-an',
+        *segment_output_args(res_output_dir, boundaries),
+    ]
+
+
+def audio_ffmpeg_outputs(output_dir, audio_renditions, boundaries):
+    """
+    Return extra ffmpeg output arguments that encode the audio-only
+    renditions (resampled to AUDIO_SAMPLE_RATE) from an existing decode of
+    the source, segmented at the same boundaries as the video renditions.
+    """
+    outputs = []
+    for rendition in audio_renditions:
+        rendition_dir = output_dir / rendition['name']
+        rendition_dir.mkdir(parents=True, exist_ok=True)
+        outputs += [
+            '-vn',
+            '-c:a', 'aac',
+            '-b:a', rendition['bitrate'],
+            '-ac', str(rendition['channels']),
+            '-ar', str(AUDIO_SAMPLE_RATE),
+            *segment_output_args(rendition_dir, boundaries),
+        ]
+    return outputs
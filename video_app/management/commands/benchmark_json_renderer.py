@@ -0,0 +1,57 @@
+import timeit
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from utils.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmark: DRF's JSONRenderer vs. FastJSONRenderer on a synthetic
+    catalog payload shaped like the VideoListView response.
+    """
+    help = "Compare JSON renderer speed on a synthetic catalog payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=10000,
+                            help="Number of catalog items (default: 10000).")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Renders per renderer (default: 20).")
+
+    def handle(self, *args, **options):
+        payload = self.build_payload(options["items"])
+        repeat = options["repeat"]
+
+        baseline = JSONRenderer()
+        fast = FastJSONRenderer()
+        if baseline.render(payload) != fast.render(payload):
+            self.stderr.write(self.style.ERROR(
+                "Renderer outputs differ for this payload."))
+            return
+
+        results = {}
+        for name, renderer in (("JSONRenderer", baseline), ("FastJSONRenderer", fast)):
+            seconds = min(timeit.repeat(
+                lambda: renderer.render(payload), number=1, repeat=repeat))
+            results[name] = seconds
+            self.stdout.write(f"{name:<18} {seconds * 1000:8.2f} ms")
+
+        backend = "orjson" if orjson is not None else "stdlib fallback"
+        speedup = results["JSONRenderer"] / results["FastJSONRenderer"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['items']} items, best of {repeat}: {speedup:.1f}x faster ({backend})"))
+
+    def build_payload(self, count):
+        now = timezone.now()
+        return [
+            {
+                "id": i,
+                "created_at": now - timedelta(minutes=i, microseconds=i),
+                "title": f"Video title number {i}",
+                "description": "A short description of the video. " * 4,
+                "category": ("Doku", "Sport", "Drama", "Kids")[i % 4],
+                "thumbnail_url": f"http://127.0.0.1:8000/media/thumbnails/{i}_thumb.jpg" if i % 5 else None,
+            }
+            for i in range(count)
+        ]
@@ -0,0 +1,43 @@
+import tempfile
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from video_app.models import VideoStreamVariant
+from video_app.segments import store_segment_index
+from video_app.storage import media_store
+
+
+class Command(BaseCommand):
+    """
+    Backfill the segment duration index for existing stream variants
+    by parsing their HLS playlists, read through the media store.
+    """
+    help = "Build the time-to-segment index for variants that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Rebuild the index for every variant.")
+
+    def handle(self, *args, **options):
+        variants = VideoStreamVariant.objects.all()
+        if not options["all"]:
+            variants = variants.filter(segment_durations__isnull=True)
+
+        store = media_store()
+        built = 0
+        with tempfile.TemporaryDirectory() as scratch:
+            for variant in variants.iterator():
+                rendition_name, _, playlist = variant.manifest_path.rpartition("/")
+                playlist_path = store.local_dir(
+                    rendition_name, Path(scratch) / str(variant.pk)) / playlist
+                try:
+                    if not playlist:
+                        raise FileNotFoundError(variant.manifest_path)
+                    if not playlist_path.is_file():
+                        store.fetch(variant.manifest_path, playlist_path)
+                except FileNotFoundError:
+                    self.stderr.write(f"Missing playlist for {variant}: {variant.manifest_path}")
+                    continue
+                store_segment_index(variant, playlist_path)
+                built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Built segment index for {built} variant(s)."))
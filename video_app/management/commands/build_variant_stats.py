@@ -0,0 +1,52 @@
+import tempfile
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from video_app.models import VideoStreamVariant
+from video_app.playlists import read_playlist_entries, rendition_stats
+from video_app.storage import media_store
+
+
+class Command(BaseCommand):
+    """
+    Backfill measured bitrate, size, segment count and codec statistics
+    for existing stream variants from their segments in the media store.
+    With a remote store only the playlist and the first segment (for the
+    codecs) are downloaded; segment sizes come from the object listing.
+    """
+    help = "Measure stream variant statistics for variants that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Re-measure every variant.")
+
+    def handle(self, *args, **options):
+        variants = VideoStreamVariant.objects.all()
+        if not options["all"]:
+            variants = variants.filter(segment_count__isnull=True)
+
+        store = media_store()
+        measured = 0
+        with tempfile.TemporaryDirectory() as scratch:
+            for variant in variants.iterator():
+                rendition_name, _, playlist = variant.manifest_path.rpartition("/")
+                rendition_dir = store.local_dir(rendition_name, Path(scratch) / str(variant.pk))
+                try:
+                    if not playlist:
+                        raise FileNotFoundError(variant.manifest_path)
+                    if not (rendition_dir / playlist).is_file():
+                        store.fetch(variant.manifest_path, rendition_dir / playlist)
+                    entries = read_playlist_entries(rendition_dir / playlist)
+                    if entries and not (rendition_dir / entries[0][0]).exists():
+                        store.fetch(f"{rendition_name}/{entries[0][0]}",
+                                    rendition_dir / entries[0][0])
+                except FileNotFoundError:
+                    self.stderr.write(f"Missing playlist for {variant}: {variant.manifest_path}")
+                    continue
+                sizes = None if store.is_local else store.file_sizes(rendition_name)
+                stats = rendition_stats(rendition_dir, sizes)
+                for field, value in stats.items():
+                    setattr(variant, field, value)
+                variant.save(update_fields=list(stats))
+                measured += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Measured {measured} variant(s)."))
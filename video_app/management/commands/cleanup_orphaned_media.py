@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from video_app.cleanup import orphaned_media, remove_orphaned_media
+
+
+class Command(BaseCommand):
+    """
+    Remove HLS output and thumbnails that belong to no video, e.g. left
+    behind by videos deleted before their media was removed in the
+    background, or by interrupted processing runs, from the configured
+    media store.
+    """
+    help = "Remove HLS directories and thumbnails without a matching video or stream variant."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report what would be removed and the space it frees.")
+        parser.add_argument("--workers", type=int, default=8,
+                            help="Number of directories sized or removed in parallel.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        results = remove_orphaned_media(orphaned_media(), dry_run=dry_run,
+                                        workers=options["workers"])
+
+        for name, size in results:
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{name}: {size // 1024 ** 2} MB")
+
+        total = sum(size for _name, size in results)
+        verb = "Would remove" if dry_run else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(results)} orphaned path(s), "
+            f"reclaiming {total} bytes ({total // 1024 ** 2} MB)."))
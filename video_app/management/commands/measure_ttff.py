@@ -0,0 +1,80 @@
+import subprocess
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from video_app.encoding import (hls_ffmpeg_command, keyframe_times,
+                                 segment_boundaries)
+from video_app.playlists import read_playlist_entries
+from video_app.tasks import RESOLUTIONS
+
+# Requests before the first frame: master playlist, media playlist, first segment
+STARTUP_REQUESTS = 3
+
+
+class Command(BaseCommand):
+    """
+    Measure time-to-first-frame of the uniform and the fast-start segmentation
+    profile on a local video: both are encoded with the production ffmpeg
+    command, then the startup cost is computed from the real size of the
+    first segment at the given bandwidth and round-trip time.
+    """
+    help = "Compare time-to-first-frame of uniform and fast-start HLS segmentation."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="Path of a local test video.")
+        parser.add_argument("--resolution", default="720p",
+                            choices=[res["name"] for res in RESOLUTIONS],
+                            help="Rendition to encode (default: 720p).")
+        parser.add_argument("--bandwidth", type=int, default=3000,
+                            help="Client bandwidth in kbit/s (default: 3000).")
+        parser.add_argument("--rtt", type=int, default=100,
+                            help="Round-trip time in ms (default: 100).")
+
+    def handle(self, *args, **options):
+        source = Path(options["source"])
+        if not source.exists():
+            raise CommandError(f"Source not found: {source}")
+        resolution = next(res for res in RESOLUTIONS
+                          if res["name"] == options["resolution"])
+        duration = self.probe_duration(source)
+
+        profiles = (
+            ("uniform", 0),
+            ("fast-start", settings.HLS_FAST_START_SEGMENTS),
+        )
+        results = {}
+        for name, fast_start_segments in profiles:
+            boundaries = segment_boundaries(
+                duration, fast_start_segments=fast_start_segments)
+            with tempfile.TemporaryDirectory() as tmp:
+                first_duration, first_bytes = self.encode_first_segment(
+                    source, Path(tmp), resolution, boundaries,
+                    keyframe_times(duration, boundaries))
+            ttff = (STARTUP_REQUESTS * options["rtt"] / 1000
+                    + first_bytes * 8 / (options["bandwidth"] * 1000))
+            results[name] = ttff
+            self.stdout.write(
+                f"{name:<11} first segment {first_duration:5.2f}s "
+                f"{first_bytes / 1024:8.0f} KiB   TTFF {ttff * 1000:7.0f} ms")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resolution['name']} at {options['bandwidth']} kbit/s, "
+            f"{options['rtt']} ms RTT: fast-start is "
+            f"{results['uniform'] / results['fast-start']:.1f}x faster to first frame"))
+
+    def probe_duration(self, source):
+        result = subprocess.run(
+            ['ffprobe', '-v', 'quiet', '-show_entries', 'format=duration',
+             '-of', 'csv=p=0', str(source)],
+            capture_output=True, text=True, check=True)
+        return float(result.stdout.strip())
+
+    def encode_first_segment(self, source, output_dir, resolution, boundaries,
+                             keyframes):
+        subprocess.run(
+            hls_ffmpeg_command(source, output_dir, resolution, boundaries,
+                               keyframes),
+            check=True, capture_output=True, text=True)
+        uri, duration, _ = read_playlist_entries(output_dir / "index.m3u8")[0]
+        return duration, (output_dir / uri).stat().st_size
@@ -0,0 +1,121 @@
+import os
+import shutil
+from pathlib import Path
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from video_app.models import OutboxJob, Video, VideoStreamVariant, VideoUpload
+from video_app.playlists import VARIANT_PLAYLIST_NAME
+from utils.videos import (hls_relative_dir, legacy_hls_dir, legacy_hls_paths,
+                          thumbnail_name, video_upload_to)
+
+
+def link_or_copy(source, target):
+    """Create target as a second name of source (a copy across filesystems)."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class Command(BaseCommand):
+    """
+    Move media from the flat layout ('videos/<name>', 'hls/<id>/',
+    'thumbnails/<id>_thumb.jpg') to the sharded one (see utils.videos)
+    while the site is running.
+
+    HLS trees are renamed into place in one step; until then they are
+    served from their old location. Sources and thumbnails get their new
+    name first, the database is pointed at it, and only then the old name
+    is removed. Videos in processing are skipped; run again later to move
+    them. Running the command again is safe.
+    """
+    help = "Move sources, HLS output and thumbnails to the sharded media layout."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only report what would be moved.")
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.media_root = Path(settings.MEDIA_ROOT)
+        moved = {"hls": 0, "thumbnails": 0, "sources": 0}
+
+        videos = Video.objects.exclude(processing_status='processing')
+        for video in videos.iterator():
+            moved["hls"] += self.migrate_hls(video)
+            moved["thumbnails"] += self.migrate_thumbnail(video)
+            moved["sources"] += self.migrate_source(video)
+
+        if moved["thumbnails"] and not self.dry_run:
+            OutboxJob.objects.create(job="refresh_catalog")
+        verb = "Would move" if self.dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved['hls']} HLS tree(s), {moved['thumbnails']} thumbnail(s) "
+            f"and {moved['sources']} source file(s)."))
+
+    def migrate_hls(self, video):
+        sources = legacy_hls_paths(video.id)
+        if not sources:
+            return 0
+        target = self.media_root / hls_relative_dir(video.id)
+        if target.exists():
+            self.stderr.write(f"Video {video.id}: {target} exists, "
+                              f"leaving {legacy_hls_dir(video.id)} in place")
+            return 0
+        if self.dry_run:
+            return 1
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if sources == [legacy_hls_dir(video.id)]:
+            os.rename(sources[0], target)
+        else:
+            # The legacy directory is a shard as well: gather the video's
+            # entries next to the target, then rename them into place at once
+            staging = target.with_name(f".{target.name}.migrating")
+            staging.mkdir(exist_ok=True)
+            for path in sources:
+                os.rename(path, staging / path.name)
+            os.rename(staging, target)
+
+        for variant in VideoStreamVariant.objects.filter(video=video):
+            variant.manifest_path = "/".join(
+                [hls_relative_dir(video.id), variant.resolution, VARIANT_PLAYLIST_NAME])
+            variant.save(update_fields=["manifest_path"])
+        return 1
+
+    def migrate_thumbnail(self, video):
+        name = thumbnail_name(video.id)
+        if not video.thumbnail_url or video.thumbnail_url == name:
+            return 0
+        old = self.media_root / video.thumbnail_url
+        if not old.is_file():
+            return 0
+        if self.dry_run:
+            return 1
+
+        link_or_copy(old, self.media_root / name)
+        Video.objects.filter(pk=video.pk).update(thumbnail_url=name)
+        old.unlink()
+        return 1
+
+    def migrate_source(self, video):
+        old_name = video.video_file.name if video.video_file else ""
+        new_name = video_upload_to(video, os.path.basename(old_name))
+        if not old_name or Path(old_name).parent == Path(new_name).parent:
+            return 0
+        old = self.media_root / old_name
+        if not old.is_file():
+            return 0
+        if self.dry_run:
+            return 1
+
+        new_name = default_storage.get_available_name(new_name)
+        link_or_copy(old, self.media_root / new_name)
+        with transaction.atomic():
+            Video.objects.filter(pk=video.pk).update(video_file=new_name)
+            VideoUpload.objects.filter(file_path=old_name).update(file_path=new_name)
+        old.unlink()
+        return 1
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from video_app.tasks import (queue_catalog_refresh, schedule_outbox_dispatch,
+                             schedule_stuck_video_reaper,
+                             schedule_watch_progress_flush)
+
+
+class Command(BaseCommand):
+    """
+    Start the self-rescheduling periodic RQ jobs of the video app.
+
+    Safe to run on every container start: each job only schedules
+    its next run if none is already waiting.
+    """
+    help = "Start the periodic background jobs (catalog snapshot refresh, watch progress flush, outbox dispatch, stuck video reaper)."
+
+    def handle(self, *args, **options):
+        job_id = queue_catalog_refresh()
+        self.stdout.write(f"Catalog snapshot refresh queued: {job_id}")
+
+        job_id = schedule_watch_progress_flush()
+        self.stdout.write(f"Watch progress flush scheduled: {job_id}")
+
+        job_id = schedule_outbox_dispatch()
+        self.stdout.write(f"Outbox dispatch scheduled: {job_id}")
+
+        job_id = schedule_stuck_video_reaper()
+        self.stdout.write(f"Stuck video reaper scheduled: {job_id}")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:32
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0005_video_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='video_title_trgm_gin', opclasses=['gin_trgm_ops']),
+        ),
+    ]
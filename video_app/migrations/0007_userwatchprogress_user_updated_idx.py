@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0006_video_title_trgm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userwatchprogress',
+            index=models.Index(fields=['user', '-updated_at'], name='progress_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:42
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Keep only the most recently updated row per (user, video);
+# its resolution becomes the last played resolution.
+MERGE_DUPLICATE_PROGRESS_SQL = """
+    DELETE FROM video_app_userwatchprogress AS older
+    USING video_app_userwatchprogress AS newer
+    WHERE older.user_id = newer.user_id
+      AND older.video_id = newer.video_id
+      AND (older.updated_at, older.id) < (newer.updated_at, newer.id)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0007_userwatchprogress_user_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(MERGE_DUPLICATE_PROGRESS_SQL,
+                          reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterUniqueTogether(
+            name='userwatchprogress',
+            unique_together={('user', 'video')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0008_userwatchprogress_per_video'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='segment_durations',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
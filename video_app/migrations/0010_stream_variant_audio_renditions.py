@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0009_videostreamvariant_segment_durations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userwatchprogress',
+            name='resolution',
+            field=models.CharField(choices=[('360p', '360p'), ('480p', '480p'), ('720p', '720p'), ('1080p', '1080p'), ('audio', 'Audio'), ('audio_low', 'Audio (low bitrate)')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='videostreamvariant',
+            name='resolution',
+            field=models.CharField(choices=[('360p', '360p'), ('480p', '480p'), ('720p', '720p'), ('1080p', '1080p'), ('audio', 'Audio'), ('audio_low', 'Audio (low bitrate)')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0010_stream_variant_audio_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='average_bitrate',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0011_videostreamvariant_average_bitrate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='codecs',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='peak_bitrate',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='segment_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='videostreamvariant',
+            name='total_bytes',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
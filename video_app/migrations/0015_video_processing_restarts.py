@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0014_outboxjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='processing_restarts',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
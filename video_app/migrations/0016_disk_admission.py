@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0015_video_processing_restarts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxjob',
+            name='available_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='DiskReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('volume', models.CharField(max_length=255)),
+                ('reserved_bytes', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disk_reservations', to='video_app.video')),
+            ],
+            options={
+                'unique_together': {('video', 'volume')},
+            },
+        ),
+    ]
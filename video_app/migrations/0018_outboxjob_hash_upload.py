@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0017_outboxjob_delete_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxjob',
+            name='job',
+            field=models.CharField(choices=[('process_video', 'Process video'), ('refresh_catalog', 'Refresh catalog snapshot'), ('delete_media', 'Delete video media'), ('hash_upload', 'Hash uploaded file')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:04
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0018_outboxjob_hash_upload'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='video_title_upper_trgm_gin'),
+        ),
+    ]
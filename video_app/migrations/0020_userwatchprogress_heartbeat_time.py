@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_app', '0019_video_title_upper_trgm'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userwatchprogress',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
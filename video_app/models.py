@@ -1,7 +1,13 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
 from pathlib import Path
 from django.contrib.auth.models import User
-from utils.data import RESOLUTION_CHOICES, PROCESSING_CHOICES
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from utils.data import (OUTBOX_JOB_CHOICES, PROCESSING_CHOICES, SEARCH_CONFIG,
+                        STREAM_VARIANT_CHOICES)
 from utils.videos import video_upload_to
 
 
@@ -14,8 +20,18 @@ class Video(models.Model):
             (pending, processing, completed, failed).
         processing_progress (PositiveIntegerField): Progress percentage of processing.
         processing_error (TextField): Error message if processing failed.
+        processing_restarts (PositiveIntegerField): How often processing was
+            requeued after its worker died (see tasks.reap_stuck_videos);
+            reset when processing is requested again from the admin.
         duration_seconds (PositiveIntegerField): Duration of the video in seconds.
         file_size_mb (PositiveIntegerField): File size of the video in MB.
+
+    Search-related Fields:
+        search_vector (GeneratedField): Weighted full-text vector over title (A)
+            and description (B), computed by Postgres and backed by a GIN index.
+        title additionally carries pg_trgm GIN indexes for typo-tolerant
+            autocomplete: on title for word similarity, and on UPPER(title)
+            for case-insensitive substring matches.
     """
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -29,17 +45,84 @@ class Video(models.Model):
         max_length=12, choices=PROCESSING_CHOICES, default="pending")
     processing_progress = models.PositiveIntegerField(default=0)
     processing_error = models.TextField(blank=True, null=True)
+    processing_restarts = models.PositiveIntegerField(default=0, editable=False)
 
     duration_seconds = models.PositiveIntegerField(blank=True, null=True)
     file_size_mb = models.PositiveIntegerField(blank=True, null=True)
 
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="video_search_vector_gin"),
+            GinIndex(fields=["title"], name="video_title_trgm_gin",
+                     opclasses=["gin_trgm_ops"]),
+            GinIndex(OpClass(Upper("title"), name="gin_trgm_ops"),
+                     name="video_title_upper_trgm_gin"),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # post_save writes the processing outbox job; a plain save() in
+        # autocommit would commit the video without it on a crash
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class VideoUpload(models.Model):
+    """
+    A resumable (tus) upload of a video file.
+
+    The file is written directly to its final location below 'videos/'
+    in chunks; once all bytes have arrived, a Video is created from it.
+
+    Fields:
+        id (UUIDField): Upload id, part of the upload URL.
+        user (ForeignKey): Staff user who started the upload.
+        title, description, category: Metadata for the resulting Video.
+        file_path (CharField): Path of the file relative to MEDIA_ROOT.
+        upload_length (PositiveBigIntegerField): Total size in bytes.
+        offset (PositiveBigIntegerField): Number of bytes received so far.
+        sha256 (CharField): Hex SHA-256 of the file, computed in the
+            background once the upload is complete.
+        video (OneToOneField): The Video created from the finished upload.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    file_path = models.CharField(max_length=255)
+    upload_length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    video = models.OneToOneField(
+        Video, related_name='upload', blank=True, null=True,
+        on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.upload_length
+
+    def __str__(self):
+        return f"{self.title} ({self.offset}/{self.upload_length} bytes)"
+
 
 class VideoStreamVariant(models.Model):
     """
-    Represents a transcoded variant of a video at a specific resolution.
+    Represents a transcoded variant of a video at a specific resolution,
+    or one of its audio-only renditions.
 
     Each variant points to an HLS manifest file ('.m3u8') 
     that defines the stream segments for this resolution.
@@ -47,17 +130,36 @@ class VideoStreamVariant(models.Model):
     Relations:
         video (ForeignKey): The original Video object this variant belongs to.
         resolution (CharField): Resolution of the variant 
-            (e.g., 360p, 480p, 720p, 1080p).
+            (e.g., 360p, 480p, 720p, 1080p) or audio rendition (audio, audio_low).
         manifest_path (FilePathField): Path to the corresponding HLS manifest file.
+        segment_durations (BinaryField): Packed uint32 millisecond durations
+            of the segments in playlist order (see video_app.segments).
+        peak_bitrate, average_bitrate (PositiveIntegerField): Measured
+            bitrates of the encoded rendition in bits/s; the peak is the
+            highest single-segment bitrate.
+        total_bytes (PositiveBigIntegerField): Size of all segments.
+        segment_count (PositiveIntegerField): Number of segments.
+        codecs (CharField): RFC 6381 codec strings (e.g. 'avc1.64001f').
 
     Constraints:
         unique_together: Ensures that each video has only one variant per resolution.
     """
     video = models.ForeignKey(
         Video, related_name='variants', on_delete=models.CASCADE)
-    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    resolution = models.CharField(max_length=10, choices=STREAM_VARIANT_CHOICES)
     manifest_path = models.FilePathField(
         path='/app/media/hls_manifests/', match=r".*\.m3u8$", recursive=True)
+    segment_durations = models.BinaryField(
+        blank=True, null=True, editable=False)
+    peak_bitrate = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    average_bitrate = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    total_bytes = models.PositiveBigIntegerField(
+        blank=True, null=True, editable=False)
+    segment_count = models.PositiveIntegerField(
+        blank=True, null=True, editable=False)
+    codecs = models.CharField(max_length=50, blank=True, editable=False)
 
     class Meta:
         unique_together = ('video', 'resolution')
@@ -68,32 +170,94 @@ class VideoStreamVariant(models.Model):
 
 class UserWatchProgress(models.Model):
     """
-    Tracks a user's watch progress for a specific video and resolution.
+    Tracks a user's watch progress for a specific video,
+    independent of the resolution(s) the player switched through.
 
     Relations:
         user (ForeignKey): The user who is watching the video.
         video (ForeignKey): The video being watched.
-        resolution (CharField): Resolution at which the video was played.
 
     Fields:
+        resolution (CharField): Resolution the video was last played at.
         last_position_seconds (PositiveIntegerField): 
             Last playback position in seconds where the user stopped watching.
-        updated_at (DateTimeField): 
-            Timestamp automatically updated when the progress is saved.
+        updated_at (DateTimeField):
+            Time of the heartbeat the position was reported in (not the
+            time the buffered heartbeats were flushed).
 
     Constraints:
         unique_together: Ensures a user has only one progress entry 
-        per video and resolution.
+        per video.
+
+    Indexes:
+        (user, -updated_at): Serves "continue watching" and per-user overlays.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     video = models.ForeignKey(
         Video, on_delete=models.CASCADE)
-    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    resolution = models.CharField(max_length=10, choices=STREAM_VARIANT_CHOICES)
     last_position_seconds = models.PositiveIntegerField()
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        unique_together = ('user', 'video', 'resolution')
+        unique_together = ('user', 'video')
+        indexes = [
+            models.Index(fields=["user", "-updated_at"],
+                         name="progress_user_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.video.title} ({self.resolution}) @ {self.last_position_seconds}s"
+
+
+class OutboxJob(models.Model):
+    """
+    A background job waiting to be enqueued in RQ (transactional outbox).
+
+    Rows are written in the same transaction as the change that requires
+    the job, so a job exists if and only if the change was committed.
+    The periodic dispatcher (tasks.dispatch_outbox) moves them to RQ in
+    batches and deletes them.
+
+    Fields:
+        job (CharField): Kind of job (see OUTBOX_JOB_CHOICES).
+        args (JSONField): Positional arguments of the job.
+        created_at (DateTimeField): When the job was requested.
+        available_at (DateTimeField): Not dispatched before this time
+            (e.g. processing deferred for lack of disk space).
+    """
+    job = models.CharField(max_length=30, choices=OUTBOX_JOB_CHOICES)
+    args = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.job}{tuple(self.args)}"
+
+
+class DiskReservation(models.Model):
+    """
+    Disk space reserved for the output of a running processing job.
+
+    Written when a job is admitted (see admission.reserve_disk_space) and
+    deleted when it ends, so jobs admitted later account for space that
+    running jobs are about to fill.
+
+    Fields:
+        video (ForeignKey): The video being processed.
+        volume (CharField): 'media' for MEDIA_ROOT, 'scratch:<host>' for
+            the node-local HLS_SCRATCH_DIR of a worker.
+        reserved_bytes (PositiveBigIntegerField): Estimated output size.
+        created_at (DateTimeField): When the job was admitted.
+    """
+    video = models.ForeignKey(Video, on_delete=models.CASCADE,
+                              related_name='disk_reservations')
+    volume = models.CharField(max_length=255)
+    reserved_bytes = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('video', 'volume')
+
+    def __str__(self):
+        return f"{self.video_id} - {self.volume}: {self.reserved_bytes} bytes"
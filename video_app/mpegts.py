@@ -0,0 +1,161 @@
+from pathlib import Path
+
+
+TS_PACKET_SIZE = 188
+TS_SYNC_BYTE = 0x47
+
+# PMT stream types
+H264_STREAM_TYPE = 0x1B
+H265_STREAM_TYPE = 0x24
+ADTS_AAC_STREAM_TYPE = 0x0F
+VIDEO_STREAM_TYPES = {H264_STREAM_TYPE, H265_STREAM_TYPE}
+
+H264_SPS_NAL_TYPE = 7
+
+
+def packet_payload(packet):
+    """Return the payload of a TS packet, skipping an adaptation field."""
+    if packet[3] & 0x20:
+        return packet[5 + packet[4]:]
+    return packet[4:]
+
+
+def psi_section(payload):
+    """Return the PSI section of a payload that starts a section."""
+    section = payload[1 + payload[0]:]
+    length = ((section[1] & 0x0F) << 8) | section[2]
+    return section[:3 + length]
+
+
+def pes_pts(payload):
+    """Return the PTS (in 90 kHz ticks) of a PES header, or None."""
+    if payload[:3] != b"\x00\x00\x01" or not payload[7] & 0x80:
+        return None
+    b = payload[9:14]
+    return (((b[0] >> 1) & 0x07) << 30 | b[1] << 22 | (b[2] >> 1) << 15
+            | b[3] << 7 | b[4] >> 1)
+
+
+def pes_data(payload):
+    """Return the elementary stream data following a PES header."""
+    return payload[9 + payload[8]:]
+
+
+def iter_pes_starts(data):
+    """
+    Yield (byte_offset, stream_type, packet) for every TS packet that starts
+    a PES packet of an elementary stream, reading stream types from the
+    PAT and PMT on the way.
+    """
+    pmt_pids, stream_types = set(), {}
+    for offset in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        packet = data[offset:offset + TS_PACKET_SIZE]
+        if packet[0] != TS_SYNC_BYTE or not packet[1] & 0x40:
+            continue
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+
+        if pid == 0:
+            pat = psi_section(packet_payload(packet))
+            for i in range(8, len(pat) - 4, 4):
+                pmt_pids.add(((pat[i + 2] & 0x1F) << 8) | pat[i + 3])
+        elif pid in pmt_pids:
+            pmt = psi_section(packet_payload(packet))
+            i = 12 + (((pmt[10] & 0x0F) << 8) | pmt[11])
+            while i + 5 <= len(pmt) - 4:
+                stream_types[((pmt[i + 1] & 0x1F) << 8) | pmt[i + 2]] = pmt[i]
+                i += 5 + (((pmt[i + 3] & 0x0F) << 8) | pmt[i + 4])
+        elif pid in stream_types:
+            yield offset, stream_types[pid], packet
+
+
+def psi_header_length(segment_path, max_packets=64):
+    """
+    Return the length of a segment's leading program tables: the bytes up
+    to the end of its first PMT packet (including the PAT, and the SDT
+    ffmpeg writes before it). Returns None if no PMT is found in the
+    first max_packets packets.
+    """
+    with Path(segment_path).open("rb") as f:
+        data = f.read(max_packets * TS_PACKET_SIZE)
+
+    pmt_pids = set()
+    for offset in range(0, len(data) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+        packet = data[offset:offset + TS_PACKET_SIZE]
+        if packet[0] != TS_SYNC_BYTE or not packet[1] & 0x40:
+            continue
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        if pid == 0:
+            pat = psi_section(packet_payload(packet))
+            for i in range(8, len(pat) - 4, 4):
+                pmt_pids.add(((pat[i + 2] & 0x1F) << 8) | pat[i + 3])
+        elif pid in pmt_pids:
+            return offset + TS_PACKET_SIZE
+    return None
+
+
+def scan_keyframes(segment_path):
+    """
+    Return the keyframes of a transport stream segment as
+    (pts_seconds, byte_offset, byte_length) tuples.
+
+    Keyframes are the video PES packets flagged as random access points.
+    A keyframe's byte range runs from its first TS packet up to the start
+    of the next video PES packet, so it covers the complete I-frame.
+    """
+    data = Path(segment_path).read_bytes()
+    keyframes, current = [], None
+
+    for offset, stream_type, packet in iter_pes_starts(data):
+        if stream_type not in VIDEO_STREAM_TYPES:
+            continue
+        if current:
+            keyframes.append((current[0], current[1], offset - current[1]))
+        random_access = packet[3] & 0x20 and packet[4] and packet[5] & 0x40
+        pts = pes_pts(packet_payload(packet)) if random_access else None
+        current = (pts / 90000, offset) if pts is not None else None
+
+    if current:
+        keyframes.append((current[0], current[1], len(data) - current[1]))
+    return keyframes
+
+
+def h264_codec(es_data):
+    """
+    Return the RFC 6381 codec string (avc1.PPCCLL) from the sequence
+    parameter set in H.264 data, or None if it contains no SPS.
+    """
+    start = es_data.find(b"\x00\x00\x01")
+    while start != -1 and start + 6 < len(es_data):
+        if es_data[start + 3] & 0x1F == H264_SPS_NAL_TYPE:
+            return "avc1.{:02x}{:02x}{:02x}".format(*es_data[start + 4:start + 7])
+        start = es_data.find(b"\x00\x00\x01", start + 3)
+    return None
+
+
+def aac_codec(es_data):
+    """Return the codec string (mp4a.40.N) from an ADTS header, or None."""
+    if len(es_data) < 3 or es_data[0] != 0xFF or es_data[1] & 0xF0 != 0xF0:
+        return None
+    return f"mp4a.40.{(es_data[2] >> 6) + 1}"
+
+
+def probe_codecs(segment_path):
+    """
+    Return the codec strings of the H.264 and AAC streams of a transport
+    stream segment, video first. Streams that cannot be identified from
+    the segment are left out.
+    """
+    codecs = {}
+    for _, stream_type, packet in iter_pes_starts(Path(segment_path).read_bytes()):
+        if stream_type in codecs:
+            continue
+        es_data = pes_data(packet_payload(packet))
+        if stream_type == H264_STREAM_TYPE:
+            codec = h264_codec(es_data)
+        elif stream_type == ADTS_AAC_STREAM_TYPE:
+            codec = aac_codec(es_data)
+        else:
+            continue
+        if codec:
+            codecs[stream_type] = codec
+    return [codecs[t] for t in (H264_STREAM_TYPE, ADTS_AAC_STREAM_TYPE) if t in codecs]
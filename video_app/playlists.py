@@ -0,0 +1,247 @@
+import logging
+import math
+from pathlib import Path
+from .encoding import AAC_FRAME_SAMPLES, AUDIO_SAMPLE_RATE
+from .mpegts import probe_codecs, psi_header_length, scan_keyframes
+from .scratch import write_text_atomic
+
+logger = logging.getLogger(__name__)
+
+
+MASTER_PLAYLIST_NAME = "master.m3u8"
+VARIANT_PLAYLIST_NAME = "index.m3u8"
+IFRAME_PLAYLIST_NAME = "iframes.m3u8"
+AUDIO_GROUP_ID = "audio"
+
+# Allowed difference between the durations of aligned segments (one frame at 24 fps)
+ALIGNMENT_TOLERANCE_SECONDS = 0.042
+# Each end of an audio segment lies on an AAC frame boundary up to one frame
+# away from the video's, so its duration may differ by up to two frames
+AUDIO_ALIGNMENT_TOLERANCE_SECONDS = max(
+    ALIGNMENT_TOLERANCE_SECONDS, 2 * AAC_FRAME_SAMPLES / AUDIO_SAMPLE_RATE)
+
+
+class RenditionAlignmentError(Exception):
+    """Segments of the renditions of a video do not line up."""
+
+
+def read_playlist_entries(playlist_path):
+    """
+    Read the media entries of an HLS playlist as (uri, duration, byterange)
+    tuples; byterange is (length, offset) or None.
+    """
+    entries = []
+    duration = byterange = None
+    with open(playlist_path, "r") as playlist:
+        for line in playlist:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].split(",")[0])
+            elif line.startswith("#EXT-X-BYTERANGE:"):
+                length, _, offset = line[len("#EXT-X-BYTERANGE:"):].partition("@")
+                byterange = (int(length), int(offset or 0))
+            elif line and not line.startswith("#"):
+                entries.append((line, duration, byterange))
+                duration = byterange = None
+    return entries
+
+
+def build_iframe_playlist(keyframes, total_duration, header_lengths=None):
+    """
+    Build an EXT-X-I-FRAMES-ONLY playlist from (segment_name, pts_seconds,
+    byte_offset, byte_length) tuples in presentation order.
+    Each I-frame lasts until the next one; the last until the end of the video.
+
+    The I-frame byte ranges do not contain the PAT and PMT needed to decode
+    them, so each segment's leading program tables ({segment_name: length},
+    see mpegts.psi_header_length) are declared with EXT-X-MAP (RFC 8216,
+    section 4.3.2.5), which requires version 5.
+    """
+    header_lengths = header_lengths or {}
+    first_pts = keyframes[0][1]
+    durations = [nxt[1] - cur[1] for cur, nxt in zip(keyframes, keyframes[1:])]
+    durations.append(max(total_duration - (keyframes[-1][1] - first_pts), 0.001))
+
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:5",
+        f"#EXT-X-TARGETDURATION:{math.ceil(max(durations))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-I-FRAMES-ONLY",
+    ]
+    mapped = None
+    for (segment_name, _, offset, length), duration in zip(keyframes, durations):
+        header_length = header_lengths.get(segment_name)
+        if header_length and segment_name != mapped:
+            lines.append(f"#EXT-X-MAP:URI=\"{segment_name}\",BYTERANGE=\"{header_length}@0\"")
+            mapped = segment_name
+        lines += [
+            f"#EXTINF:{duration:.6f},",
+            f"#EXT-X-BYTERANGE:{length}@{offset}",
+            segment_name,
+        ]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def write_iframe_playlist(res_output_dir):
+    """
+    Write the I-frame playlist of a rendition next to its media playlist.
+    It references keyframe byte ranges inside the existing segments,
+    so no additional media is stored. Returns the playlist path, or None
+    if the rendition has no keyframes.
+    """
+    entries = read_playlist_entries(res_output_dir / VARIANT_PLAYLIST_NAME)
+
+    keyframes, header_lengths = [], {}
+    for segment_name, _, _ in entries:
+        segment_path = res_output_dir / segment_name
+        for pts_time, offset, length in scan_keyframes(segment_path):
+            keyframes.append((segment_name, pts_time, offset, length))
+        header_lengths[segment_name] = psi_header_length(segment_path)
+    if not keyframes:
+        logger.warning("No keyframes found in %s", res_output_dir)
+        return None
+
+    iframe_path = res_output_dir / IFRAME_PLAYLIST_NAME
+    iframe_path.write_text(build_iframe_playlist(
+        keyframes, sum(duration for _, duration, _ in entries), header_lengths))
+    logger.debug("Wrote I-frame playlist with %d keyframes: %s",
+                 len(keyframes), iframe_path)
+    return iframe_path
+
+
+def verify_rendition_alignment(output_dir, rendition_names, audio_names=()):
+    """
+    Check that all renditions (video, then audio-only) have the same number
+    of segments and that aligned segments have the same duration, so
+    players can switch between renditions at any segment boundary. Audio
+    segments are compared with AUDIO_ALIGNMENT_TOLERANCE_SECONDS.
+
+    Raises RenditionAlignmentError describing the first mismatch.
+    """
+    reference_name, *others = rendition_names
+    reference = [duration for _, duration, _ in read_playlist_entries(
+        output_dir / reference_name / VARIANT_PLAYLIST_NAME)]
+
+    tolerances = [ALIGNMENT_TOLERANCE_SECONDS] * len(others) + \
+        [AUDIO_ALIGNMENT_TOLERANCE_SECONDS] * len(audio_names)
+    for name, tolerance in zip([*others, *audio_names], tolerances):
+        durations = [duration for _, duration, _ in read_playlist_entries(
+            output_dir / name / VARIANT_PLAYLIST_NAME)]
+        if len(durations) != len(reference):
+            raise RenditionAlignmentError(
+                f"{name} has {len(durations)} segments, "
+                f"{reference_name} has {len(reference)}")
+        for index, (expected, actual) in enumerate(zip(reference, durations)):
+            if abs(expected - actual) > tolerance:
+                raise RenditionAlignmentError(
+                    f"Segment {index} of {name} lasts {actual:.3f}s, "
+                    f"{expected:.3f}s in {reference_name}")
+
+
+def peak_bandwidth(playlist_path):
+    """
+    Return the peak bitrate (bits/s) over the entries of a playlist, as
+    required for the BANDWIDTH attribute. Byte ranges count by their length,
+    whole segments by their file size.
+    """
+    playlist_dir = Path(playlist_path).parent
+    peak = 0
+    for uri, duration, byterange in read_playlist_entries(playlist_path):
+        if not duration:
+            continue
+        size = byterange[0] if byterange else (playlist_dir / uri).stat().st_size
+        peak = max(peak, math.ceil(size * 8 / duration))
+    return peak
+
+
+def rendition_stats(rendition_dir, sizes=None):
+    """
+    Measure a rendition in one pass over its playlist and segments.
+
+    Segment sizes are read from rendition_dir, or from sizes ({segment
+    name: bytes}) for a rendition of which only the playlist and the first
+    segment are available locally.
+
+    Returns a dict with peak_bitrate and average_bitrate (bits/s; the peak
+    is the highest single-segment bitrate), total_bytes, segment_count and
+    codecs (RFC 6381 codec strings read from the first segment).
+    """
+    entries = read_playlist_entries(rendition_dir / VARIANT_PLAYLIST_NAME)
+    peak = total_bytes = total_duration = 0
+    for uri, duration, _ in entries:
+        size = sizes[uri] if sizes is not None else (rendition_dir / uri).stat().st_size
+        total_bytes += size
+        total_duration += duration or 0
+        if duration:
+            peak = max(peak, math.ceil(size * 8 / duration))
+
+    return {
+        'peak_bitrate': peak,
+        'average_bitrate': round(total_bytes * 8 / total_duration) if total_duration else None,
+        'total_bytes': total_bytes,
+        'segment_count': len(entries),
+        'codecs': ",".join(probe_codecs(rendition_dir / entries[0][0])) if entries else "",
+    }
+
+
+def _stream_attributes(*variants):
+    """BANDWIDTH, AVERAGE-BANDWIDTH and CODECS of variants played together."""
+    attributes = f"BANDWIDTH={sum(v.peak_bitrate or 0 for v in variants)}"
+    if all(v.average_bitrate for v in variants):
+        attributes += f",AVERAGE-BANDWIDTH={sum(v.average_bitrate for v in variants)}"
+    if all(v.codecs for v in variants):
+        attributes += f",CODECS=\"{','.join(v.codecs for v in variants)}\""
+    return attributes
+
+
+def build_master_playlist(output_dir, variants, audio_variant=None,
+                          audio_only_variant=None):
+    """
+    Build the master playlist from the measured stream variants of a video.
+
+    Video variants (lowest to highest quality) are advertised with their
+    media playlist and, if present in output_dir, their I-frame playlist.
+    The audio variant is declared as the shared audio group (EXT-X-MEDIA)
+    of all video variants and counted in their bandwidth and codecs; the
+    audio-only variant is added as a separate low-bandwidth stream.
+    """
+    lines = ["#EXTM3U", "#EXT-X-VERSION:4"]
+    audio_variants = ()
+    audio_attribute = ""
+    if audio_variant:
+        audio_variants = (audio_variant,)
+        audio_attribute = f",AUDIO=\"{AUDIO_GROUP_ID}\""
+        lines.append(
+            f"#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID=\"{AUDIO_GROUP_ID}\",NAME=\"Default\","
+            f"DEFAULT=YES,AUTOSELECT=YES,URI=\"{audio_variant.resolution}/{VARIANT_PLAYLIST_NAME}\"")
+
+    iframe_lines = []
+    for variant in variants:
+        name = variant.resolution
+        lines += [
+            f"#EXT-X-STREAM-INF:{_stream_attributes(variant, *audio_variants)}{audio_attribute}",
+            f"{name}/{VARIANT_PLAYLIST_NAME}",
+        ]
+        iframe_path = output_dir / name / IFRAME_PLAYLIST_NAME
+        if iframe_path.exists():
+            codecs = f",CODECS=\"{variant.codecs}\"" if variant.codecs else ""
+            iframe_lines.append(
+                f"#EXT-X-I-FRAME-STREAM-INF:BANDWIDTH={peak_bandwidth(iframe_path)}"
+                f"{codecs},URI=\"{name}/{IFRAME_PLAYLIST_NAME}\"")
+
+    if audio_only_variant:
+        lines += [
+            f"#EXT-X-STREAM-INF:{_stream_attributes(audio_only_variant)}",
+            f"{audio_only_variant.resolution}/{VARIANT_PLAYLIST_NAME}",
+        ]
+    return "\n".join(lines + iframe_lines) + "\n"
+
+
+def write_master_playlist(output_dir, variants, audio_variant=None,
+                          audio_only_variant=None):
+    """Write the master playlist of a video into output_dir."""
+    return write_text_atomic(output_dir / MASTER_PLAYLIST_NAME, build_master_playlist(
+        output_dir, variants, audio_variant, audio_only_variant))
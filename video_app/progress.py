@@ -0,0 +1,160 @@
+import logging
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django_redis import get_redis_connection
+from .models import UserWatchProgress, Video
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+# Heartbeats are buffered in one Redis hash:
+#   field "<user_id>:<video_id>" -> "<position>|<resolution>|<unix timestamp>"
+# A heartbeat is a single HSET; repeated heartbeats overwrite the same field.
+PROGRESS_PENDING_KEY = "videoflix:progress:pending"
+PROGRESS_FLUSHING_KEY = "videoflix:progress:flushing"
+
+# Largest position UserWatchProgress.last_position_seconds (a
+# PositiveIntegerField) can hold
+MAX_POSITION_SECONDS = 2 ** 31 - 1
+
+
+def record_heartbeat(user_id, video_id, position, resolution):
+    """Buffer the latest playback position of a user for a video in Redis."""
+    conn = get_redis_connection("default")
+    conn.hset(PROGRESS_PENDING_KEY, f"{user_id}:{video_id}",
+              f"{position}|{resolution}|{int(time.time())}")
+
+
+def parse_progress_entry(field, value):
+    """
+    Parse one buffered hash entry.
+    Returns (user_id, video_id, position, resolution, updated_at).
+    """
+    if isinstance(field, bytes):
+        field, value = field.decode(), value.decode()
+    user_id, video_id = (int(part) for part in field.split(":"))
+    position, resolution, timestamp = value.split("|")
+    updated_at = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+    if not 0 <= int(position) <= MAX_POSITION_SECONDS:
+        raise ValueError(f"Position out of range: {position}")
+    return user_id, video_id, int(position), resolution, updated_at
+
+
+def upsert_progress_entries(entries):
+    """
+    Write parsed entries to UserWatchProgress with one INSERT ... ON CONFLICT.
+    updated_at is the heartbeat's time, so "continue watching" follows
+    viewing time rather than flush batches. Entries for deleted users or
+    videos are dropped and duplicate keys are collapsed. Returns the number
+    of rows written.
+    """
+    video_ids = Video.objects.filter(
+        id__in={e[1] for e in entries}).values_list("id", flat=True)
+    user_ids = User.objects.filter(
+        id__in={e[0] for e in entries}).values_list("id", flat=True)
+    video_ids, user_ids = set(video_ids), set(user_ids)
+
+    rows = {
+        (user_id, video_id): UserWatchProgress(
+            user_id=user_id, video_id=video_id, resolution=resolution,
+            last_position_seconds=position, updated_at=updated_at)
+        for user_id, video_id, position, resolution, updated_at in entries
+        if user_id in user_ids and video_id in video_ids
+    }.values()
+    UserWatchProgress.objects.bulk_create(
+        list(rows),
+        update_conflicts=True,
+        unique_fields=["user", "video"],
+        update_fields=["resolution", "last_position_seconds", "updated_at"],
+    )
+    return len(rows)
+
+
+def write_progress_batch(batch):
+    """
+    Upsert a batch of parsed entries. If the batch cannot be written, its
+    entries are written one by one and those the database rejects are
+    skipped, so one bad entry cannot hold back the rest. Returns the
+    number of rows written.
+    """
+    try:
+        with transaction.atomic():
+            return upsert_progress_entries(batch)
+    except DatabaseError:
+        logger.exception("Writing a batch of %d progress entries failed", len(batch))
+
+    written = 0
+    for entry in batch:
+        try:
+            with transaction.atomic():
+                written += upsert_progress_entries([entry])
+        except DatabaseError:
+            logger.warning("Skipping unwritable progress entry %d:%d", entry[0], entry[1])
+    return written
+
+
+def flush_progress():
+    """
+    Move buffered heartbeats from Redis into UserWatchProgress in batches.
+
+    The pending hash is atomically renamed to a flushing key, so heartbeats
+    arriving during the flush start a fresh pending hash. A flushing hash left
+    behind by a crashed run is drained first. Malformed or unwritable entries
+    are skipped. Returns the number of rows written.
+    """
+    conn = get_redis_connection("default")
+    if not conn.exists(PROGRESS_FLUSHING_KEY):
+        if not conn.exists(PROGRESS_PENDING_KEY):
+            return 0
+        conn.rename(PROGRESS_PENDING_KEY, PROGRESS_FLUSHING_KEY)
+
+    batch_size = settings.PROGRESS_FLUSH_BATCH_SIZE
+    written = 0
+    batch = []
+    for field, value in conn.hscan_iter(PROGRESS_FLUSHING_KEY, count=batch_size):
+        try:
+            batch.append(parse_progress_entry(field, value))
+        except ValueError:
+            logger.warning("Skipping malformed progress entry %r", field)
+        if len(batch) >= batch_size:
+            written += write_progress_batch(batch)
+            batch = []
+    if batch:
+        written += write_progress_batch(batch)
+
+    conn.delete(PROGRESS_FLUSHING_KEY)
+    logger.info("Flushed %d watch progress entries", written)
+    return written
+
+
+def progress_by_video(user, video_ids=None):
+    """
+    Return {video_id: last_position_seconds} of a user in one indexed
+    query: for the given videos, or for all of the user's rows (read
+    through the (user, -updated_at) index) if video_ids is None.
+    """
+    rows = UserWatchProgress.objects.filter(user=user)
+    if video_ids is None:
+        rows = rows.order_by("-updated_at")
+    else:
+        rows = rows.filter(video_id__in=video_ids)
+    return dict(rows.values_list("video_id", "last_position_seconds"))
+
+
+def overlay_progress(user, items, whole_catalog=False):
+    """
+    Add the user's last_position_seconds (or None) to catalog items in place.
+    A page of items filters the user's rows by their IDs; the whole
+    catalog reads all of the user's rows instead of one IN list of every
+    catalog ID.
+    """
+    positions = progress_by_video(
+        user, None if whole_catalog else [item["id"] for item in items])
+    for item in items:
+        item["last_position_seconds"] = positions.get(item["id"])
+    return items
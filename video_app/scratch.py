@@ -0,0 +1,96 @@
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def scratch_prefix(video_id):
+    return f"video-{video_id}-"
+
+
+@contextmanager
+def scratch_directory(video_id):
+    """
+    Yield a fresh scratch directory for one processing run of a video,
+    inside HLS_SCRATCH_DIR (a fast node-local disk or tmpfs).
+
+    Leftovers of earlier runs of the same video (e.g. from a killed worker)
+    are removed first; the caller holds the video's processing lock, so no
+    other run uses them. The directory is removed when the run ends,
+    whether it succeeded or failed.
+    """
+    root = Path(settings.HLS_SCRATCH_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    for stale in root.glob(f"{scratch_prefix(video_id)}*"):
+        logger.info("Removing stale scratch directory %s", stale)
+        shutil.rmtree(stale, ignore_errors=True)
+
+    scratch_dir = Path(tempfile.mkdtemp(prefix=scratch_prefix(video_id), dir=root))
+    try:
+        yield scratch_dir
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def version_dir_prefix(name):
+    """Prefix of the versioned directories behind a published directory."""
+    return f".{name}.v"
+
+
+def publish_directory(source, target):
+    """
+    Move a finished directory from scratch space to its public location.
+
+    The directory is moved into a new versioned directory next to the
+    target (a copy if scratch space is on another filesystem), and the
+    target is a symlink to the current version. The symlink is replaced
+    with os.replace, so readers see either the previous version or the
+    complete new one, never partial or missing output. The previous
+    version is removed after the swap.
+
+    A target that is still a plain directory (published before versioning)
+    is renamed aside first, which leaves a short window without output.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    version = target.with_name(f"{version_dir_prefix(target.name)}{uuid.uuid4().hex[:12]}")
+    shutil.move(str(source), str(version))
+
+    previous = None
+    if target.is_symlink():
+        previous = target.with_name(os.readlink(target))
+    elif target.exists():
+        previous = target.with_name(f".{target.name}.retired")
+        shutil.rmtree(previous, ignore_errors=True)
+        os.rename(target, previous)
+
+    link = target.with_name(f".{target.name}.publishing")
+    link.unlink(missing_ok=True)
+    os.symlink(version.name, link)
+    os.replace(link, target)
+    if previous and previous != version:
+        shutil.rmtree(previous, ignore_errors=True)
+    logger.debug("Published %s as %s", target, version.name)
+    return target
+
+
+def publish_file(source, target):
+    """Move a finished file from scratch space to its public location, replacing it atomically."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = target.with_name(f".{target.name}.publishing")
+    shutil.move(str(source), str(staging))
+    os.replace(staging, target)
+    return target
+
+
+def write_text_atomic(path, text):
+    """Write a text file via a temporary file and a rename, so it is never seen half-written."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,92 @@
+import bisect
+import logging
+import struct
+from itertools import accumulate
+from django.core.cache import cache
+from .models import VideoStreamVariant
+
+logger = logging.getLogger(__name__)
+
+
+# Segment durations are stored as packed little-endian uint32 milliseconds,
+# one entry per segment in playlist order (4 bytes per segment).
+SEGMENT_INDEX_CACHE_TTL = 24 * 3600
+SEGMENT_NAME_TEMPLATE = "segment_{:05d}.ts"
+
+
+def segment_index_cache_key(video_id, resolution):
+    return f"segment_index:{video_id}:{resolution}"
+
+
+def parse_segment_durations(playlist_path):
+    """
+    Read the #EXTINF durations (in seconds) of an HLS media playlist,
+    in playlist order.
+    """
+    durations = []
+    with open(playlist_path, "r") as playlist:
+        for line in playlist:
+            if line.startswith("#EXTINF:"):
+                durations.append(float(line[len("#EXTINF:"):].split(",")[0]))
+    return durations
+
+
+def pack_durations(durations):
+    """Pack durations in seconds into compact uint32 milliseconds."""
+    return struct.pack(f"<{len(durations)}I", *(round(d * 1000) for d in durations))
+
+
+def unpack_durations(packed):
+    """Unpack compact durations into a tuple of milliseconds."""
+    return struct.unpack(f"<{len(packed) // 4}I", packed)
+
+
+def store_segment_index(variant, playlist_path):
+    """
+    Parse the rendition's playlist and store the packed segment durations
+    on the variant and in the cache.
+    """
+    packed = pack_durations(parse_segment_durations(playlist_path))
+    variant.segment_durations = packed
+    variant.save(update_fields=["segment_durations"])
+    cache.set(segment_index_cache_key(variant.video_id, variant.resolution),
+              packed, SEGMENT_INDEX_CACHE_TTL)
+    logger.debug("Stored segment index for video %s %s: %d segments",
+                 variant.video_id, variant.resolution, len(packed) // 4)
+    return packed
+
+
+def get_segment_durations(video_id, resolution):
+    """
+    Return the segment durations (ms) of a variant, or None if unknown.
+    Served from the cache; the database is read only on a cache miss.
+    """
+    key = segment_index_cache_key(video_id, resolution)
+    packed = cache.get(key)
+    if packed is None:
+        packed = (
+            VideoStreamVariant.objects.filter(
+                video_id=video_id, resolution=resolution)
+            .values_list("segment_durations", flat=True)
+            .first()
+        )
+        if packed is None:
+            return None
+        packed = bytes(packed)
+        cache.set(key, packed, SEGMENT_INDEX_CACHE_TTL)
+    return unpack_durations(packed)
+
+
+def locate_segment(durations_ms, seconds):
+    """
+    Map a timestamp to the segment containing it.
+
+    Returns (index, segment_start_seconds, offset_seconds). Timestamps past
+    the end map to the last segment; returns None for an empty index.
+    """
+    if not durations_ms:
+        return None
+    ends = list(accumulate(durations_ms))
+    index = min(bisect.bisect_right(ends, seconds * 1000), len(ends) - 1)
+    start_ms = ends[index] - durations_ms[index]
+    return index, start_ms / 1000, max(seconds - start_ms / 1000, 0.0)
@@ -1,8 +1,6 @@
-import os
-from .models import Video
+from .models import OutboxJob, Video
 from django.dispatch import receiver
 from django.db.models.signals import post_save, post_delete
-from .tasks import queue_video_processing
 from django.conf import settings
 from urllib.parse import urlparse
 import logging
@@ -14,45 +12,33 @@ logger = logging.getLogger(__name__)
 def video_post_save(sender, instance: Video, created, **kwargs):
     """
     When a new video is created (or when the file has been replaced),
-    a single processing job is enqueued.
+    a single processing job is requested through the outbox, in the
+    same transaction as the video row (Video.save runs in one; see
+    tasks.dispatch_outbox).
     """
     if not instance.video_file:
         return
 
     if created:
         logger.info(
-            "New video created -> enqueue processing for %s", instance.id)
-        queue_video_processing(instance.id)
+            "New video created -> request processing for %s", instance.id)
+        OutboxJob.objects.create(job="process_video", args=[instance.id])
 
 
 @receiver(post_delete, sender=Video)
 def auto_delete_file_on_delete(sender, instance, **kwargs):
     """
-    Deletes file and thumbnail from filesystem
-    when corresponding 'Video' object is deleted.
+    When a video is deleted, removing its HLS output, source file and
+    thumbnail is requested through the outbox: deleting large segment
+    trees would block the request (see tasks.delete_video_media_job).
     """
     logger.info("post_delete triggered for Video ID %s", instance.id)
-    
-    if instance.video_file and os.path.isfile(instance.video_file.path):
-        try:
-            os.remove(instance.video_file.path)
-            logger.info("Deleted video file: %s", instance.video_file.path)
-        except Exception as e:
-            logger.warning(
-                "Could not delete video file %s: %s", instance.video_file.path, e)
+    OutboxJob.objects.create(job="refresh_catalog")
 
+    file_names = []
+    if instance.video_file:
+        file_names.append(instance.video_file.name)
     if instance.thumbnail_url:
         parsed = urlparse(instance.thumbnail_url)
-        thumb_path = parsed.path.replace("/media/", "", 1)
-        thumb_full_path = os.path.join(settings.MEDIA_ROOT, thumb_path)
-
-        if os.path.isfile(thumb_full_path):
-            try:
-                os.remove(thumb_full_path)
-                logger.info("Deleted thumbnail: %s", thumb_full_path)
-            except Exception as e:
-                logger.warning(
-                    "Could not delete thumbnail: %s: $s", thumb_full_path, e)
-
-        else:
-            logger.info("Thumbnail file not found: %s", thumb_full_path)
+        file_names.append(parsed.path.replace(settings.MEDIA_URL, "", 1).lstrip("/"))
+    OutboxJob.objects.create(job="delete_media", args=[instance.id, file_names])
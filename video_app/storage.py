@@ -0,0 +1,332 @@
+import logging
+import mimetypes
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .scratch import publish_directory, publish_file
+
+logger = logging.getLogger(__name__)
+
+# Uploaded after the media they reference, so a reader never sees a
+# playlist (or WebVTT index) pointing at a missing segment (or sprite)
+INDEX_SUFFIXES = {".m3u8", ".vtt"}
+
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/MP2T",
+    ".vtt": "text/vtt",
+}
+
+# S3 error codes of a missing object
+S3_MISSING_CODES = {"404", "NoSuchKey", "NotFound"}
+S3_DELETE_BATCH_SIZE = 1000
+
+
+def tree_size(path):
+    """Return the size in bytes of a file or of all files below a directory."""
+    try:
+        if not path.is_dir() or path.is_symlink():
+            return path.lstat().st_size
+    except FileNotFoundError:
+        return 0
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def remove_path(path):
+    """
+    Remove a file or directory tree, ignoring what is already gone.
+    Returns the number of bytes freed.
+    """
+    size = tree_size(path)
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+    return size
+
+
+class LocalMediaStore:
+    """
+    Published media (HLS output, thumbnails) in MEDIA_ROOT on a local or
+    shared (NFS) filesystem. Names are paths relative to MEDIA_ROOT.
+    """
+    is_local = True
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, name):
+        return self.root / name
+
+    def local_dir(self, name, scratch_dir):
+        """Return the local directory the published output of name can be read from."""
+        return self.path(name)
+
+    def publish_directory(self, local_dir, name):
+        """Publish a finished directory atomically; returns its local path."""
+        return publish_directory(local_dir, self.path(name))
+
+    def publish_file(self, local_path, name):
+        """Publish a finished file atomically; returns its local path."""
+        target = self.path(name)
+        if Path(local_path) != target:
+            publish_file(local_path, target)
+        return target
+
+    def exists(self, name):
+        return self.path(name).exists()
+
+    def size(self, name):
+        return self.path(name).stat().st_size
+
+    def open(self, name):
+        return self.path(name).open("rb")
+
+    def read_range(self, name, start, end):
+        with self.path(name).open("rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    def url(self, name):
+        return None
+
+    def fetch(self, name, local_path):
+        """Copy a published file to local_path (e.g. into scratch space)."""
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.path(name), local_path)
+        return local_path
+
+    def file_sizes(self, name):
+        """Return {relative name: bytes} of the files below the directory name."""
+        root = self.path(name)
+        sizes = {}
+        for directory, _dirs, files in os.walk(root):
+            for file_name in files:
+                path = Path(directory) / file_name
+                sizes[path.relative_to(root).as_posix()] = path.lstat().st_size
+        return sizes
+
+    def total_size(self, name):
+        """Return the size in bytes of a file or of all files below a directory."""
+        return tree_size(self.path(name))
+
+    def delete(self, name):
+        """Remove a file or a directory tree; returns the number of bytes freed."""
+        return remove_path(self.path(name))
+
+
+class S3MediaStore:
+    """
+    Published media in an S3-compatible bucket, keyed by the name relative
+    to MEDIA_ROOT (plus an optional prefix).
+
+    Directories are published with parallel uploads (large files in
+    multipart uploads, see transfer_config): media first, then the
+    playlists that reference it, then stale objects of a previous version
+    are removed. The output of a processing run stays readable in its
+    scratch directory until the run ends.
+
+    Uploaded sources are not kept here: tus chunks are appended to files
+    in MEDIA_ROOT, which therefore stays shared between web and worker
+    nodes.
+
+    `client` is a boto3 S3 client or an object with the same methods.
+    """
+    is_local = False
+
+    def __init__(self, bucket, client, transfer_config=None, prefix="",
+                 workers=8, url_expiry=3600):
+        self.bucket = bucket
+        self.client = client
+        self.transfer_config = transfer_config
+        self.prefix = prefix
+        self.workers = workers
+        self.url_expiry = url_expiry
+
+    def key(self, name):
+        return f"{self.prefix}{name}"
+
+    def local_dir(self, name, scratch_dir):
+        """Return the local directory the published output of name can be read from."""
+        return scratch_dir
+
+    def upload(self, local_path, name):
+        content_type = CONTENT_TYPES.get(local_path.suffix) or \
+            mimetypes.guess_type(local_path.name)[0] or "application/octet-stream"
+        options = {"Config": self.transfer_config} if self.transfer_config else {}
+        self.client.upload_file(str(local_path), self.bucket, self.key(name),
+                                ExtraArgs={"ContentType": content_type}, **options)
+        return name
+
+    def upload_many(self, files):
+        """Upload {name: local path} with a pool of workers."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self.upload, files.values(), files.keys()))
+
+    def publish_directory(self, local_dir, name):
+        """Upload a finished directory; returns local_dir, which is kept."""
+        files = {f"{name}/{path.relative_to(local_dir).as_posix()}": path
+                 for path in sorted(local_dir.rglob("*")) if path.is_file()}
+        indexes = {n: p for n, p in files.items() if p.suffix in INDEX_SUFFIXES}
+        self.upload_many({n: p for n, p in files.items() if n not in indexes})
+        self.upload_many(indexes)
+
+        stale = [key for key, _size in self.list(name) if key not in
+                 {self.key(n) for n in files}]
+        self.delete_keys(stale)
+        logger.debug("Published %d files to s3://%s/%s", len(files), self.bucket,
+                     self.key(name))
+        return local_dir
+
+    def publish_file(self, local_path, name):
+        """Upload a finished file; returns local_path, which is kept."""
+        self.upload(Path(local_path), name)
+        return local_path
+
+    def head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+        except Exception as e:
+            if is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def exists(self, name):
+        try:
+            self.head(name)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def size(self, name):
+        return self.head(name)["ContentLength"]
+
+    def get(self, name, **options):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key(name),
+                                          **options)["Body"]
+        except Exception as e:
+            if is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def open(self, name):
+        return self.get(name)
+
+    def read_range(self, name, start, end):
+        return self.get(name, Range=f"bytes={start}-{end}").read()
+
+    def url(self, name):
+        """Return a presigned GET URL, valid for url_expiry seconds."""
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.key(name)},
+            ExpiresIn=self.url_expiry)
+
+    def fetch(self, name, local_path):
+        """Download a published file to local_path (e.g. into scratch space)."""
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self.client.download_file(self.bucket, self.key(name), str(local_path))
+        except Exception as e:
+            if is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+        return local_path
+
+    def list(self, name):
+        """Return (key, size) of the object name and the objects below name/."""
+        found = []
+        for prefix in (self.key(name), f"{self.key(name)}/"):
+            token = {}
+            while True:
+                page = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix, **token)
+                found += [(obj["Key"], obj["Size"]) for obj in page.get("Contents", [])
+                          if prefix.endswith("/") or obj["Key"] == prefix]
+                if not page.get("IsTruncated"):
+                    break
+                token = {"ContinuationToken": page["NextContinuationToken"]}
+        return found
+
+    def file_sizes(self, name):
+        """Return {relative name: bytes} of the objects below name/."""
+        prefix = f"{self.key(name)}/"
+        return {key.removeprefix(prefix): size for key, size in self.list(name)
+                if key.startswith(prefix)}
+
+    def total_size(self, name):
+        """Return the size in bytes of an object or of all objects below name/."""
+        return sum(size for _key, size in self.list(name))
+
+    def delete_keys(self, keys):
+        for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                "Objects": [{"Key": key} for key in keys[i:i + S3_DELETE_BATCH_SIZE]],
+                "Quiet": True,
+            })
+
+    def delete(self, name):
+        """Remove an object or all objects below name/; returns the number of bytes freed."""
+        objects = self.list(name)
+        self.delete_keys([key for key, _size in objects])
+        return sum(size for _key, size in objects)
+
+
+def is_missing(error):
+    """Return whether a boto3 client error reports a missing object."""
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in S3_MISSING_CODES
+
+
+def s3_client():
+    """
+    Return a boto3 S3 client for the MEDIA_S3_* settings and the transfer
+    configuration of its uploads. boto3 (pinned in requirements.txt) is
+    imported here so the local backend does not load it.
+    """
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+
+    client = boto3.client("s3", endpoint_url=settings.MEDIA_S3_ENDPOINT_URL or None,
+                          region_name=settings.MEDIA_S3_REGION or None)
+    transfer_config = TransferConfig(
+        multipart_threshold=settings.MEDIA_S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.MEDIA_S3_MULTIPART_THRESHOLD,
+        max_concurrency=4)
+    return client, transfer_config
+
+
+_s3_store = None
+
+
+def media_store():
+    """Return the store of published media configured by MEDIA_STORAGE_BACKEND."""
+    global _s3_store
+    if settings.MEDIA_STORAGE_BACKEND != "s3":
+        return LocalMediaStore(settings.MEDIA_ROOT)
+    if _s3_store is None:
+        client, transfer_config = s3_client()
+        _s3_store = S3MediaStore(
+            settings.MEDIA_S3_BUCKET, client, transfer_config,
+            prefix=settings.MEDIA_S3_PREFIX,
+            workers=settings.MEDIA_S3_UPLOAD_WORKERS,
+            url_expiry=settings.MEDIA_S3_URL_EXPIRY)
+    return _s3_store
+
+
+@receiver(setting_changed)
+def reset_media_store(setting, **kwargs):
+    """Drop the cached S3 store when its settings change (tests)."""
+    global _s3_store
+    if setting.startswith("MEDIA_"):
+        _s3_store = None
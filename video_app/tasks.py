@@ -1,44 +1,442 @@
+import json
 import os
 import subprocess
 import logging
+import threading
 import django_rq
-from pathlib import Path
-from rq import Retry
+from datetime import timedelta
+from redis.exceptions import LockError, RedisError, WatchError
+from rq import Queue, Retry
+from rq.job import Job, JobStatus
 from django.conf import settings
-from .models import Video, VideoStreamVariant
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .admission import (InsufficientDiskSpace, OutputExceedsDiskCapacity,
+                        estimate_output_bytes, release_disk_space,
+                        release_stale_reservations, reserve_disk_space)
+from .catalog import publish_catalog_snapshot
+from .cleanup import delete_video_media
+from .encoding import (audio_ffmpeg_outputs, hls_ffmpeg_command,
+                       keyframe_times, measure_complexity, probe_has_audio,
+                       rate_control_args, segment_boundaries)
+from .models import OutboxJob, Video, VideoStreamVariant, VideoUpload
+from .playlists import (IFRAME_PLAYLIST_NAME, MASTER_PLAYLIST_NAME,
+                        VARIANT_PLAYLIST_NAME, rendition_stats,
+                        verify_rendition_alignment, write_iframe_playlist,
+                        write_master_playlist)
+from .progress import flush_progress
+from .segments import store_segment_index
+from .scratch import scratch_directory
+from .storage import media_store
+from .trickplay import (TRICKPLAY_DIR_NAME, TRICKPLAY_VTT_NAME,
+                        thumbnail_path, trickplay_ffmpeg_outputs,
+                        version_sprites, write_trickplay_vtt)
+from .uploads import hash_upload_file
+from utils.scheduling import schedule_periodic_job
+from utils.videos import hls_name, thumbnail_name
 
 logger = logging.getLogger(__name__)
 
 
+# HLS rendition ladder, from lowest to highest quality
+RESOLUTIONS = [
+    {'name': '360p', 'height': 360, 'bitrate': '800k'},
+    {'name': '480p', 'height': 480, 'bitrate': '1200k'},
+    {'name': '720p', 'height': 720, 'bitrate': '2500k'},
+    {'name': '1080p', 'height': 1080, 'bitrate': '5000k'},
+]
+
+# Rendition the content complexity is measured against (720p)
+COMPLEXITY_REFERENCE = RESOLUTIONS[2]
+
+# Audio is encoded once into a rendition group shared by all resolutions.
+# The low-bitrate rendition is also offered as an audio-only stream.
+AUDIO_RENDITION = {'name': 'audio', 'bitrate': '128k', 'channels': 2}
+AUDIO_ONLY_RENDITION = {'name': 'audio_low', 'bitrate': '48k', 'channels': 1}
+
+
+# Processing jobs have one deterministic job ID per video, and a Redis lock
+# per video is held while the pipeline runs. The lock doubles as heartbeat:
+# it is renewed every PROCESSING_HEARTBEAT_INTERVAL seconds and expires
+# soon after a worker dies (see reap_stuck_videos).
+PROCESS_VIDEO_TIMEOUT = 3600
+PROCESS_VIDEO_JOB_ID = "process-video-{}"
+PROCESS_VIDEO_LOCK_KEY = "videoflix:video:{}:processing"
+PROCESS_VIDEO_LOCK_TTL_HEARTBEATS = 4
+
+# Jobs with these states are waiting for or running on a worker
+WAITING_STATUSES = {JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED}
+IN_FLIGHT_STATUSES = WAITING_STATUSES | {JobStatus.STARTED}
+
+# Periodic jobs run on their own queue (and worker), so an encode that
+# runs for an hour does not hold up outbox dispatch or progress flushes
+MAINTENANCE_QUEUE = 'maintenance'
+
+
+def video_processing_job(video_id, resume=False):
+    """
+    Return the RQ enqueue data of the HLS processing job of a video.
+    A resumed job keeps the renditions a previous run completed.
+    """
+    return Queue.prepare_data(
+        process_video_to_hls,
+        [video_id, True] if resume else [video_id],
+        job_id=PROCESS_VIDEO_JOB_ID.format(video_id),
+        timeout=PROCESS_VIDEO_TIMEOUT,
+        retry=Retry(max=3, interval=[60, 300, 900]),
+        result_ttl=24 * 3600,
+        failure_ttl=7 * 24 * 3600,
+        description=f"HLS processing for video {video_id}"
+                    + (" (resumed)" if resume else ""),
+    )
+
+
+def catalog_refresh_job():
+    """Return the RQ enqueue data of a catalog snapshot rebuild."""
+    return Queue.prepare_data(
+        refresh_catalog_snapshot,
+        timeout=300,
+        result_ttl=3600,
+        description="Catalog snapshot refresh",
+    )
+
+
+def media_deletion_job(video_id, file_names):
+    """Return the RQ enqueue data of removing the media of a deleted video."""
+    return Queue.prepare_data(
+        delete_video_media_job,
+        [video_id, file_names],
+        timeout=3600,
+        retry=Retry(max=5, interval=[60, 300, 900, 1800, 3600]),
+        result_ttl=3600,
+        failure_ttl=7 * 24 * 3600,
+        description=f"Media deletion for video {video_id}",
+    )
+
+
+def upload_hashing_job(upload_id):
+    """Return the RQ enqueue data of hashing a completed upload's file."""
+    return Queue.prepare_data(
+        hash_upload_job,
+        [upload_id],
+        timeout=3600,
+        retry=Retry(max=3, interval=[60, 300, 900]),
+        result_ttl=3600,
+        failure_ttl=7 * 24 * 3600,
+        description=f"SHA-256 of upload {upload_id}",
+    )
+
+
+def enqueue_deduplicated(queue, job_datas):
+    """
+    Enqueue prepared jobs in one Redis transaction. A job whose ID belongs
+    to a job still in flight (queued, running or waiting for a retry) is
+    not enqueued again; that job is returned instead. A finished or failed
+    job with the same ID is replaced.
+
+    The job keys are WATCHed while their status is checked, so if a
+    concurrent dispatcher enqueues one of the jobs in between, the
+    transaction is discarded and the check repeated.
+    Returns the enqueued and in-flight jobs.
+    """
+    job_ids = [data.job_id for data in job_datas if data.job_id]
+    with queue.connection.pipeline() as pipe:
+        while True:
+            try:
+                if job_ids:
+                    pipe.watch(*(Job.key_for(job_id) for job_id in job_ids))
+                existing = {job.id: job for job in
+                            Job.fetch_many(job_ids, connection=queue.connection)
+                            if job is not None}
+
+                pipe.multi()
+                in_flight, new = [], []
+                for data in job_datas:
+                    job = existing.get(data.job_id)
+                    if job and job.get_status(refresh=False) in IN_FLIGHT_STATUSES:
+                        logger.debug("Job %s is already in flight", job.id)
+                        in_flight.append(job)
+                        continue
+                    if job:
+                        job.delete(pipeline=pipe)
+                    new.append(data)
+                jobs = queue.enqueue_many(new, pipeline=pipe) if new else []
+                pipe.execute()
+                return in_flight + jobs
+            except WatchError:
+                logger.debug("Jobs changed while being enqueued, retrying")
+
+
 def queue_video_processing(video_id):
     """
-    Enqueue video processing job in Redis Queue
-    Call this from Views/Signals to start background processing
+    Enqueue the processing job of a video, or return the ID of its job
+    that is already queued or running. Use this for manual re-runs;
+    signals request processing through the outbox.
+    """
+    queue = django_rq.get_queue('default')
+    job = enqueue_deduplicated(queue, [video_processing_job(video_id)])[0]
+    logger.info("Video %s queued for processing. Job ID: %s", video_id, job.id)
+    return job.id
+
+
+def outbox_job(entry):
+    """Return the RQ enqueue data of an outbox entry."""
+    if entry.job == "process_video":
+        return video_processing_job(*entry.args)
+    if entry.job == "delete_media":
+        return media_deletion_job(*entry.args)
+    if entry.job == "hash_upload":
+        return upload_hashing_job(*entry.args)
+    return catalog_refresh_job()
+
+
+def dispatch_outbox(batch_size=None):
+    """
+    Move pending outbox jobs to RQ, oldest first, in batches of
+    OUTBOX_BATCH_SIZE. Each batch is enqueued in one Redis pipeline and
+    deleted in the same transaction; if Redis fails, the batch stays in
+    the outbox for the next run. Identical jobs in a batch (e.g. catalog
+    refreshes after a bulk delete) are enqueued once, and processing jobs
+    of videos already in flight are not enqueued again.
+    Rows locked by a concurrent dispatcher, and rows deferred to a later
+    available_at, are skipped.
+    Returns the number of outbox entries dispatched.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    queue = django_rq.get_queue('default')
+    dispatched = 0
+
+    while True:
+        with transaction.atomic():
+            entries = list(OutboxJob.objects.select_for_update(skip_locked=True)
+                           .filter(available_at__lte=timezone.now())
+                           .order_by('id')[:batch_size])
+            if not entries:
+                break
+            unique = {}
+            for entry in entries:
+                # args are JSON (possibly nested lists), so key by their dump
+                unique.setdefault((entry.job, json.dumps(entry.args, sort_keys=True)), entry)
+            jobs = enqueue_deduplicated(
+                queue, [outbox_job(e) for e in unique.values()])
+            OutboxJob.objects.filter(pk__in=[e.pk for e in entries]).delete()
+
+        dispatched += len(entries)
+        logger.info("Dispatched %d outbox entries as %d jobs",
+                    len(entries), len(jobs))
+        if len(entries) < batch_size:
+            break
+    return dispatched
+
+
+def reap_stuck_videos():
+    """
+    Requeue videos left in 'processing' by a dead worker.
+
+    A video is stuck if its processing lock (the heartbeat of a running
+    pipeline) has expired and its job is not waiting to run (queued,
+    scheduled for a retry or deferred). The dead job is deleted, the video
+    is reset to 'pending', its processing_restarts counter is increased,
+    its disk space reservation dropped and a resumed processing job is
+    requested through the outbox. A video that was already requeued
+    PROCESSING_MAX_RESTARTS times (e.g. a source that kills its worker
+    every time) is marked failed instead.
+    Returns the IDs of the requeued videos.
+    """
+    lock_ttl = settings.PROCESSING_HEARTBEAT_INTERVAL * PROCESS_VIDEO_LOCK_TTL_HEARTBEATS
+    release_stale_reservations(lock_ttl)
+    video_ids = list(Video.objects.filter(processing_status='processing')
+                     .order_by('id').values_list('id', flat=True))
+    if not video_ids:
+        return []
+
+    connection = django_rq.get_connection('default')
+    with connection.pipeline() as pipe:
+        for video_id in video_ids:
+            pipe.exists(PROCESS_VIDEO_LOCK_KEY.format(video_id))
+        locked = pipe.execute()
+    jobs = Job.fetch_many([PROCESS_VIDEO_JOB_ID.format(video_id) for video_id in video_ids],
+                          connection=connection)
+
+    stuck = []
+    for video_id, is_locked, job in zip(video_ids, locked, jobs):
+        if is_locked:
+            continue
+        job_status = job.get_status(refresh=False) if job else None
+        if job_status in WAITING_STATUSES:
+            continue
+        if job_status == JobStatus.STARTED:
+            # Its worker died without reporting; a started job would be
+            # taken for in flight and block the new run
+            job.delete()
+        stuck.append(video_id)
+
+    max_restarts = settings.PROCESSING_MAX_RESTARTS
+    requeued = []
+    for video_id in stuck:
+        with transaction.atomic():
+            videos = Video.objects.filter(id=video_id, processing_status='processing')
+            failed = videos.filter(processing_restarts__gte=max_restarts).update(
+                processing_status='failed',
+                processing_error=f"Processing interrupted {max_restarts + 1} times, giving up")
+            updated = not failed and videos.update(
+                processing_status='pending',
+                processing_error="Processing interrupted, requeued",
+                processing_restarts=F('processing_restarts') + 1)
+            if failed or updated:
+                release_disk_space(video_id)
+            if updated:
+                OutboxJob.objects.create(job="process_video", args=[video_id, True])
+        if failed:
+            logger.error("Video %s was stuck in processing too often, marked failed", video_id)
+        elif updated:
+            logger.warning("Video %s was stuck in processing, requeued", video_id)
+            requeued.append(video_id)
+    return requeued
+
+
+def reap_stuck_videos_job():
+    """
+    RQ job: Requeue videos stuck in processing, then schedule the next
+    periodic run.
     """
     try:
-        queue = django_rq.get_queue('default')
-        job = queue.enqueue(
-            process_video_to_hls,
-            video_id,
-            job_timeout=3600,
-            retry=Retry(max=3, interval=[60, 300, 900]),
-            result_ttl=24 * 3600,
-            failure_ttl=7 * 24 * 3600,
-            description=f"HLS processing for video {video_id}",
-        )
-        logger.info("Video %s queued for processing. Job ID: %s",
-                    video_id, job.id)
-        return job.id
-    except Exception as e:
-        logger.error("Failed to queue video %s for processing: %s",
-                     video_id, str(e))
-        raise
+        reap_stuck_videos()
+    finally:
+        schedule_stuck_video_reaper()
+
+
+def schedule_stuck_video_reaper():
+    """
+    Schedule the next periodic stuck video check.
+    Returns the job ID.
+    """
+    return schedule_periodic_job(
+        reap_stuck_videos_job,
+        settings.PROCESSING_REAPER_INTERVAL,
+        queue_name=MAINTENANCE_QUEUE,
+        job_timeout=300,
+        result_ttl=600,
+        description="Periodic stuck video reaper",
+    )
+
+
+def dispatch_outbox_jobs():
+    """
+    RQ job: Move pending outbox jobs to RQ, then schedule the next
+    periodic run.
+    """
+    try:
+        dispatch_outbox()
+    finally:
+        schedule_outbox_dispatch()
+
+
+def schedule_outbox_dispatch():
+    """
+    Schedule the next periodic outbox dispatch.
+    Returns the job ID.
+    """
+    return schedule_periodic_job(
+        dispatch_outbox_jobs,
+        settings.OUTBOX_DISPATCH_INTERVAL,
+        queue_name=MAINTENANCE_QUEUE,
+        job_timeout=300,
+        result_ttl=60,
+        description="Periodic outbox dispatch",
+    )
 
 
-def process_video_to_hls(video_id):
+def process_video_to_hls(video_id, resume=False):
+    """
+    Main background job: Convert video to HLS with multiple resolutions.
+
+    Holds the video's processing lock while the pipeline runs, so two runs
+    never write into the same output directory; a run that finds the lock
+    taken does nothing. With resume, renditions completed by an
+    interrupted run are kept.
     """
-    Main background job: Convert video to HLS with multiple resolutions
-    Orchestrates the entire video processing pipeline
+    lock = django_rq.get_connection('default').lock(
+        PROCESS_VIDEO_LOCK_KEY.format(video_id),
+        timeout=settings.PROCESSING_HEARTBEAT_INTERVAL * PROCESS_VIDEO_LOCK_TTL_HEARTBEATS)
+    if not lock.acquire(blocking=False):
+        logger.warning("Video %s is already being processed, skipping", video_id)
+        return
+
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(
+        target=renew_processing_lock, args=(lock, stop_heartbeat), daemon=True)
+    heartbeat.start()
+    try:
+        run_video_pipeline(video_id, resume)
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("Processing lock of video %s expired", video_id)
+
+
+def delete_video_media_job(video_id, file_names):
+    """
+    RQ job: Remove the HLS output tree, source file and thumbnail of a
+    deleted video (see cleanup.delete_video_media).
+
+    Waits for a processing run of the video that is still writing output:
+    while its processing lock is held the job fails and is retried later.
+    """
+    lock = django_rq.get_connection('default').lock(
+        PROCESS_VIDEO_LOCK_KEY.format(video_id),
+        timeout=settings.PROCESSING_HEARTBEAT_INTERVAL * PROCESS_VIDEO_LOCK_TTL_HEARTBEATS)
+    if not lock.acquire(blocking=False):
+        raise RuntimeError(f"Video {video_id} is still being processed")
+    try:
+        return delete_video_media(video_id, file_names)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning("Processing lock of video %s expired", video_id)
+
+
+def hash_upload_job(upload_id):
+    """
+    RQ job: Store the SHA-256 of a completed upload's file. Uploads
+    deleted in the meantime, and files already removed, are skipped.
+    """
+    upload = VideoUpload.objects.filter(pk=upload_id).first()
+    if upload is None:
+        return None
+    try:
+        return hash_upload_file(upload)
+    except FileNotFoundError:
+        logger.warning("File of upload %s is gone, not hashed", upload_id)
+        return None
+
+
+def renew_processing_lock(lock, stop):
+    """
+    Heartbeat thread of a processing run: reset the lock's expiry every
+    PROCESSING_HEARTBEAT_INTERVAL seconds until `stop` is set.
+    """
+    while not stop.wait(settings.PROCESSING_HEARTBEAT_INTERVAL):
+        try:
+            lock.reacquire()
+        except (LockError, RedisError) as e:
+            logger.warning("Could not renew processing lock %s: %s",
+                           lock.name, str(e))
+
+
+def run_video_pipeline(video_id, resume=False):
+    """
+    Orchestrates the entire video processing pipeline.
+
+    The run is admitted only if its estimated output fits on the media and
+    scratch volumes (see admission.reserve_disk_space); otherwise it is
+    deferred by HLS_ADMISSION_RETRY_INTERVAL seconds. A video whose output
+    would not fit even on empty volumes fails without retries.
     """
     video = None
     try:
@@ -46,11 +444,31 @@ def process_video_to_hls(video_id):
         logger.info("Starting HLS processing for Video %s: %s",
                     video_id, video.title)
 
-        input_path, output_dir = setup_video_processing(video)
-
-        process_all_resolutions(video, input_path, output_dir)
-
-        finalize_video_processing(video, input_path)
+        extract_video_metadata(video, video.video_file.path)
+
+        try:
+            reserve_disk_space(video.id, *estimate_output_bytes(
+                video.duration_seconds, RESOLUTIONS, configured_audio_renditions()))
+        except InsufficientDiskSpace as e:
+            defer_video_processing(video, resume, str(e))
+            return
+        except OutputExceedsDiskCapacity as e:
+            logger.error("Video %s cannot be processed: %s", video_id, e)
+            Video.objects.filter(id=video.id).update(
+                processing_status='failed',
+                processing_error=f"Output does not fit on disk: {e}")
+            return
+
+        try:
+            input_path, output_name = setup_video_processing(video)
+
+            with scratch_directory(video.id) as scratch_dir:
+                audio_renditions = process_all_resolutions(
+                    video, input_path, output_name, scratch_dir, resume)
+                finalize_video_processing(video, output_name, scratch_dir,
+                                          audio_renditions)
+        finally:
+            release_disk_space(video.id)
 
         logger.info("Video %s processing completed successfully", video_id)
 
@@ -68,100 +486,237 @@ def process_video_to_hls(video_id):
         raise e
 
 
+def defer_video_processing(video, resume, reason):
+    """
+    Put a video whose output does not fit on disk back to 'pending' and
+    request processing again through the outbox, available after
+    HLS_ADMISSION_RETRY_INTERVAL seconds.
+    """
+    retry_at = timezone.now() + timedelta(seconds=settings.HLS_ADMISSION_RETRY_INTERVAL)
+    with transaction.atomic():
+        Video.objects.filter(id=video.id).update(
+            processing_status='pending',
+            processing_error=f"Waiting for disk space: {reason}")
+        OutboxJob.objects.create(job="process_video", args=[video.id, resume],
+                                 available_at=retry_at)
+    logger.warning("Video %s deferred until %s: %s", video.id, retry_at, reason)
+
+
 def setup_video_processing(video):
     """
-    Setup video for processing: status, directories, paths
-    Returns: (input_path, output_dir)
+    Setup video for processing: status, paths
+    Returns: (input_path, output_name), output_name being the HLS output
+    directory in the media store (see storage.media_store)
     """
     video.processing_status = 'processing'
     video.processing_progress = 0
     video.save()
 
     input_path = video.video_file.path
-    output_dir = Path(settings.MEDIA_ROOT) / "hls" / str(video.id)
-
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_name = hls_name(video.id)
 
     logger.debug("Video processing setup completed for video %s", video.id)
-    return input_path, output_dir
+    return input_path, output_name
 
 
-def process_all_resolutions(video, input_path, output_dir):
+def process_all_resolutions(video, input_path, output_name, scratch_dir,
+                            resume=False):
     """
     Process video into all HLS resolutions (480p, 360p, 720p, 1080p)
-    Updates progress from 0% to 80%
+    All renditions share the same segment boundaries and keyframes.
+    In capped CRF mode, rate control is chosen per title from a complexity
+    sample. The first pass also writes the audio renditions, the poster thumbnail
+    and trickplay sprites from the same decode.
+    Everything is encoded in scratch_dir and published to output_name in
+    the media store once complete.
+    With resume, resolutions already registered with a playlist on disk
+    are skipped; the first-pass extras are then written by the first
+    resolution that is encoded, unless a previous run published them (if
+    it did not and every resolution is complete, the lowest one is
+    encoded again to write them).
+    Updates progress from 0% to 80%. Returns the audio renditions of the
+    source.
     """
-    resolutions = [
-        {'name': '360p', 'height': 360, 'bitrate': '800k'},
-        {'name': '480p', 'height': 480, 'bitrate': '1200k'},
-        {'name': '720p', 'height': 720, 'bitrate': '2500k'},
-        {'name': '1080p', 'height': 1080, 'bitrate': '5000k'},
-    ]
-
+    completed = completed_resolutions(video, output_name) if resume else set()
+    boundaries = segment_boundaries(video.duration_seconds)
+    keyframes = keyframe_times(video.duration_seconds, boundaries)
+    audio_renditions = get_audio_renditions(input_path)
+    extras_pending = not (resume and first_pass_extras_published(
+        output_name, audio_renditions, completed))
+    if extras_pending and all(res['name'] in completed for res in RESOLUTIONS):
+        completed.discard(RESOLUTIONS[0]['name'])
+    complexity = None
+    if settings.HLS_RATE_CONTROL == 'capped_crf' and \
+            len(completed) < len(RESOLUTIONS):
+        complexity = measure_complexity(
+            input_path, video.duration_seconds, COMPLEXITY_REFERENCE)
+        logger.info("Video %s complexity: %s", video.id,
+                    "n/a" if complexity is None else f"{complexity:.2f}")
     logger.info("Processing %d resolutions for video %s",
-                len(resolutions), video.id)
+                len(RESOLUTIONS), video.id)
 
-    for i, res in enumerate(resolutions):
+    for i, res in enumerate(RESOLUTIONS):
+        if res['name'] in completed:
+            logger.info("Resuming video %s: keeping %s", video.id, res['name'])
+            continue
         logger.debug("Processing resolution %s for video %s",
                      res['name'], video.id)
-        process_resolution(video, input_path, output_dir, res)
-
-        progress = int((i + 1) / len(resolutions) * 80)
+        extra_outputs = [
+            *trickplay_ffmpeg_outputs(video, scratch_dir),
+            *audio_ffmpeg_outputs(scratch_dir, audio_renditions, boundaries),
+        ] if extras_pending else ()
+        process_resolution(video, input_path, scratch_dir, output_name, res,
+                           boundaries, keyframes, complexity, extra_outputs)
+        if extras_pending:
+            publish_first_pass_extras(video, scratch_dir, output_name,
+                                      audio_renditions)
+            extras_pending = False
+
+        progress = int((i + 1) / len(RESOLUTIONS) * 80)
         video.processing_progress = progress
         video.save()
         logger.debug("Video %s progress: %d%%", video.id, progress)
 
     logger.debug("All resolutions processed for video %s", video.id)
+    return audio_renditions
+
+
+def publish_first_pass_extras(video, scratch_dir, output_name, audio_renditions):
+    """
+    Publish what the first pass wrote besides its resolution: the audio
+    renditions (registered as variants), the trickplay sprites (moved
+    into a directory versioned by their content) with their WebVTT index
+    and the poster thumbnail. The trickplay index is published last and
+    marks the extras as complete (see first_pass_extras_published).
+    """
+    store = media_store()
+    for rendition in audio_renditions:
+        name = f"{output_name}/{rendition['name']}"
+        register_variant(video, store.publish_directory(
+            scratch_dir / rendition['name'], name), name)
+
+    thumb = thumbnail_path(video)
+    if (scratch_dir / thumb.name).exists():
+        store.publish_file(scratch_dir / thumb.name, thumbnail_name(video.id))
+    write_trickplay_vtt(scratch_dir, video.duration_seconds, version_sprites(scratch_dir))
+    store.publish_directory(scratch_dir / TRICKPLAY_DIR_NAME,
+                            f"{output_name}/{TRICKPLAY_DIR_NAME}")
 
 
-def finalize_video_processing(video, input_path):
+def first_pass_extras_published(output_name, audio_renditions, completed):
     """
-    Final steps: extract metadata, generate thumbnail, mark as completed
+    Return whether a previous run published the first-pass extras: all
+    audio renditions are among the completed variants and the trickplay
+    index exists.
+    """
+    return all(rendition['name'] in completed for rendition in audio_renditions) and \
+        media_store().exists(f"{output_name}/{TRICKPLAY_DIR_NAME}/{TRICKPLAY_VTT_NAME}")
+
+
+def completed_resolutions(video, output_name):
+    """
+    Return the names of the resolutions of a video that a previous run
+    completed: registered as a variant, with the playlist in the media store.
+    """
+    store = media_store()
+    return {
+        name for name in video.variants.values_list('resolution', flat=True)
+        if store.exists(f"{output_name}/{name}/{VARIANT_PLAYLIST_NAME}")
+    }
+
+
+def finalize_video_processing(video, output_name, scratch_dir, audio_renditions=()):
+    """
+    Final steps: verify rendition alignment, drop variants this run did not
+    produce (e.g. audio of a source replaced by a silent one), write master
+    playlist, set thumbnail, mark as completed
+    Playlists are read from a local view of the output (with a remote
+    store: scratch_dir, where renditions kept by a resumed run are
+    downloaded to).
     Updates progress from 80% to 100%
     """
-    logger.debug("Extracting metadata for video %s", video.id)
+    store = media_store()
+    output_dir = store.local_dir(output_name, scratch_dir)
+    resolution_names = [res['name'] for res in RESOLUTIONS]
+    audio_names = [r['name'] for r in audio_renditions]
+    playlists = [(name, playlist) for name in resolution_names
+                 for playlist in (VARIANT_PLAYLIST_NAME, IFRAME_PLAYLIST_NAME)]
+    playlists += [(name, VARIANT_PLAYLIST_NAME) for name in audio_names]
+    for name, playlist in playlists:
+        local_path = output_dir / name / playlist
+        if not local_path.exists() and store.exists(f"{output_name}/{name}/{playlist}"):
+            store.fetch(f"{output_name}/{name}/{playlist}", local_path)
+
+    logger.debug("Verifying rendition alignment for video %s", video.id)
+    verify_rendition_alignment(output_dir, resolution_names, audio_names)
+
+    logger.debug("Writing master playlist for video %s", video.id)
     video.processing_progress = 85
     video.save()
-    extract_video_metadata(video, input_path)
+    produced = resolution_names + audio_names
+    stale, _ = video.variants.exclude(resolution__in=produced).delete()
+    if stale:
+        logger.info("Removed %d stale variant(s) of video %s", stale, video.id)
+    variants = {v.resolution: v for v in video.variants.all()}
+    master_path = write_master_playlist(
+        output_dir,
+        [variants[name] for name in resolution_names],
+        variants.get(AUDIO_RENDITION['name']),
+        variants.get(AUDIO_ONLY_RENDITION['name']),
+    )
+    store.publish_file(master_path, f"{output_name}/{MASTER_PLAYLIST_NAME}")
 
-    logger.debug("Generating thumbnail for video %s", video.id)
     video.processing_progress = 95
     video.save()
-    generate_thumbnail(video, input_path)
+    register_thumbnail(video)
 
     video.processing_status = 'completed'
     video.processing_progress = 100
     video.save()
     logger.debug("Video processing finalized for video %s", video.id)
 
+    queue_catalog_refresh()
 
-def process_resolution(video, input_path, output_dir, resolution):
+
+def get_audio_renditions(input_path):
     """
-    Convert video to specific resolution with HLS segmentation
+    Return the audio renditions to encode: none for silent sources,
+    the low-bitrate audio-only stream only if HLS_AUDIO_ONLY_STREAM is set
     """
-    res_name = resolution['name']
-    height = resolution['height']
-    bitrate = resolution['bitrate']
+    if not probe_has_audio(input_path):
+        logger.info("No audio stream in %s", input_path)
+        return []
+    return configured_audio_renditions()
+
+
+def configured_audio_renditions():
+    """Return the audio renditions encoded for sources with audio."""
+    if settings.HLS_AUDIO_ONLY_STREAM:
+        return [AUDIO_RENDITION, AUDIO_ONLY_RENDITION]
+    return [AUDIO_RENDITION]
 
-    res_output_dir = output_dir / res_name
-    res_output_dir.mkdir(parents=True, exist_ok=True)
 
-    playlist_path = res_output_dir / "index.m3u8"
-    segment_pattern = res_output_dir / "segment_%05d.ts"
+def process_resolution(video, input_path, scratch_dir, output_name, resolution,
+                       boundaries, keyframes, complexity=None, extra_outputs=()):
+    """
+    Convert video to specific resolution with HLS segmentation (video only)
+    The rendition is encoded in scratch_dir, then published below
+    output_name in the media store and registered.
+    boundaries: segment boundaries in seconds (see segment_boundaries)
+    keyframes: keyframe times in seconds shared by all renditions
+    complexity: content complexity for capped CRF (None: fixed bitrate)
+    extra_outputs: additional ffmpeg output arguments fed by the same decode
+    """
+    res_name = resolution['name']
+
+    res_scratch_dir = scratch_dir / res_name
+    res_scratch_dir.mkdir(parents=True, exist_ok=True)
 
     ffmpeg_cmd = [
-        'ffmpeg',
-        '-i', input_path,
-        '-vf', f'scale=-2:{height}',
-        '-c:v', 'libx264',
-        '-b:v', bitrate,
-        '-c:a', 'aac',
-        '-b:a', '128k',
-        '-hls_time', '10',
-        '-hls_list_size', '0',
-        '-hls_segment_filename', str(segment_pattern),
-        '-f', 'hls',
-        str(playlist_path),
+        *hls_ffmpeg_command(input_path, res_scratch_dir, resolution,
+                            boundaries, keyframes,
+                            rate_control_args(resolution, complexity)),
+        *extra_outputs,
     ]
 
     try:
@@ -169,17 +724,35 @@ def process_resolution(video, input_path, output_dir, resolution):
         logger.debug(
             "FFmpeg conversion to %s completed successfully", res_name)
 
-        VideoStreamVariant.objects.update_or_create(
-            video=video,
-            resolution=res_name,
-            defaults={'manifest_path': str(playlist_path)},
-        )
+        write_iframe_playlist(res_scratch_dir)
+        name = f"{output_name}/{res_name}"
+        register_variant(video, media_store().publish_directory(
+            res_scratch_dir, name), name)
 
     except subprocess.CalledProcessError as e:
         logger.error("FFmpeg failed for resolution %s: %s", res_name, e.stderr)
         raise
 
 
+def register_variant(video, rendition_dir, name):
+    """
+    Create or update the stream variant of a rendition directory
+    with its measured statistics, and store its segment index.
+    name is the rendition's directory in the media store.
+    """
+    playlist_path = rendition_dir / VARIANT_PLAYLIST_NAME
+    variant, _ = VideoStreamVariant.objects.update_or_create(
+        video=video,
+        resolution=rendition_dir.name,
+        defaults={
+            'manifest_path': f"{name}/{VARIANT_PLAYLIST_NAME}",
+            **rendition_stats(rendition_dir),
+        },
+    )
+    store_segment_index(variant, playlist_path)
+    return variant
+
+
 def extract_video_metadata(video, input_path):
     """
     Extract video duration and file size using FFprobe
@@ -215,53 +788,75 @@ def extract_video_metadata(video, input_path):
         raise
 
 
-def generate_thumbnail(video, input_path):
+def register_thumbnail(video):
     """
-    Generate thumbnail from video at 3-second mark
+    Point the video at the poster thumbnail written during the first
+    transcoding pass (frame at the 3-second mark)
     """
-    logger.warning(
-        ">>> [Thumbnail START] Trying to generate thumbnail for video %s", video.id)
+    name = thumbnail_name(video.id)
+    if not media_store().exists(name):
+        logger.warning("No thumbnail was written for video %s", video.id)
+        return
+
+    video.thumbnail_url = name
+    video.save()
+    logger.info("Thumbnail registered for video %s: %s", video.id, name)
 
+
+def queue_catalog_refresh():
+    """
+    Enqueue a rebuild of the Redis catalog snapshot.
+    Failures are logged only: a stale snapshot is refreshed by the next scheduled run.
+    """
     try:
-        thumbnail_dir = Path(settings.MEDIA_ROOT) / "thumbnails"
-        thumbnail_dir.mkdir(parents=True, exist_ok=True)
-
-        thumbnail_filename = f"{video.id}_thumb.jpg"
-        thumbnail_path = thumbnail_dir / thumbnail_filename
-
-        ffmpeg_cmd = [
-            'ffmpeg',
-            '-y',
-            '-i', input_path,
-            '-ss', '00:00:03',
-            '-vframes', '1',
-            '-q:v', '2',
-            str(thumbnail_path),
-        ]
+        queue = django_rq.get_queue(MAINTENANCE_QUEUE)
+        job = queue.enqueue_many([catalog_refresh_job()])[0]
+        logger.debug("Catalog refresh queued. Job ID: %s", job.id)
+        return job.id
+    except Exception as e:
+        logger.warning("Failed to queue catalog refresh: %s", str(e))
+        return None
 
-        logger.debug("Starting ffmpeg thumbnail for video %s", video.id)
-        subprocess.run(ffmpeg_cmd, check=True, capture_output=True, text=True)
-        logger.debug("Finished ffmpeg thumbnail for video %s", video.id)
 
-        video.thumbnail_url = f"thumbnails/{thumbnail_filename}"
+def refresh_catalog_snapshot():
+    """
+    RQ job: Rebuild the public catalog (list, categories) into versioned
+    Redis blobs, then schedule the next periodic run.
+    """
+    try:
+        publish_catalog_snapshot()
+    finally:
+        schedule_periodic_job(
+            refresh_catalog_snapshot,
+            settings.CATALOG_SNAPSHOT_INTERVAL,
+            queue_name=MAINTENANCE_QUEUE,
+            job_timeout=300,
+            result_ttl=3600,
+            description="Periodic catalog snapshot refresh",
+        )
 
-        video.save()
-        logger.info("Thumbnail generated for video %s: %s",
-                    video.id, thumbnail_filename)
-        logger.warning(
-            ">>> [Thumbnail END] Successfully generated Thumbnail for video %s", video.id)
 
-    except subprocess.CalledProcessError as e:
-        logger.error(
-            "FFmpeg thumbnail generation failed for video %s", video.id)
-        logger.error("stderr output:\n%s", e.stderr)
-        logger.error(
-            "FFmpeg thumbnail generation failed for video %s: %s", video.id, e.stderr)
-        raise
+def flush_watch_progress():
+    """
+    RQ job: Write buffered watch-progress heartbeats from Redis
+    to the database in batches, then schedule the next periodic run.
+    """
+    try:
+        flush_progress()
+    finally:
+        schedule_watch_progress_flush()
 
-    except Exception as e:
-        logger.error(
-            "General thumbnail generation error for video %s: %s§", video.id)
-        logger.error(
-            "Failed to generate thumbnail for video %s: %s", video.id, str(e))
-        raise
+
+def schedule_watch_progress_flush():
+    """
+    Schedule the next periodic watch progress flush.
+    Returns the job ID.
+    """
+    return schedule_periodic_job(
+        flush_watch_progress,
+        settings.PROGRESS_FLUSH_INTERVAL,
+        queue_name=MAINTENANCE_QUEUE,
+        job_timeout=300,
+        result_ttl=600,
+        description="Periodic watch progress flush",
+    )
@@ -0,0 +1,113 @@
+import hashlib
+import math
+from pathlib import Path
+from django.conf import settings
+from utils.videos import thumbnail_name
+
+
+# Seek previews: one tile every TRICKPLAY_INTERVAL seconds, packed into
+# sprite sheets of TRICKPLAY_COLUMNS x TRICKPLAY_ROWS tiles.
+TRICKPLAY_INTERVAL = 10
+TRICKPLAY_TILE_WIDTH = 160
+TRICKPLAY_TILE_HEIGHT = 90
+TRICKPLAY_COLUMNS = 5
+TRICKPLAY_ROWS = 5
+
+TRICKPLAY_DIR_NAME = "trickplay"
+TRICKPLAY_VTT_NAME = "thumbnails.vtt"
+SPRITE_NAME_PATTERN = "sprite_%03d.jpg"
+# Sprites live in 'trickplay/<version>/', the version being a hash of their
+# content, so they can be cached forever; the index keeps its name
+SPRITE_VERSION_LENGTH = 12
+
+THUMBNAIL_OFFSET = "3"
+
+
+def thumbnail_path(video):
+    """Return the absolute path of the poster thumbnail of a video."""
+    return Path(settings.MEDIA_ROOT) / thumbnail_name(video.id)
+
+
+def trickplay_ffmpeg_outputs(video, output_dir):
+    """
+    Return extra ffmpeg output arguments that write the poster thumbnail
+    (named like thumbnail_path) and the trickplay sprite sheets into
+    output_dir from an existing decode of the source.
+    """
+    trickplay_dir = output_dir / TRICKPLAY_DIR_NAME
+    trickplay_dir.mkdir(parents=True, exist_ok=True)
+    thumb = output_dir / thumbnail_path(video).name
+
+    tile_filter = (
+        f"fps=1/{TRICKPLAY_INTERVAL},"
+        f"scale={TRICKPLAY_TILE_WIDTH}:{TRICKPLAY_TILE_HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={TRICKPLAY_TILE_WIDTH}:{TRICKPLAY_TILE_HEIGHT}:(ow-iw)/2:(oh-ih)/2,"
+        f"tile={TRICKPLAY_COLUMNS}x{TRICKPLAY_ROWS}"
+    )
+    return [
+        '-ss', THUMBNAIL_OFFSET,
+        '-frames:v', '1',
+        '-q:v', '2',
+        '-update', '1',
+        str(thumb),
+        '-vf', tile_filter,
+        '-an',
+        '-q:v', '5',
+        '-start_number', '0',
+        str(trickplay_dir / SPRITE_NAME_PATTERN),
+    ]
+
+
+def format_vtt_time(seconds):
+    """Format seconds as a WebVTT timestamp (HH:MM:SS.mmm)."""
+    millis = round(seconds * 1000)
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def version_sprites(output_dir):
+    """
+    Move the sprite sheets written by ffmpeg into a directory named after
+    a hash of their content. Returns the version.
+    """
+    trickplay_dir = output_dir / TRICKPLAY_DIR_NAME
+    sprites = sorted(trickplay_dir.glob(SPRITE_NAME_PATTERN.replace("%03d", "[0-9]" * 3)))
+    digest = hashlib.sha256()
+    for sprite in sprites:
+        digest.update(sprite.read_bytes())
+    version = digest.hexdigest()[:SPRITE_VERSION_LENGTH]
+    (trickplay_dir / version).mkdir(exist_ok=True)
+    for sprite in sprites:
+        sprite.rename(trickplay_dir / version / sprite.name)
+    return version
+
+
+def build_trickplay_vtt(duration_seconds, version):
+    """
+    Build the WebVTT index mapping time ranges to sprite tiles
+    (media fragment '#xywh=x,y,w,h'), with sprite URLs ('<version>/sprite_NNN.jpg')
+    relative to the VTT.
+    """
+    tiles_per_sprite = TRICKPLAY_COLUMNS * TRICKPLAY_ROWS
+    cues = ["WEBVTT", ""]
+    for tile in range(max(math.ceil(duration_seconds / TRICKPLAY_INTERVAL), 1)):
+        start = tile * TRICKPLAY_INTERVAL
+        end = min(start + TRICKPLAY_INTERVAL, duration_seconds) or TRICKPLAY_INTERVAL
+        sprite, position = divmod(tile, tiles_per_sprite)
+        x = (position % TRICKPLAY_COLUMNS) * TRICKPLAY_TILE_WIDTH
+        y = (position // TRICKPLAY_COLUMNS) * TRICKPLAY_TILE_HEIGHT
+        cues += [
+            f"{format_vtt_time(start)} --> {format_vtt_time(end)}",
+            f"{version}/{SPRITE_NAME_PATTERN % sprite}#xywh={x},{y},{TRICKPLAY_TILE_WIDTH},{TRICKPLAY_TILE_HEIGHT}",
+            "",
+        ]
+    return "\n".join(cues)
+
+
+def write_trickplay_vtt(output_dir, duration_seconds, version):
+    """Write the WebVTT index above the sprite sheets of the given version."""
+    vtt_path = output_dir / TRICKPLAY_DIR_NAME / TRICKPLAY_VTT_NAME
+    vtt_path.write_text(build_trickplay_vtt(duration_seconds, version))
+    return vtt_path
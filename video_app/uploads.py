@@ -0,0 +1,241 @@
+import base64
+import binascii
+import fcntl
+import hashlib
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from .models import OutboxJob, Video, VideoUpload
+from utils.videos import video_upload_to
+
+logger = logging.getLogger(__name__)
+
+
+# Resumable uploads follow the tus 1.0.0 protocol (core, creation,
+# checksum and termination extensions), see https://tus.io/protocols/resumable-upload
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,termination"
+TUS_CHECKSUM_ALGORITHM = "sha256"
+
+# Request bodies are copied to disk in blocks of this size,
+# so memory use does not depend on the chunk or file size
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk does not start at the current offset of its upload."""
+
+
+class UploadLocked(Exception):
+    """Another request is writing a chunk of the upload."""
+
+
+class UploadChecksumMismatch(Exception):
+    """A chunk does not match the checksum sent by the client."""
+
+
+def parse_upload_metadata(header):
+    """
+    Parse a tus Upload-Metadata header ('key base64value,key2 ...')
+    into a dict of strings. Raises ValueError on malformed values.
+    """
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in header.split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid metadata value for '{key}'") from e
+    return metadata
+
+
+def parse_upload_checksum(header):
+    """
+    Parse a tus Upload-Checksum header ('sha256 <base64 digest>').
+    Returns the raw digest, or None if no header was sent.
+    Raises ValueError for other algorithms or malformed digests.
+    """
+    if not header:
+        return None
+    algorithm, _, digest = header.strip().partition(" ")
+    if algorithm != TUS_CHECKSUM_ALGORITHM:
+        raise ValueError(f"Unsupported checksum algorithm '{algorithm}'")
+    try:
+        return base64.b64decode(digest, validate=True)
+    except binascii.Error as e:
+        raise ValueError("Invalid checksum digest") from e
+
+
+def reserve_upload_path(filename):
+    """
+    Create an empty file for an upload at its final location below
+    'videos/' and return its path relative to MEDIA_ROOT.
+    The file is created exclusively, so concurrent uploads of the same
+    filename never write into each other.
+    """
+    name = video_upload_to(None, get_valid_filename(os.path.basename(filename)))
+    while True:
+        name = default_storage.get_available_name(name)
+        path = Path(default_storage.path(name))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            path.open("xb").close()
+            return name
+        except FileExistsError:
+            continue
+
+
+def create_upload(user, length, metadata):
+    """Register a new upload of `length` bytes and reserve its file."""
+    return VideoUpload.objects.create(
+        user=user,
+        title=metadata["title"],
+        description=metadata.get("description", ""),
+        category=metadata.get("category", ""),
+        file_path=reserve_upload_path(metadata["filename"]),
+        upload_length=length,
+    )
+
+
+@contextmanager
+def upload_write_lock(upload):
+    """
+    Hold an exclusive lock on an upload's file while a chunk is written.
+
+    The lock is an flock on the file (shared between nodes on the upload
+    volume), not a database row lock, so no transaction stays open while
+    a chunk streams in; it is released when the file is closed, also by
+    a worker that dies.
+
+    Raises:
+        UploadLocked: another request holds the lock.
+    """
+    with default_storage.open(upload.file_path, "rb") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as e:
+            raise UploadLocked(f"Upload {upload.pk} is being written") from e
+        yield
+
+
+def advance_offset(upload, previous):
+    """
+    Store upload.offset if the stored offset is still `previous`
+    (compare-and-set). Returns whether it was stored.
+    """
+    return VideoUpload.objects.filter(pk=upload.pk, offset=previous).update(
+        offset=upload.offset, updated_at=timezone.now()) == 1
+
+
+def append_chunk(upload, stream, offset, content_length, checksum=None):
+    """
+    Append a chunk read from `stream` to an upload's file, block by block.
+
+    The chunk must start at the upload's current offset. Bytes past that
+    offset (left over from an interrupted request) are discarded first.
+    The file's SHA-256 is updated as blocks are written. If the client
+    disconnects, the bytes received so far are kept, so the upload can
+    resume from there. If `checksum` is given and the chunk does not
+    match it, the chunk is discarded.
+
+    Updates upload.offset (the caller stores it with advance_offset,
+    holding upload_write_lock around both). The whole-file SHA-256
+    is computed once the upload is complete (see hash_upload_file), as
+    consecutive chunks may be served by different worker processes.
+
+    Raises:
+        UploadOffsetMismatch: offset is not the upload's current offset.
+        UploadChecksumMismatch: the chunk does not match `checksum`.
+    """
+    if offset != upload.offset:
+        raise UploadOffsetMismatch(
+            f"Chunk starts at {offset}, upload is at {upload.offset}")
+
+    path = Path(default_storage.path(upload.file_path))
+    chunk_hasher = hashlib.sha256() if checksum is not None else None
+
+    remaining = min(content_length, upload.upload_length - upload.offset)
+    written = 0
+    with path.open("r+b") as f:
+        f.seek(upload.offset)
+        f.truncate()
+        while remaining:
+            try:
+                block = stream.read(min(UPLOAD_BLOCK_SIZE, remaining))
+            except OSError:
+                logger.info("Upload %s interrupted at %d bytes",
+                            upload.pk, upload.offset + written)
+                break
+            if not block:
+                break
+            f.write(block)
+            if chunk_hasher:
+                chunk_hasher.update(block)
+            written += len(block)
+            remaining -= len(block)
+
+        if chunk_hasher and (remaining or chunk_hasher.digest() != checksum):
+            f.seek(upload.offset)
+            f.truncate()
+            raise UploadChecksumMismatch(
+                f"Chunk at {upload.offset} does not match its checksum")
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    upload.offset += written
+    return upload.offset
+
+
+def finalize_upload(upload):
+    """
+    Turn a completed upload into a Video. Creating the video requests its
+    processing through the outbox (see signals.video_post_save), in the
+    same transaction; the file's SHA-256 is requested the same way.
+
+    The upload's row is locked (select_for_update) for the check and the
+    creation only, so a retried or concurrent final request cannot create
+    a second video. Returns the upload's video.
+    """
+    with transaction.atomic():
+        upload = VideoUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.video_id is not None:
+            return upload.video
+        video = Video.objects.create(
+            title=upload.title,
+            description=upload.description,
+            category=upload.category,
+            video_file=upload.file_path,
+        )
+        upload.video = video
+        upload.save(update_fields=["video", "updated_at"])
+        OutboxJob.objects.create(job="hash_upload", args=[str(upload.pk)])
+    logger.info("Upload %s completed as video %s", upload.pk, video.id)
+    return video
+
+
+def hash_upload_file(upload):
+    """
+    Compute the SHA-256 of a completed upload's file, block by block,
+    and store it in upload.sha256.
+    """
+    hasher = hashlib.sha256()
+    with default_storage.open(upload.file_path, "rb") as f:
+        while block := f.read(UPLOAD_BLOCK_SIZE):
+            hasher.update(block)
+    upload.sha256 = hasher.hexdigest()
+    upload.save(update_fields=["sha256", "updated_at"])
+    logger.info("Upload %s has sha256 %s", upload.pk, upload.sha256)
+    return upload.sha256
+
+
+def delete_upload(upload):
+    """Abort an upload: remove its partial file and its row."""
+    if upload.video_id is None:
+        default_storage.delete(upload.file_path)
+    upload.delete()